@@ -1,19 +1,162 @@
 import sqlite3
 import os
+import argparse
 import datetime
+import itertools
 import random
+from init_db import create_indexes, drop_indexes
+from json_cache import JSON_CACHE_TABLES, refresh_json_cache
+from write_hooks import record_write
 
-def add_sample_data():
-    """Add sample data to the database for testing and demonstration purposes."""
+DEFAULT_SEED = 42
+
+# Generated dates lie within DATE_SPAN_DAYS before the base date
+DEFAULT_BASE_DATE = datetime.datetime(2025, 1, 1)
+DATE_SPAN_DAYS = 5 * 365
+
+# Rows per unit of --scale for the generated tables. At scale 1 the tables
+# contain exactly the hand-written samples below.
+CARDINALITIES = {
+    'feedback': 5,
+    'staff': 5,
+    'blog_items': 5,
+    'about_company_category_items': 8,
+    'documents_items': 11
+}
+
+# Share of generated blog items that are soft-deleted
+DELETED_RATIO = 0.02
+
+# Rows held in memory per executemany call for tables with bodies
+BATCH_SIZE = 10000
+
+# Distinct sentences, titles and paragraphs texts are assembled from
+SENTENCE_POOL_SIZE = 20000
+PARAGRAPH_POOL_SIZE = 2000
+
+LATIN_WORDS = (
+    "web development design business technology service project company team "
+    "digital platform solution client market product data security cloud mobile "
+    "application strategy growth innovation experience quality support network "
+    "loyiha xizmat kompaniya jamoa texnologiya rivojlanish yechim mijoz bozor "
+    "mahsulot xavfsizlik tajriba sifat tarmoq dastur hamkorlik yangilik"
+).split()
+
+CYRILLIC_WORDS = (
+    "проект сервис компания команда технология развитие решение рынок продукт "
+    "данные безопасность облако приложение стратегия рост опыт качество сеть "
+    "лойиҳа хизмат жамоа технология ривожланиш ечим мижоз бозор маҳсулот тажриба"
+).split()
+
+FIRST_NAMES = [
+    "Alisher", "Dilshod", "Nodira", "Timur", "Kamila", "Jasur", "Malika", "Sardor",
+    "Алишер", "Дилшод", "Нодира", "Тимур", "Камила", "Жасур", "Малика", "Сардор"
+]
+
+LAST_NAMES = [
+    "Usmanov", "Karimov", "Azimova", "Rakhimov", "Yusupova", "Tashkentov", "Saidova",
+    "Усманов", "Каримов", "Азимова", "Рахимов", "Юсупова", "Саидова"
+]
+
+POSITIONS = [
+    "Developer", "Designer", "Project Manager", "QA Engineer", "Analyst",
+    "Разработчик", "Дизайнер", "Менеджер проекта", "Аналитик"
+]
+
+FEEDBACK_THEMES = ["General Inquiry", "Technical Support", "Partnership", "Job Application", "Suggestion"]
+
+# Relative frequency of each feedback theme
+FEEDBACK_THEME_WEIGHTS = [40, 30, 10, 10, 10]
+
+DOCUMENT_EXTENSIONS = ["pdf", "docx", "xlsx", "pptx"]
+
+class TextGenerator:
+    """
+    Deterministic mixed Latin/Cyrillic text.
+
+    Words are only drawn one by one while building pools of sentences, titles
+    and paragraphs; longer texts are assembled from the pools, which keeps
+    generating millions of rows fast.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.sentences = [self._words(rng.randint(6, 18)).capitalize() + '.' for _ in range(SENTENCE_POOL_SIZE)]
+        self.titles = [self._words(rng.randint(3, 8)).title() for _ in range(SENTENCE_POOL_SIZE)]
+        self.paragraphs = [self.text(3, 8) for _ in range(PARAGRAPH_POOL_SIZE)]
+
+    def _words(self, count):
+        vocabulary = CYRILLIC_WORDS if self.rng.random() < 0.4 else LATIN_WORDS
+        return ' '.join(self.rng.choices(vocabulary, k=count))
+
+    def title(self):
+        return self.rng.choice(self.titles)
+
+    def text(self, low, high):
+        """Between ``low`` and ``high`` sentences"""
+        return ' '.join(self.rng.choices(self.sentences, k=self.rng.randint(low, high)))
+
+    def article(self, low=5, high=40):
+        """Between ``low`` and ``high`` paragraphs"""
+        return '\n\n'.join(self.rng.choices(self.paragraphs, k=self.rng.randint(low, high)))
+
+    def name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+def row_counts(scale, rows):
+    """Rows to create per generated table: CARDINALITIES x scale, then overrides"""
+    counts = {table: int(count * scale) for table, count in CARDINALITIES.items()}
+    counts.update(rows or {})
+    return counts
+
+def batches(rows, size=BATCH_SIZE):
+    """Split an iterable into lists of at most ``size`` rows"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def sampled(samples, count, generate):
+    """The hand-written samples first, then generated rows up to ``count``"""
+    for index in range(count):
+        yield samples[index] if index < len(samples) else generate(index)
+
+def add_sample_data(scale=1, seed=DEFAULT_SEED, rows=None, base_date=None, throwaway=False):
+    """
+    Add sample data to the database for testing and demonstration purposes.
+
+    The bulk tables get CARDINALITIES x ``scale`` rows (``rows`` overrides
+    single tables). Output only depends on ``seed`` and ``base_date``, so the
+    same arguments always produce the same data. Rows are written with
+    executemany in a single transaction and the secondary indexes are
+    rebuilt after the load. With ``throwaway`` (a scratch database, e.g.
+    for benchmarks) journaling and syncs are turned off, so a crash during
+    the load can corrupt the file.
+    """
     # Connect to SQLite database
     db_path = os.environ.get('DATABASE_PATH', 'database.db')
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
 
-    # Current timestamp for created_at fields
-    now = datetime.datetime.now().isoformat()
-    
+    rng = random.Random(seed)
+    text = TextGenerator(rng)
+    base_date = base_date or DEFAULT_BASE_DATE
+    counts = row_counts(scale, rows)
+
+    def timestamp(days=DATE_SPAN_DAYS):
+        return (base_date - datetime.timedelta(seconds=rng.randrange(days * 86400))).isoformat()
+
+    def views(scale=50):
+        # Power law: most items have few views, a handful have very many
+        return int((rng.paretovariate(1.2) - 1) * scale)
+
+    def next_id(table):
+        c.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+        return c.fetchone()[0]
+
     # Check if database is initialized
     try:
         c.execute("SELECT COUNT(*) FROM admin_users")
@@ -23,6 +166,13 @@ def add_sample_data():
 
     print("Adding sample data to the database...")
 
+    # Indexes are rebuilt at the end. The journal mode (WAL on a live
+    # database) is left alone unless the file may be lost.
+    if throwaway:
+        c.execute("PRAGMA synchronous = OFF")
+        c.execute("PRAGMA journal_mode = MEMORY")
+    drop_indexes(c)
+
     # ===================== MENU =====================
     menu_items = [
         ("Home", "home"),
@@ -31,10 +181,9 @@ def add_sample_data():
         ("Blog", "book-open"),
         ("Contact", "mail")
     ]
-    
-    for name, icon in menu_items:
-        c.execute("INSERT INTO menu (name, icon) VALUES (?, ?)", (name, icon))
-    
+
+    c.executemany("INSERT INTO menu (name, icon) VALUES (?, ?)", menu_items)
+
     print("Added menu items")
 
     # ===================== YEAR NAME =====================
@@ -42,10 +191,9 @@ def add_sample_data():
         ("Year of Innovation", "innovation.jpg"),
         ("Year of Digital Transformation", "digital.jpg")
     ]
-    
-    for text, img in year_names:
-        c.execute("INSERT INTO year_name (text, img) VALUES (?, ?)", (text, img))
-    
+
+    c.executemany("INSERT INTO year_name (text, img) VALUES (?, ?)", year_names)
+
     print("Added year names")
 
     # ===================== CONTACTS =====================
@@ -54,12 +202,12 @@ def add_sample_data():
         "phone_number": "+998 71 123 4567",
         "email": "info@loyha.uz"
     }
-    
+
     c.execute(
         "INSERT INTO contacts (address, phone_number, email) VALUES (?, ?, ?)",
         (contacts["address"], contacts["phone_number"], contacts["email"])
     )
-    
+
     print("Added contacts")
 
     # ===================== SOCIAL NETWORKS =====================
@@ -69,18 +217,12 @@ def add_sample_data():
         ("Telegram", "send", "https://t.me/loyha"),
         ("LinkedIn", "linkedin", "https://linkedin.com/company/loyha")
     ]
-    
-    for name, icon, link in social_networks:
-        c.execute(
-            "INSERT INTO social_networks (name, icon, link) VALUES (?, ?, ?)",
-            (name, icon, link)
-        )
-    
+
+    c.executemany("INSERT INTO social_networks (name, icon, link) VALUES (?, ?, ?)", social_networks)
+
     print("Added social networks")
 
     # ===================== FEEDBACK =====================
-    feedback_themes = ["General Inquiry", "Technical Support", "Partnership", "Job Application", "Suggestion"]
-    
     feedback_items = [
         ("John Doe", "+998 90 123 4567", "john@example.com", "General Inquiry", "I'm interested in your services. Please contact me for more information."),
         ("Jane Smith", "+998 91 234 5678", "jane@example.com", "Technical Support", "I'm having trouble accessing my account. Can you help?"),
@@ -88,15 +230,24 @@ def add_sample_data():
         ("Alice Brown", "+998 94 456 7890", "alice@example.com", "Job Application", "I'm interested in the developer position advertised on your website."),
         ("David Wilson", "+998 95 567 8901", "david@example.com", "Suggestion", "I have a suggestion for improving your website navigation.")
     ]
-    
-    for full_name, phone_number, email, theme, text in feedback_items:
-        timestamp = (datetime.datetime.now() - datetime.timedelta(days=random.randint(1, 30))).isoformat()
-        c.execute(
-            "INSERT INTO feedback (full_name, phone_number, email, theme, text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (full_name, phone_number, email, theme, text, timestamp)
+
+    def generate_feedback(index):
+        return (
+            text.name(),
+            f"+998 9{rng.randint(0, 9)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            f"user{index}@example.com",
+            rng.choices(FEEDBACK_THEMES, FEEDBACK_THEME_WEIGHTS)[0],
+            text.text(1, 6)
         )
-    
-    print("Added feedback items")
+
+    first_feedback_id = next_id('feedback')
+    c.executemany(
+        "INSERT INTO feedback (full_name, phone_number, email, theme, text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (row + (timestamp(),) for row in sampled(feedback_items, counts['feedback'], generate_feedback))
+    )
+    last_feedback_id = next_id('feedback') - 1
+
+    print(f"Added {counts['feedback']} feedback items")
 
     # ===================== STAFF =====================
     staff_members = [
@@ -106,14 +257,19 @@ def add_sample_data():
         ("Lead Developer", "Timur Rakhimov", "timur@loyha.uz", "+998 71 123 4570", "timur.jpg"),
         ("UI/UX Designer", "Kamila Yusupova", "kamila@loyha.uz", "+998 71 123 4571", "kamila.jpg")
     ]
-    
-    for position, full_name, email, phone, photo in staff_members:
-        c.execute(
-            "INSERT INTO staff (position, full_name, email, phone, photo) VALUES (?, ?, ?, ?, ?)",
-            (position, full_name, email, phone, photo)
+
+    def generate_staff(index):
+        return (
+            rng.choice(POSITIONS), text.name(), f"staff{index}@loyha.uz",
+            f"+998 71 {rng.randint(100, 999)} {rng.randint(1000, 9999)}", f"staff{index}.jpg"
         )
-    
-    print("Added staff members")
+
+    c.executemany(
+        "INSERT INTO staff (position, full_name, email, phone, photo) VALUES (?, ?, ?, ?, ?)",
+        sampled(staff_members, counts['staff'], generate_staff)
+    )
+
+    print(f"Added {counts['staff']} staff members")
 
     # ===================== BLOG =====================
     blog_categories = [
@@ -123,75 +279,93 @@ def add_sample_data():
         "Development",
         "Industry News"
     ]
-    
-    for name in blog_categories:
-        c.execute("INSERT INTO blog_categories (name) VALUES (?)", (name,))
-    
-    # Get the inserted category IDs
-    c.execute("SELECT id FROM blog_categories")
-    category_ids = [row['id'] for row in c.fetchall()]
-    
+
+    first_category_id = next_id('blog_categories')
+    c.executemany("INSERT INTO blog_categories (name) VALUES (?)", [(name,) for name in blog_categories])
+    category_ids = list(range(first_category_id, first_category_id + len(blog_categories)))
+
     blog_items = [
-        (category_ids[0], "The Future of Web Development", "web-future.jpg", 
-         "Web development is constantly evolving. Here's what to expect in the coming years.", 
+        (category_ids[0], "The Future of Web Development", "web-future.jpg",
+         "Web development is constantly evolving. Here's what to expect in the coming years.",
          "In this article, we explore the emerging trends in web development and how they will shape the future of the industry."),
-        
-        (category_ids[1], "Business Strategies for Tech Startups", "startup.jpg", 
-         "Effective strategies for tech startups to grow and succeed in a competitive market.", 
+
+        (category_ids[1], "Business Strategies for Tech Startups", "startup.jpg",
+         "Effective strategies for tech startups to grow and succeed in a competitive market.",
          "Starting a tech company is challenging. This article provides practical advice for entrepreneurs looking to make their mark."),
-        
-        (category_ids[2], "Principles of Modern UI Design", "ui-design.jpg", 
-         "Key principles that guide effective and user-friendly interface design.", 
+
+        (category_ids[2], "Principles of Modern UI Design", "ui-design.jpg",
+         "Key principles that guide effective and user-friendly interface design.",
          "Good UI design is essential for user engagement. Learn the fundamental principles that make interfaces intuitive and appealing."),
-        
-        (category_ids[3], "Introduction to Microservices Architecture", "microservices.jpg", 
-         "Understanding the basics of microservices and how they differ from monolithic architectures.", 
+
+        (category_ids[3], "Introduction to Microservices Architecture", "microservices.jpg",
+         "Understanding the basics of microservices and how they differ from monolithic architectures.",
          "Microservices are changing how we build applications. This article introduces the concept and its benefits."),
-        
-        (category_ids[4], "Latest Developments in AI and Machine Learning", "ai-ml.jpg", 
-         "Recent breakthroughs in artificial intelligence and their implications for various industries.", 
+
+        (category_ids[4], "Latest Developments in AI and Machine Learning", "ai-ml.jpg",
+         "Recent breakthroughs in artificial intelligence and their implications for various industries.",
          "AI continues to advance at a rapid pace. Stay updated with the latest developments and their potential impact.")
     ]
-    
-    for category_id, title, img, intro_text, text in blog_items:
-        timestamp = (datetime.datetime.now() - datetime.timedelta(days=random.randint(1, 60))).isoformat()
-        views = random.randint(10, 500)
-        c.execute(
-            """INSERT INTO blog_items 
-               (category_id, title, img_or_video_link, date_time, views, text, intro_text) 
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (category_id, title, img, timestamp, views, text, intro_text)
+
+    first_generated_id = next_id('blog_items') + len(blog_items)
+
+    def generate_blog_item(index):
+        return (
+            rng.choice(category_ids), text.title(), f"blog-{index}.jpg",
+            text.text(1, 3), text.article()
         )
-    
-    print("Added blog categories and items")
+
+    # Items and bodies are written batch by batch with ids assigned up front
+    item_id = next_id('blog_items')
+    for batch in batches(sampled(blog_items, counts['blog_items'], generate_blog_item)):
+        ids = range(item_id, item_id + len(batch))
+        item_id += len(batch)
+        items = []
+        for row_id, (category_id, title, img, intro_text, _) in zip(ids, batch):
+            date_time, item_views = timestamp(), views()
+            deleted = int(row_id >= first_generated_id and rng.random() < DELETED_RATIO)
+            items.append((row_id, category_id, title, img, date_time, item_views, intro_text, deleted,
+                          base_date.isoformat() if deleted else None))
+        c.executemany(
+            """INSERT INTO blog_items
+               (id, category_id, title, img_or_video_link, date_time, views, intro_text, is_deleted, deleted_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            items
+        )
+        c.executemany(
+            "INSERT INTO blog_item_bodies (item_id, text) VALUES (?, ?)",
+            [(row_id, row[4]) for row_id, row in zip(ids, batch)]
+        )
+
+    print(f"Added blog categories and {counts['blog_items']} items")
 
     # ===================== ABOUT COMPANY =====================
     about_company = {
         "title": "About Loyha.uz",
         "img": "company.jpg",
         "text": """
-        Loyha.uz is a leading technology company in Uzbekistan, specializing in web development, 
-        mobile applications, and digital transformation services. Founded in 2015, we have grown 
+        Loyha.uz is a leading technology company in Uzbekistan, specializing in web development,
+        mobile applications, and digital transformation services. Founded in 2015, we have grown
         to become a trusted partner for businesses seeking innovative digital solutions.
-        
-        Our team of experienced professionals is dedicated to delivering high-quality products 
-        that meet the unique needs of our clients. We combine technical expertise with creative 
+
+        Our team of experienced professionals is dedicated to delivering high-quality products
+        that meet the unique needs of our clients. We combine technical expertise with creative
         thinking to solve complex problems and create exceptional user experiences.
-        
-        At Loyha.uz, we believe in continuous learning and staying at the forefront of technological 
-        advancements. This commitment to excellence has allowed us to build long-lasting relationships 
+
+        At Loyha.uz, we believe in continuous learning and staying at the forefront of technological
+        advancements. This commitment to excellence has allowed us to build long-lasting relationships
         with our clients and establish ourselves as industry leaders.
         """
     }
-    
-    timestamp = (datetime.datetime.now() - datetime.timedelta(days=random.randint(1, 30))).isoformat()
-    views = random.randint(100, 1000)
-    
+
+    c.execute(
+        "INSERT INTO about_company (title, img, date_time, views) VALUES (?, ?, ?, ?)",
+        (about_company["title"], about_company["img"], timestamp(30), views(500))
+    )
     c.execute(
-        "INSERT INTO about_company (title, img, date_time, views, text) VALUES (?, ?, ?, ?, ?)",
-        (about_company["title"], about_company["img"], timestamp, views, about_company["text"])
+        "INSERT INTO about_company_bodies (item_id, text) VALUES (?, ?)",
+        (c.lastrowid, about_company["text"])
     )
-    
+
     # About company categories
     about_company_categories = [
         "Our Mission",
@@ -200,61 +374,64 @@ def add_sample_data():
         "Our History",
         "Our Team"
     ]
-    
-    for name in about_company_categories:
-        c.execute("INSERT INTO about_company_categories (name) VALUES (?)", (name,))
-    
-    # Get the inserted category IDs
-    c.execute("SELECT id FROM about_company_categories")
-    about_category_ids = [row['id'] for row in c.fetchall()]
-    
+
+    first_category_id = next_id('about_company_categories')
+    c.executemany("INSERT INTO about_company_categories (name) VALUES (?)", [(name,) for name in about_company_categories])
+    about_category_ids = list(range(first_category_id, first_category_id + len(about_company_categories)))
+
     # About company category items
     about_company_items = [
-        (about_category_ids[0], "Our Mission", 
+        (about_category_ids[0], "Our Mission",
          "Our mission is to empower businesses through innovative digital solutions that drive growth and success."),
-        
-        (about_category_ids[1], "Our Vision", 
+
+        (about_category_ids[1], "Our Vision",
          "We envision a future where technology enhances every aspect of business and daily life, making processes more efficient and experiences more enjoyable."),
-        
-        (about_category_ids[2], "Excellence", 
+
+        (about_category_ids[2], "Excellence",
          "We strive for excellence in everything we do, from code quality to customer service."),
-        
-        (about_category_ids[2], "Innovation", 
+
+        (about_category_ids[2], "Innovation",
          "We embrace innovation and continuously explore new technologies and approaches."),
-        
-        (about_category_ids[2], "Integrity", 
+
+        (about_category_ids[2], "Integrity",
          "We conduct our business with integrity, honesty, and transparency."),
-        
-        (about_category_ids[3], "The Beginning", 
+
+        (about_category_ids[3], "The Beginning",
          "Loyha.uz was founded in 2015 by a group of passionate developers with a vision to transform the digital landscape in Uzbekistan."),
-        
-        (about_category_ids[3], "Growth and Expansion", 
+
+        (about_category_ids[3], "Growth and Expansion",
          "By 2018, we had expanded our team to 20 professionals and moved to a larger office space to accommodate our growing operations."),
-        
-        (about_category_ids[4], "Leadership", 
+
+        (about_category_ids[4], "Leadership",
          "Our leadership team brings decades of combined experience in technology, business, and design.")
     ]
-    
-    for category_id, title, text in about_company_items:
-        timestamp = (datetime.datetime.now() - datetime.timedelta(days=random.randint(1, 45))).isoformat()
-        views = random.randint(50, 300)
-        
-        # For some items, associate with feedback
-        feedback_id = None
-        if random.random() > 0.7:  # 30% chance to have associated feedback
-            c.execute("SELECT id FROM feedback ORDER BY RANDOM() LIMIT 1")
-            feedback_row = c.fetchone()
-            if feedback_row:
-                feedback_id = feedback_row['id']
-        
-        c.execute(
-            """INSERT INTO about_company_category_items 
-               (category_id, title, text, views, date_time, feedback_id) 
+
+    def generate_about_item(index):
+        return (rng.choice(about_category_ids), text.title(), text.article(1, 6))
+
+    def feedback_link():
+        # 30% of items have associated feedback
+        if last_feedback_id >= first_feedback_id and rng.random() > 0.7:
+            return rng.randint(first_feedback_id, last_feedback_id)
+        return None
+
+    item_id = next_id('about_company_category_items')
+    for batch in batches(sampled(about_company_items, counts['about_company_category_items'], generate_about_item)):
+        ids = range(item_id, item_id + len(batch))
+        item_id += len(batch)
+        c.executemany(
+            """INSERT INTO about_company_category_items
+               (id, category_id, title, views, date_time, feedback_id)
                VALUES (?, ?, ?, ?, ?, ?)""",
-            (category_id, title, text, views, timestamp, feedback_id)
+            [(row_id, category_id, title, views(), timestamp(), feedback_link())
+             for row_id, (category_id, title, _) in zip(ids, batch)]
+        )
+        c.executemany(
+            "INSERT INTO about_company_category_item_bodies (item_id, text) VALUES (?, ?)",
+            [(row_id, row[2]) for row_id, row in zip(ids, batch)]
         )
-    
-    print("Added about company information")
+
+    print(f"Added about company information and {counts['about_company_category_items']} items")
 
     # ===================== DOCUMENTS =====================
     document_categories = [
@@ -264,39 +441,42 @@ def add_sample_data():
         "Reports",
         "Presentations"
     ]
-    
-    for name in document_categories:
-        c.execute("INSERT INTO documents_categories (name) VALUES (?)", (name,))
-    
-    # Get the inserted category IDs
-    c.execute("SELECT id FROM documents_categories")
-    doc_category_ids = [row['id'] for row in c.fetchall()]
-    
+
+    first_category_id = next_id('documents_categories')
+    c.executemany("INSERT INTO documents_categories (name) VALUES (?)", [(name,) for name in document_categories])
+    doc_category_ids = list(range(first_category_id, first_category_id + len(document_categories)))
+
     documents = [
         (doc_category_ids[0], "Privacy Policy", "Privacy Policy", "privacy-policy.pdf"),
         (doc_category_ids[0], "Terms of Service", "Terms of Service", "terms-of-service.pdf"),
         (doc_category_ids[0], "Cookie Policy", "Cookie Policy", "cookie-policy.pdf"),
-        
+
         (doc_category_ids[1], "Brand Guidelines", "Brand Guidelines", "brand-guidelines.pdf"),
         (doc_category_ids[1], "Development Standards", "Development Standards", "dev-standards.pdf"),
-        
+
         (doc_category_ids[2], "Project Proposal Template", "Project Proposal", "project-proposal-template.docx"),
         (doc_category_ids[2], "Invoice Template", "Invoice", "invoice-template.xlsx"),
-        
+
         (doc_category_ids[3], "Annual Report 2022", "Annual Report 2022", "annual-report-2022.pdf"),
         (doc_category_ids[3], "Q1 2023 Performance", "Q1 2023 Report", "q1-2023-report.pdf"),
-        
+
         (doc_category_ids[4], "Company Overview", "Company Overview", "company-overview.pptx"),
         (doc_category_ids[4], "Service Offerings", "Service Offerings", "service-offerings.pptx")
     ]
-    
-    for category_id, title, name, link in documents:
-        c.execute(
-            "INSERT INTO documents_items (category_id, title, name, link) VALUES (?, ?, ?, ?)",
-            (category_id, title, name, link)
+
+    def generate_document(index):
+        title = text.title()
+        return (
+            rng.choice(doc_category_ids), title, title,
+            f"document-{index}.{rng.choice(DOCUMENT_EXTENSIONS)}"
         )
-    
-    print("Added document categories and items")
+
+    c.executemany(
+        "INSERT INTO documents_items (category_id, title, name, link) VALUES (?, ?, ?, ?)",
+        sampled(documents, counts['documents_items'], generate_document)
+    )
+
+    print(f"Added document categories and {counts['documents_items']} items")
 
     # ===================== MENU LINKS =====================
     # Link menu items to content
@@ -307,22 +487,65 @@ def add_sample_data():
         (4, "blog", None, "Blog", 4),  # Blog
         (5, "contact", None, "Contact", 5)  # Contact
     ]
-    
-    for menu_id, target_type, target_id, label, position in menu_links:
-        c.execute(
-            """INSERT INTO menu_links 
-               (menu_id, target_type, target_id, label, position) 
-               VALUES (?, ?, ?, ?, ?)""",
-            (menu_id, target_type, target_id, label, position)
-        )
-    
+
+    c.executemany(
+        """INSERT INTO menu_links
+           (menu_id, target_type, target_id, label, position)
+           VALUES (?, ?, ?, ?, ?)""",
+        menu_links
+    )
+
     print("Added menu links")
 
+    # Render pre-serialized list fragments for the new rows
+    for table in JSON_CACHE_TABLES:
+        refresh_json_cache(c, table)
+
+    create_indexes(c)
+
+    # Running servers drop what they cached from the old data. The rows are
+    # not logged one by one; clients sync a seeded database from scratch.
+    tables = c.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name != 'cache_versions'"
+    ).fetchall()
+    for (table,) in tables:
+        record_write(c, table, action='seed')
+
     # Commit changes and close connection
     conn.commit()
+    c.execute("ANALYZE")
     conn.close()
-    
+
     print("Sample data added successfully!")
 
+def parse_rows(values):
+    """Parse repeated TABLE=COUNT arguments"""
+    rows = {}
+    for value in values or []:
+        table, _, count = value.partition('=')
+        if table not in CARDINALITIES or not count.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"Invalid --rows value '{value}', expected TABLE=COUNT with TABLE one of: {', '.join(CARDINALITIES)}"
+            )
+        rows[table] = int(count)
+    return rows
+
 if __name__ == "__main__":
-    add_sample_data()
+    parser = argparse.ArgumentParser(description="Add generated sample data to the database")
+    parser.add_argument('--scale', type=float, default=1,
+                        help='Multiplier for the per-table row counts (default 1: the hand-written samples)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Random seed')
+    parser.add_argument('--rows', action='append', metavar='TABLE=COUNT',
+                        help='Row count for a single table, overrides --scale (repeatable)')
+    parser.add_argument('--base-date', type=datetime.datetime.fromisoformat,
+                        help='Generated dates lie in the five years before this date (default 2025-01-01)')
+    parser.add_argument('--throwaway', action='store_true',
+                        help='Skip journaling and syncs for a scratch database (a crash can corrupt it)')
+    args = parser.parse_args()
+
+    try:
+        rows = parse_rows(args.rows)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    add_sample_data(args.scale, args.seed, rows, args.base_date, args.throwaway)
@@ -8,17 +8,51 @@ import datetime
 import jwt
 import functools
 from cors_config import configure_cors
+from compression import configure_compression
+from traffic_recorder import configure_traffic_recorder
+from serializers import RowsJSONProvider
+from json_cache import refresh_json_cache
+from init_db import migrate
+from snapshot import configure_snapshot, is_snapshot_request
+from maintenance import configure_maintenance
+from jobs import configure_jobs
+from archive import DEFAULT_BATCH_SIZE, default_archive_path, parse_retention, unarchive
+from cache_versions import configure_cache_versions
+from response_cache import configure_response_cache
+from event_stream import configure_event_stream
+from view_analytics import configure_view_counter
+from validation import configure_request_validation
+from write_hooks import record_write
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# JSON provider with a fast path for pre-serialized list rows
+app.json = RowsJSONProvider(app)
+
+# Response compression. Registered before CORS because after_request hooks
+# run in reverse order, so it sees the Vary header CORS adds.
+configure_compression(app)
+
 # Configure CORS before any other setup
 configure_cors(app)
 
+# Opt-in request recording for replay benchmarks (TRAFFIC_LOG)
+configure_traffic_recorder(app)
+
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
 app.config['DATABASE_PATH'] = os.environ.get('DATABASE_PATH', 'database.db')
 app.config['JWT_EXPIRATION_DELTA'] = datetime.timedelta(days=1)
+app.config['BACKUP_DIR'] = os.environ.get('BACKUP_DIR', 'backups')
+app.config['BACKUP_KEEP'] = int(os.environ.get('BACKUP_KEEP', 7))
+app.config['ARCHIVE_PATH'] = os.environ.get('ARCHIVE_PATH') or default_archive_path(app.config['DATABASE_PATH'])
+app.config['ARCHIVE_RETENTION'] = parse_retention(os.environ.get('ARCHIVE_RETENTION'))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.environ.get('ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+# Databases from an older version get the tables and columns added since,
+# before anything reads them
+migrate(app.config['DATABASE_PATH'])
 
 # Initialize Swagger documentation
 swagger_config = {
@@ -38,9 +72,32 @@ swagger_config = {
 
 swagger = Swagger(app, config=swagger_config)
 
+# Cache versions keep per-process caches coherent across workers
+cache_versions = configure_cache_versions(app)
+
+# Optional in-memory mirror of the database for anonymous reads
+snapshot = configure_snapshot(app, cache_versions)
+
+# Optional in-memory cache of anonymous GET responses
+configure_response_cache(app, cache_versions)
+
+# Server-sent events for new feedback (/api/feedback/stream)
+configure_event_stream(app, cache_versions)
+
+# Buffered view counters and per-day view analytics
+configure_view_counter(app)
+
+# Optional background ANALYZE, optimize, incremental vacuum and checkpoints
+configure_maintenance(app)
+
+# Background job queue stored in the database (notifications, cleanup)
+configure_jobs(app)
+
 # Database connection
 def get_db():
     db = getattr(g, '_database', None)
+    if db is None and snapshot is not None and is_snapshot_request(request):
+        db = g._database = snapshot.connect()
     if db is None:
         db = g._database = sqlite3.connect(app.config['DATABASE_PATH'])
         db.row_factory = sqlite3.Row
@@ -55,6 +112,16 @@ def close_connection(exception):
         db.close()
 
 # Authentication middleware
+def token_payload():
+    """The decoded bearer token of the request, or None when it is missing or invalid"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    try:
+        return jwt.decode(auth_header[7:], app.config['SECRET_KEY'], algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+
 def token_required(f):
     @functools.wraps(f)
     def decorator(*args, **kwargs):
@@ -82,6 +149,8 @@ def token_required(f):
             return jsonify({'message': 'Invalid token!'}), 401
             
         return f(current_user, *args, **kwargs)
+    # Lets before_request hooks tell protected views apart
+    decorator.requires_token = True
     return decorator
 
 # Special handler for OPTIONS requests
@@ -115,11 +184,16 @@ def login():
         required: true
         schema:
           type: object
+          required:
+            - username
+            - password
           properties:
             username:
               type: string
+              minLength: 1
             password:
               type: string
+              minLength: 1
     responses:
       200:
         description: Login successful
@@ -179,11 +253,16 @@ def register(current_user):
         required: true
         schema:
           type: object
+          required:
+            - username
+            - password
           properties:
             username:
               type: string
+              minLength: 1
             password:
               type: string
+              minLength: 1
             role:
               type: string
               default: admin
@@ -221,6 +300,7 @@ def register(current_user):
         "INSERT INTO admin_users (username, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
         (data['username'], password_hash, role, now)
     )
+    record_write(db, 'admin_users', cur.lastrowid, 'create')
     db.commit()
     
     return jsonify({'message': 'User created successfully'}), 201
@@ -273,13 +353,16 @@ def restore_item(current_user, table_name, item_id):
     db = get_db()
     cur = db.cursor()
     
-    # Check if item exists and is deleted
+    # Check if item exists and is deleted; rows deleted long ago are moved
+    # back from the archive database first
     cur.execute(f"SELECT id FROM {table_name} WHERE id = ? AND is_deleted = 1", (item_id,))
-    if not cur.fetchone():
+    if not cur.fetchone() and not unarchive(db, app.config['ARCHIVE_PATH'], table_name, item_id):
         return jsonify({'message': 'Item not found or not deleted'}), 404
     
     # Restore item
-    cur.execute(f"UPDATE {table_name} SET is_deleted = 0 WHERE id = ?", (item_id,))
+    cur.execute(f"UPDATE {table_name} SET is_deleted = 0, deleted_at = NULL WHERE id = ?", (item_id,))
+    refresh_json_cache(db, table_name, 'id', item_id)
+    record_write(db, table_name, item_id, 'restore')
     db.commit()
     
     return jsonify({'message': f'Item restored in {table_name}'})
@@ -322,6 +405,11 @@ from routes.blog import register_blog_routes
 from routes.about_company import register_about_company_routes
 from routes.documents import register_documents_routes
 from routes.admin import register_admin_routes
+from routes.backups import register_backup_routes
+from routes.maintenance import register_maintenance_routes
+from routes.changes import register_changes_routes
+from routes.analytics import register_analytics_routes
+from routes.jobs import register_jobs_routes
 
 register_menu_routes(app, get_db, token_required)
 register_year_name_routes(app, get_db, token_required)
@@ -333,6 +421,15 @@ register_blog_routes(app, get_db, token_required)
 register_about_company_routes(app, get_db, token_required)
 register_documents_routes(app, get_db, token_required)
 register_admin_routes(app, get_db, token_required)
+register_backup_routes(app, get_db, token_required)
+register_maintenance_routes(app, get_db, token_required)
+register_changes_routes(app, get_db, token_required)
+register_analytics_routes(app, get_db, token_required)
+register_jobs_routes(app, get_db, token_required)
+
+# Reject bodies that do not match the route docstring schemas before the
+# views (and the database) are reached
+configure_request_validation(app, lambda: token_payload() is not None)
 
 if __name__ == '__main__':
     app.run(debug=True)
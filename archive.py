@@ -0,0 +1,237 @@
+import sqlite3
+import os
+import argparse
+import contextlib
+import datetime
+import time
+from write_hooks import BODY_TABLES, record_write
+
+# Days a row stays soft-deleted in the main database before it is moved to
+# the archive, for every table /api/restore can restore (0 keeps it).
+# Tables referencing others come first, so one run can archive a row and
+# then the parent it was the last reference to.
+DEFAULT_RETENTION_DAYS = {
+    'about_company_category_items': 90,
+    'blog_items': 90,
+    'documents_items': 90,
+    'about_company_categories': 90,
+    'feedback': 30,
+    'blog_categories': 90,
+    'documents_categories': 90,
+    'menu': 90,
+    'year_name': 90,
+    'contacts': 90,
+    'social_networks': 90,
+    'staff': 90,
+    'about_company': 90,
+    'admin_users': 365
+}
+
+# Rows moved per transaction, and the pause between transactions during
+# which requests can take the write lock
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_PAUSE = 0.05
+
+ARCHIVE_SCHEMA = 'archive'
+
+def default_archive_path(db_path):
+    root, ext = os.path.splitext(db_path)
+    return f"{root}-archive{ext or '.db'}"
+
+def parse_retention(spec):
+    """
+    Retention days per table from DEFAULT_RETENTION_DAYS, overridden by a
+    ``table=days,...`` string such as ``feedback=7,admin_users=0``.
+    """
+    retention = dict(DEFAULT_RETENTION_DAYS)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        table, _, days = item.partition('=')
+        table = table.strip()
+        if table not in retention:
+            raise ValueError(f"Unknown table in archive retention: {table}")
+        retention[table] = float(days)
+    return retention
+
+@contextlib.contextmanager
+def attached(db, path):
+    """Attach the archive database at ``path`` to ``db`` as ``archive``"""
+    db.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+    try:
+        yield db
+    finally:
+        # DETACH fails inside a transaction; only left open by an error
+        if db.in_transaction:
+            db.rollback()
+        db.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+def table_columns(db, schema, table):
+    """(name, type, primary key) of the columns of ``schema.table``"""
+    return [(row[1], row[2], row[5]) for row in db.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+def ensure_archive_table(db, table):
+    """
+    Create ``table`` in the archive with the columns of the main table plus
+    archived_at, adding columns the main table gained since. Returns the
+    names of the main table's columns.
+    """
+    columns = table_columns(db, 'main', table)
+    archived = {name for name, _, _ in table_columns(db, ARCHIVE_SCHEMA, table)}
+    if not archived:
+        definitions = [f"{name} {type_}" + (' PRIMARY KEY' if pk else '') for name, type_, pk in columns]
+        db.execute(f"CREATE TABLE {ARCHIVE_SCHEMA}.{table} ({', '.join(definitions)}, archived_at TIMESTAMP)")
+    else:
+        for name, type_, _ in columns:
+            if name not in archived:
+                db.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {name} {type_}")
+    return [name for name, _, _ in columns]
+
+def references(db, table):
+    """(table, column) pairs with a foreign key to ``table``, other than its bodies"""
+    bodies = {bodies_table for bodies_table, _ in BODY_TABLES.values()}
+    found = []
+    for (child,) in db.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'").fetchall():
+        if child in bodies:
+            continue
+        for row in db.execute(f"PRAGMA main.foreign_key_list({child})").fetchall():
+            if row[2] == table:
+                found.append((child, row[3]))
+    return found
+
+def archive_table(db, table, days, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE, now=None):
+    """
+    Move rows of ``table`` soft-deleted more than ``days`` ago, with their
+    bodies, into the attached archive, ``batch_size`` rows per transaction.
+    Rows still referenced by another row stay. Returns the number moved.
+    """
+    now = now or datetime.datetime.now()
+    cutoff = (now - datetime.timedelta(days=days)).isoformat()
+    columns = ', '.join(ensure_archive_table(db, table))
+    bodies_table = BODY_TABLES[table][0] if table in BODY_TABLES else None
+    if bodies_table:
+        body_columns = ', '.join(ensure_archive_table(db, bodies_table))
+    referenced = ''.join(
+        f" AND NOT EXISTS (SELECT 1 FROM main.{child} r WHERE r.{column} = t.id)"
+        for child, column in references(db, table)
+    )
+
+    moved = 0
+    while True:
+        ids = [row[0] for row in db.execute(
+            f"SELECT t.id FROM main.{table} t WHERE t.is_deleted = 1 AND t.deleted_at < ?{referenced} LIMIT ?",
+            (cutoff, batch_size)
+        ).fetchall()]
+        if not ids:
+            break
+        marks = ', '.join('?' * len(ids))
+        archived_at = datetime.datetime.now().isoformat()
+        # With a WAL main database the two files commit separately; REPLACE
+        # makes a batch that reached only the archive safe to move again
+        db.execute(
+            f"""INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.{table} ({columns}, archived_at)
+                SELECT {columns}, ? FROM main.{table} WHERE id IN ({marks})""",
+            [archived_at, *ids]
+        )
+        if bodies_table:
+            db.execute(
+                f"""INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.{bodies_table} ({body_columns}, archived_at)
+                    SELECT {body_columns}, ? FROM main.{bodies_table} WHERE item_id IN ({marks})""",
+                [archived_at, *ids]
+            )
+            db.execute(f"DELETE FROM main.{bodies_table} WHERE item_id IN ({marks})", ids)
+        db.execute(f"DELETE FROM main.{table} WHERE id IN ({marks})", ids)
+        record_write(db, table, action='archive')
+        db.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return moved
+
+def archive_deleted_rows(db, archive_path, retention=None, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE):
+    """
+    Apply the retention policy: move expired soft-deleted rows of every
+    table into the archive database at ``archive_path``. Returns the number
+    of rows moved per table.
+    """
+    retention = retention or DEFAULT_RETENTION_DAYS
+    moved = {}
+    with attached(db, archive_path):
+        for table in DEFAULT_RETENTION_DAYS:
+            if retention.get(table, 0) > 0:
+                moved[table] = archive_table(db, table, retention[table], batch_size, pause)
+    return moved
+
+def _unarchive_row(db, table, item_id):
+    if not table_columns(db, ARCHIVE_SCHEMA, table):
+        return False
+    if db.execute(f"SELECT 1 FROM main.{table} WHERE id = ?", (item_id,)).fetchone():
+        return False
+    cur = db.execute(f"SELECT * FROM {ARCHIVE_SCHEMA}.{table} WHERE id = ?", (item_id,))
+    row = cur.fetchone()
+    if row is None:
+        return False
+    row = dict(zip([column[0] for column in cur.description], row))
+
+    # Archived parents come back first (still deleted), so foreign keys hold
+    for fk in db.execute(f"PRAGMA main.foreign_key_list({table})").fetchall():
+        parent, column = fk[2], fk[3]
+        if row.get(column) is not None:
+            _unarchive_row(db, parent, row[column])
+
+    archived = {name for name, _, _ in table_columns(db, ARCHIVE_SCHEMA, table)}
+    columns = ', '.join(name for name, _, _ in table_columns(db, 'main', table) if name in archived)
+    db.execute(
+        f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM {ARCHIVE_SCHEMA}.{table} WHERE id = ?",
+        (item_id,)
+    )
+    if table in BODY_TABLES:
+        bodies_table = BODY_TABLES[table][0]
+        if table_columns(db, ARCHIVE_SCHEMA, bodies_table):
+            db.execute(
+                f"""INSERT INTO main.{bodies_table} (item_id, text)
+                    SELECT item_id, text FROM {ARCHIVE_SCHEMA}.{bodies_table} WHERE item_id = ?""",
+                (item_id,)
+            )
+            db.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.{bodies_table} WHERE item_id = ?", (item_id,))
+    db.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.{table} WHERE id = ?", (item_id,))
+    record_write(db, table, item_id, 'unarchive')
+    return True
+
+def unarchive(db, archive_path, table, item_id):
+    """
+    Move an archived row of ``table`` (and any archived rows it references)
+    back into the main database, still soft-deleted. Returns False when the
+    archive does not have it.
+    """
+    if not os.path.exists(archive_path):
+        return False
+    with attached(db, archive_path):
+        if not _unarchive_row(db, table, item_id):
+            return False
+        db.commit()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Move long soft-deleted rows into the archive database')
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'database.db'))
+    parser.add_argument('--archive', help='Archive database (default: <db>-archive.db)')
+    parser.add_argument('--retention', default=os.environ.get('ARCHIVE_RETENTION', ''),
+                        help='Overrides of the retention days, e.g. feedback=7,admin_users=0')
+    parser.add_argument('--batch-size', type=int, default=int(os.environ.get('ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+                        help='Rows moved per transaction')
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help='Seconds to pause between batches')
+    args = parser.parse_args()
+
+    archive_path = args.archive or os.environ.get('ARCHIVE_PATH') or default_archive_path(args.db)
+    db = sqlite3.connect(args.db)
+    try:
+        moved = archive_deleted_rows(db, archive_path, parse_retention(args.retention), args.batch_size, args.pause)
+    finally:
+        db.close()
+    for table, count in moved.items():
+        if count:
+            print(f"{table}: archived {count} rows")
+    print(f"Archived {sum(moved.values())} rows into {archive_path}")
+
+if __name__ == "__main__":
+    main()
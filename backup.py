@@ -0,0 +1,298 @@
+import sqlite3
+import os
+import argparse
+import datetime
+import gzip
+import shutil
+import re
+import tempfile
+import threading
+import time
+from archive import default_archive_path
+
+# Backup files are named <prefix>-<UTC timestamp>.db[.gz]; the backup of
+# the archive database taken with it has the same timestamp
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S-%f'
+# Backups taken before timestamps had microseconds end in -%H%M%S
+BACKUP_SUFFIX = re.compile(r'-\d{8}-\d{6}(-\d{6})?\.db(\.gz)?$')
+
+# Pages copied per backup step, and the pause between steps during which
+# writers can take the database lock
+DEFAULT_PAGES = 256
+DEFAULT_PAUSE = 0.005
+
+DEFAULT_KEEP = 7
+
+# A write by another connection restarts a paged copy; after this many
+# restarts the rest is copied in a single step
+MAX_RESTARTS = 3
+
+# Only one backup runs at a time per process
+_running = threading.Lock()
+
+class BackupInProgress(Exception):
+    pass
+
+class _CopyRestarted(Exception):
+    pass
+
+def backup_name(db_path, compress, now=None):
+    prefix = os.path.splitext(os.path.basename(db_path))[0]
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return f"{prefix}-{now.strftime(TIMESTAMP_FORMAT)}.db" + ('.gz' if compress else '')
+
+def _partial_path(path):
+    """Hidden file a backup is written to until it is verified"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}")
+
+def reserve_backup_path(directory, db_path, compress):
+    """
+    A new backup path in ``directory``, claimed by creating its hidden
+    partial file with O_EXCL, so a backup started by another process in
+    the same instant cannot write to the same name.
+    """
+    while True:
+        path = os.path.join(directory, backup_name(db_path, compress))
+        try:
+            os.close(os.open(_partial_path(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        if not os.path.exists(path):
+            return path
+        os.remove(_partial_path(path))
+
+def list_backups(directory, db_path):
+    """Backup files of ``db_path`` in ``directory``, newest first"""
+    prefix = os.path.splitext(os.path.basename(db_path))[0]
+    if not os.path.isdir(directory):
+        return []
+    # The suffix is matched exactly so database-archive-<timestamp>.db is
+    # not taken for a backup of database.db
+    names = [
+        name for name in os.listdir(directory)
+        if name.startswith(prefix) and BACKUP_SUFFIX.fullmatch(name[len(prefix):])
+    ]
+    return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+def archive_backup_path(backup_path, archive_path):
+    """The backup of ``archive_path`` taken together with ``backup_path``"""
+    suffix = BACKUP_SUFFIX.search(os.path.basename(backup_path)).group(0)
+    prefix = os.path.splitext(os.path.basename(archive_path))[0]
+    return os.path.join(os.path.dirname(backup_path), prefix + suffix)
+
+def rotate_backups(directory, db_path, keep, archive_path=None):
+    """
+    Delete all but the ``keep`` newest backups, and the archive backups
+    taken with the deleted ones; returns the deleted paths.
+    """
+    removed = list_backups(directory, db_path)[keep:]
+    if archive_path:
+        removed += [
+            path for path in (archive_backup_path(backup, archive_path) for backup in removed)
+            if os.path.exists(path)
+        ]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def copy_database(source_path, target_path, pages=DEFAULT_PAGES, pause=DEFAULT_PAUSE):
+    """
+    Copy a live database with the SQLite backup API, ``pages`` pages per step.
+
+    The source is only locked while a step runs, so writers get the lock
+    during the ``pause`` after every step. A write by another connection
+    makes SQLite start the copy over; when that happens more than
+    MAX_RESTARTS times the copy is redone in one step, which holds a read
+    lock until it finishes (writers are not blocked by it in WAL mode).
+    Returns the number of steps and restarts, the page count and page size.
+    """
+    steps = restarts = 0
+    previous = None
+
+    def progress(status, remaining, total):
+        nonlocal steps, restarts, previous
+        steps += 1
+        if previous is not None and remaining > previous:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _CopyRestarted()
+        previous = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _CopyRestarted:
+            source.backup(target)
+            steps += 1
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        page_size = target.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    return steps, restarts, page_count, page_size
+
+def restore_backup(backup_path, target_path):
+    """Write the database in ``backup_path`` (optionally gzipped) to ``target_path``"""
+    opener = gzip.open if backup_path.endswith('.gz') else open
+    with opener(backup_path, 'rb') as src, open(target_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def verify_backup(backup_path):
+    """Restore into a temporary file and return the PRAGMA integrity_check result"""
+    with tempfile.TemporaryDirectory() as workdir:
+        restored = os.path.join(workdir, 'restored.db')
+        restore_backup(backup_path, restored)
+        db = sqlite3.connect(restored)
+        try:
+            rows = db.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            db.close()
+    return '; '.join(row[0] for row in rows)
+
+def _write_backup(source_path, path, compress, pages, pause, verify):
+    """
+    Copy ``source_path`` to the backup file ``path`` as backup_database()
+    describes. Returns timing and size stats.
+    """
+    directory, name = os.path.split(path)
+    # Hidden until verified; keeps the extension restore_backup() looks at
+    partial = _partial_path(path)
+    try:
+        started = time.perf_counter()
+
+        copy_path = os.path.join(directory, f".{name}.copy") if compress else partial
+        steps, restarts, page_count, page_size = copy_database(source_path, copy_path, pages, pause)
+        copied = time.perf_counter()
+
+        if compress:
+            with open(copy_path, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(copy_path)
+        compressed = time.perf_counter()
+
+        integrity = verify_backup(partial) if verify else None
+        verified = time.perf_counter()
+        if integrity not in (None, 'ok'):
+            os.remove(partial)
+            raise sqlite3.DatabaseError(f"Backup failed integrity check: {integrity}")
+
+        os.replace(partial, path)
+    finally:
+        for leftover in (partial, partial + '.copy'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    database_bytes = page_count * page_size
+    copy_seconds = copied - started
+    return {
+        'path': path,
+        'database_bytes': database_bytes,
+        'backup_bytes': os.path.getsize(path),
+        'pages': page_count,
+        'page_size': page_size,
+        'steps': steps,
+        'restarts': restarts,
+        'copy_seconds': round(copy_seconds, 3),
+        'compress_seconds': round(compressed - copied, 3),
+        'verify_seconds': round(verified - compressed, 3),
+        'total_seconds': round(verified - started, 3),
+        'copy_mb_per_second': round(database_bytes / 1024 / 1024 / copy_seconds, 1) if copy_seconds else None,
+        'integrity': integrity
+    }
+
+def backup_database(db_path, directory, compress=True, keep=DEFAULT_KEEP,
+                    pages=DEFAULT_PAGES, pause=DEFAULT_PAUSE, verify=True, archive_path=None):
+    """
+    Back up ``db_path`` into ``directory`` while the application runs.
+
+    The database is copied page by page into a temporary file next to the
+    backup, optionally gzipped, verified by restoring it and running
+    PRAGMA integrity_check, and only then renamed into place. The archive
+    database at ``archive_path``, when there is one, is backed up the same
+    way right after, under the same timestamp. The main database goes
+    first: a row archived in between ends up in both backups rather than
+    neither. Old backups beyond the ``keep`` newest are deleted with their
+    archive backups. Returns timing and size stats, with those of the
+    archive under 'archive' (None without an archive database).
+    Raises BackupInProgress if another backup is running in this process.
+    """
+    if not _running.acquire(blocking=False):
+        raise BackupInProgress("A backup is already running")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = reserve_backup_path(directory, db_path, compress)
+        stats = _write_backup(db_path, path, compress, pages, pause, verify)
+
+        stats['archive'] = None
+        if archive_path and os.path.exists(archive_path):
+            try:
+                stats['archive'] = _write_backup(
+                    archive_path, archive_backup_path(path, archive_path), compress, pages, pause, verify
+                )
+            except Exception:
+                # A backup without its archive would restore without the archived rows
+                os.remove(path)
+                raise
+
+        stats['removed'] = rotate_backups(directory, db_path, keep, archive_path)
+        return stats
+    finally:
+        _running.release()
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up the database while the application runs')
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'database.db'), help='Database to back up')
+    parser.add_argument('--archive', help='Archive database backed up with it (default: <db>-archive.db)')
+    parser.add_argument('--dir', default=os.environ.get('BACKUP_DIR', 'backups'), help='Directory for backup files')
+    parser.add_argument('--keep', type=int, default=int(os.environ.get('BACKUP_KEEP', DEFAULT_KEEP)),
+                        help='Number of backups to keep')
+    parser.add_argument('--no-compress', action='store_true', help='Write a plain .db file instead of .db.gz')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help='Pages copied per step')
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help='Seconds to pause between steps')
+    parser.add_argument('--no-verify', action='store_true', help='Skip the restore and integrity check')
+    parser.add_argument('--restore', metavar='BACKUP', help='Restore BACKUP into --db instead (the app must be stopped)')
+    args = parser.parse_args()
+    archive_path = args.archive or os.environ.get('ARCHIVE_PATH') or default_archive_path(args.db)
+
+    if args.restore:
+        restores = [(args.restore, args.db)]
+        archive_backup = archive_backup_path(args.restore, archive_path)
+        if os.path.exists(archive_backup):
+            restores.append((archive_backup, archive_path))
+        # Check both before overwriting either
+        for backup, _ in restores:
+            integrity = verify_backup(backup)
+            if integrity != 'ok':
+                raise SystemExit(f"{backup} failed integrity check: {integrity}")
+        for backup, target in restores:
+            restore_backup(backup, target)
+            print(f"Restored {backup} into {target}")
+        if len(restores) == 1:
+            print(f"  {args.restore} has no archive backup; {archive_path} was left as it is")
+        return
+
+    stats = backup_database(
+        args.db, args.dir,
+        compress=not args.no_compress,
+        keep=args.keep,
+        pages=args.pages,
+        pause=args.pause,
+        verify=not args.no_verify,
+        archive_path=archive_path
+    )
+    for backup in filter(None, (stats, stats['archive'])):
+        print(f"Backup written to {backup['path']}")
+        print(f"  {backup['pages']} pages ({backup['database_bytes'] / 1024 / 1024:.1f} MB) in {backup['steps']} steps "
+              f"({backup['restarts']} restarts), {backup['copy_seconds']}s ({backup['copy_mb_per_second']} MB/s)")
+        print(f"  {backup['backup_bytes'] / 1024 / 1024:.1f} MB on disk, compressed in {backup['compress_seconds']}s, "
+              f"verified in {backup['verify_seconds']}s: {backup['integrity'] or 'not checked'}")
+    for path in stats['removed']:
+        print(f"  Removed old backup {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files from bench/run.py
+
+Prints the change of every route measured in both files and exits with
+status 1 if any route regressed beyond the thresholds, so it can gate CI.
+
+Usage: python bench/compare.py BASELINE CURRENT [--latency 20] [--throughput 20] [--memory 25]
+"""
+import argparse
+import json
+import sys
+
+def change(old, new):
+    """Relative change in percent, None if not computable"""
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+def compare(baseline, current, latency_threshold, throughput_threshold, memory_threshold, min_ms, min_kb):
+    """
+    Return (rows, regressions). A route regresses when its p95 latency grows,
+    its throughput drops or its peak allocation grows by more than the
+    threshold percentage. Latencies below ``min_ms`` and allocations below
+    ``min_kb`` are treated as noise.
+    """
+    rows = []
+    regressions = []
+
+    for mode, results in current.get('results', {}).items():
+        base_results = baseline.get('results', {}).get(mode, {})
+        for name, stats in results.items():
+            base = base_results.get(name)
+            if base is None:
+                continue
+
+            p95 = change(base['p95_ms'], stats['p95_ms'])
+            rps = change(base['rps'], stats['rps'])
+            problems = []
+            if p95 is not None and p95 > latency_threshold and stats['p95_ms'] >= min_ms:
+                problems.append(f"p95 +{p95:.0f}%")
+            if rps is not None and -rps > throughput_threshold and base['p95_ms'] >= min_ms:
+                problems.append(f"rps {rps:.0f}%")
+            if stats['errors'] > base['errors']:
+                problems.append(f"errors {base['errors']} -> {stats['errors']}")
+
+            rows.append((mode, name, base['p95_ms'], stats['p95_ms'], p95, rps, problems))
+            if problems:
+                regressions.append((mode, name, problems))
+
+    base_memory = baseline.get('memory', {}).get('peak_alloc_kb', {})
+    for name, peak in current.get('memory', {}).get('peak_alloc_kb', {}).items():
+        growth = change(base_memory.get(name), peak)
+        if growth is not None and growth > memory_threshold and peak >= min_kb:
+            regressions.append(('memory', name, [f"peak alloc +{growth:.0f}% ({base_memory[name]} -> {peak} KB)"]))
+
+    return rows, regressions
+
+def format_change(value):
+    return '' if value is None else f"{value:+.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help='Result file of the reference commit')
+    parser.add_argument('current', help='Result file to check')
+    parser.add_argument('--latency', type=float, default=20, help='Allowed p95 latency increase in percent')
+    parser.add_argument('--throughput', type=float, default=20, help='Allowed throughput drop in percent')
+    parser.add_argument('--memory', type=float, default=25, help='Allowed peak allocation increase in percent')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='Ignore latency changes of routes faster than this')
+    parser.add_argument('--min-kb', type=float, default=64.0, help='Ignore allocation changes of routes using less than this')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    if baseline.get('meta', {}).get('dataset') != current.get('meta', {}).get('dataset'):
+        print("Warning: the result files were measured on different datasets", file=sys.stderr)
+
+    rows, regressions = compare(baseline, current, args.latency, args.throughput, args.memory, args.min_ms, args.min_kb)
+
+    print(f"{'mode':7} {'route':60} {'p95 old':>9} {'p95 new':>9} {'p95':>8} {'rps':>8}")
+    for mode, name, old, new, p95, rps, problems in rows:
+        marker = '  <-- ' + ', '.join(problems) if problems else ''
+        print(f"{mode:7} {name[:60]:60} {old:>9} {new:>9} {format_change(p95):>8} {format_change(rps):>8}{marker}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for mode, name, problems in regressions:
+            print(f"  [{mode}] {name}: {', '.join(problems)}")
+        sys.exit(1)
+
+    print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
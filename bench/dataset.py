@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Deterministic benchmark datasets
+
+Creates a fresh database with init_db and fills it with rows from the
+add_sample_data generator. The same seed and sizes always produce the same
+database, so results from different commits are measured against
+identical data.
+
+Usage: python bench/dataset.py PATH [--blog-items 10000] [--feedback 100000] [--seed 1]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Default table sizes
+DEFAULT_SIZES = {
+    'blog_items': 10000,
+    'feedback': 100000,
+    'documents_items': 2000,
+    'about_company_category_items': 500,
+    'staff': 50
+}
+
+def build_dataset(path, sizes=None, seed=1):
+    """
+    Create a database at ``path`` with the given table sizes.
+
+    ``sizes`` overrides entries of DEFAULT_SIZES.
+    """
+    sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ['DATABASE_PATH'] = path
+
+    import init_db
+    import add_sample_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db.init_db()
+        add_sample_data.add_sample_data(seed=seed, rows=sizes, throwaway=True)
+
+def size_arguments(parser):
+    """Add one --<table> option per entry of DEFAULT_SIZES"""
+    for table, size in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, default=size,
+                            dest=table, help=f"Number of {table} rows (default {size})")
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+def sizes_from(args):
+    return {table: getattr(args, table) for table in DEFAULT_SIZES}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='Database file to create (overwritten)')
+    size_arguments(parser)
+    args = parser.parse_args()
+
+    build_dataset(args.path, sizes_from(args), args.seed)
+    print(f"Dataset written to {args.path}")
+
+if __name__ == '__main__':
+    main()
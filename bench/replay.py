@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Replay recorded traffic against a local instance
+
+Reads JSONL logs written by traffic_recorder.py (TRAFFIC_LOG) and re-issues
+the requests with their original spacing, scaled by --speed, from
+--concurrency worker threads. Requests that were sent with an
+Authorization header are sent with a token for --username/--password, and
+login requests use those credentials. Reports latency per route.
+
+Without --url a threaded wsgiref server is started on a copy of --db.
+
+Usage: python bench/replay.py traffic.jsonl [traffic.jsonl.1 ...] [--speed 1]
+                              [--concurrency 8] [--url URL | --db PATH]
+                              [--output replay-results.json]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.run import git_commit, local_server, send, summarize
+
+LOGIN_PATH = '/api/auth/login'
+
+def load_records(paths):
+    """All records from the given log files, oldest first"""
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+def login(base_url, username, password):
+    """Bearer token for the replayed admin requests"""
+    request = urllib.request.Request(
+        base_url.rstrip('/') + LOGIN_PATH,
+        json.dumps({'username': username, 'password': password}).encode(),
+        {'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.load(response)['token']
+    except urllib.error.HTTPError as e:
+        raise SystemExit(f"Login as {username} failed with status {e.code}")
+
+def replay(base_url, records, speed, concurrency, token, credentials):
+    """
+    Issue ``records`` keeping their relative timing divided by ``speed``
+    (0 sends as fast as possible). Returns per-route results and the
+    largest delay between a request's scheduled and actual start.
+    """
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    max_lag = 0.0
+
+    def issue(record):
+        path = record['path'] + (f"?{record['query']}" if record.get('query') else '')
+        headers = {}
+        if record.get('auth'):
+            headers['Authorization'] = f"Bearer {token}"
+        if record.get('accept'):
+            headers['Accept'] = record['accept']
+        body = record.get('body')
+        if record['path'] == LOGIN_PATH:
+            body = credentials
+
+        latency, status = send(base_url, record['method'], path, body, headers)
+        name = f"{record['method']} {record.get('route') or record['path']}"
+        with lock:
+            latencies.setdefault(name, []).append(latency)
+            errors.setdefault(name, 0)
+            # Only count errors the original request did not have
+            if status >= 400 and record.get('status', 0) < 400:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    first = records[0]['ts'] if records else 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed:
+                due = start + (record['ts'] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+            pool.submit(issue, record)
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(values, errors[name], elapsed) for name, values in sorted(latencies.items())}
+    return results, elapsed, max_lag
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('logs', nargs='+', help='Traffic log files (rotated files may be given in any order)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed factor; 0 for no delays')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+    parser.add_argument('--url', help='Replay against a running server')
+    parser.add_argument('--db', default='database.db', help='Database copied for the built-in server')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', help='Write results as JSON (comparable with bench/compare.py)')
+    args = parser.parse_args()
+
+    records = load_records(args.logs)
+    if not records:
+        raise SystemExit("No requests in the given logs")
+    span = records[-1]['ts'] - records[0]['ts']
+    print(f"Replaying {len(records)} requests recorded over {span:.1f}s at {args.speed or 'max'}x speed")
+
+    credentials = {'username': args.username, 'password': args.password}
+
+    with contextlib.ExitStack() as stack:
+        if args.url:
+            base_url = args.url
+        else:
+            # Replayed writes modify the data, so work on a copy
+            workdir = tempfile.mkdtemp()
+            stack.callback(shutil.rmtree, workdir, True)
+            os.environ['DATABASE_PATH'] = os.path.join(workdir, 'replay.db')
+            shutil.copyfile(args.db, os.environ['DATABASE_PATH'])
+            with contextlib.redirect_stdout(io.StringIO()):
+                from app import app
+            base_url = stack.enter_context(local_server(app))
+
+        token = login(base_url, args.username, args.password)
+        results, elapsed, max_lag = replay(base_url, records, args.speed, args.concurrency, token, credentials)
+
+    print(f"Finished in {elapsed:.1f}s, max scheduling lag {max_lag * 1000:.0f} ms\n")
+    print(f"{'route':60} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>5}")
+    for name, stats in results.items():
+        print(f"{name[:60]:60} {stats['requests']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats['errors']:>5}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now().isoformat(),
+                'logs': args.logs,
+                'requests': len(records),
+                'speed': args.speed,
+                'concurrency': args.concurrency,
+                'max_lag_ms': round(max_lag * 1000, 1)
+            },
+            'results': {'replay': results}
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
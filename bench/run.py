@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+API benchmark: every route through the Flask test client and a WSGI server
+
+Builds (or reuses) a deterministic dataset, then times each GET route plus a
+set of write requests. The "client" mode calls the app in-process through
+the Flask test client, one request at a time. The "server" mode serves the
+app from a threaded wsgiref server on a local port (or uses --url) and
+sends requests from --concurrency worker threads.
+
+Results are written as JSON; compare two result files with
+bench/compare.py.
+
+Usage: python bench/run.py [--output bench-results.json] [--mode both]
+                           [--requests 50] [--concurrency 8] [--db PATH]
+"""
+import argparse
+import contextlib
+import datetime
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import socketserver
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.dataset import build_dataset, size_arguments, sizes_from
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Extra query string variants measured in addition to the bare route
+VARIANTS = {
+    '/api/blog/items': [
+        'fields=all', 'sort=-views', 'category_id=2&date_time_from=2023-01-01',
+        'stream=true'
+    ],
+    '/api/feedback': ['theme=Partnership', 'created_at_from=2023-06-01&created_at_to=2023-06-30'],
+    '/api/documents/items': ['category_id=3'],
+    '/api/about-company/items': ['fields=all']
+}
+
+# Write requests: (method, path, json body)
+WRITES = [
+    ('POST', '/api/feedback', {
+        'full_name': 'Bench User', 'phone_number': '+998 90 000 0000',
+        'email': 'bench@example.com', 'theme': 'Suggestion', 'text': 'Benchmark feedback'
+    }),
+    ('PUT', '/api/blog/items/1', {
+        'category_id': 1, 'title': 'Benchmark title', 'intro_text': 'Intro', 'text': 'Body'
+    }),
+    ('POST', '/api/menu', {'name': 'Benchmark', 'icon': 'star'}),
+    ('POST', '/api/auth/login', {'username': 'admin', 'password': 'admin123'})
+]
+
+# Endpoints that are not part of the API surface
+SKIPPED_ENDPOINTS = {'static', 'flasgger.static', 'handle_options'}
+
+# Responses that stay open until the client leaves (server-sent events),
+# so they cannot be timed per request
+STREAMING_MIMETYPES = {'text/event-stream'}
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in milliseconds and throughput in requests per second"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / count, 3) if count else None,
+        'p50_ms': round(percentile(latencies, 50), 3) if count else None,
+        'p95_ms': round(percentile(latencies, 95), 3) if count else None,
+        'p99_ms': round(percentile(latencies, 99), 3) if count else None
+    }
+
+def discover_requests(app, item_id):
+    """
+    One GET request per route (plus VARIANTS) followed by the WRITES.
+    Routes documented as producing a STREAMING_MIMETYPES type are skipped.
+    """
+    from validation import route_spec
+    requests = []
+    with app.test_request_context():
+        from flask import url_for
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            if 'GET' not in rule.methods or rule.endpoint in SKIPPED_ENDPOINTS:
+                continue
+            if rule.endpoint.endswith('.static'):
+                continue
+            if STREAMING_MIMETYPES & set(route_spec(app.view_functions[rule.endpoint]).get('produces', [])):
+                continue
+            path = url_for(rule.endpoint, **{name: item_id for name in rule.arguments})
+            requests.append(('GET', path, None))
+            for query in VARIANTS.get(path, []):
+                requests.append(('GET', f"{path}?{query}", None))
+    return requests + WRITES
+
+def request_name(method, path):
+    return f"{method} {path}"
+
+def auth_headers(client):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+def run_client(app, requests, count, headers):
+    """Sequential requests through the Flask test client"""
+    client = app.test_client()
+    results = {}
+    for method, path, body in requests:
+        # Warm up per-query caches before timing
+        client.open(path, method=method, json=body, headers=headers).get_data()
+
+        latencies = []
+        errors = 0
+        start = time.perf_counter()
+        for _ in range(count):
+            began = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            response.get_data()
+            latencies.append((time.perf_counter() - began) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+        results[request_name(method, path)] = summarize(latencies, errors, time.perf_counter() - start)
+
+    return results
+
+def measure_memory(app, requests, headers):
+    """Peak Python allocations in KB for a single request to each route"""
+    client = app.test_client()
+    peaks = {}
+    tracemalloc.start()
+    for method, path, body in requests:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        client.open(path, method=method, json=body, headers=headers).get_data()
+        peaks[request_name(method, path)] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+    tracemalloc.stop()
+    return peaks
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+@contextlib.contextmanager
+def local_server(app):
+    """Serve ``app`` from a threaded wsgiref server on a free local port"""
+    server = make_server('127.0.0.1', 0, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def send(base_url, method, path, body, headers):
+    """One HTTP request on a fresh connection; returns (latency ms, status)"""
+    url = urllib.parse.urlsplit(base_url)
+    payload = json.dumps(body) if body is not None else None
+    request_headers = dict(headers)
+    if payload is not None:
+        request_headers['Content-Type'] = 'application/json'
+
+    began = time.perf_counter()
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    try:
+        connection.request(method, url.path.rstrip('/') + path, payload, request_headers)
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except (OSError, http.client.HTTPException):
+        status = 599
+    finally:
+        connection.close()
+    return (time.perf_counter() - began) * 1000, status
+
+def run_server(base_url, requests, count, concurrency, headers):
+    """``count`` requests per route spread over ``concurrency`` threads"""
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for method, path, body in requests:
+            send(base_url, method, path, body, headers)
+            start = time.perf_counter()
+            outcomes = list(pool.map(lambda _: send(base_url, method, path, body, headers), range(count)))
+            elapsed = time.perf_counter() - start
+            errors = sum(1 for _, status in outcomes if status >= 400)
+            results[request_name(method, path)] = summarize([latency for latency, _ in outcomes], errors, elapsed)
+
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default='bench-results.json', help='Result file')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads in server mode')
+    parser.add_argument('--url', help='Benchmark an already running server instead of a local one')
+    parser.add_argument('--db', help='Database file to use; built if missing (default: temporary)')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the database even if it exists')
+    parser.add_argument('--item-id', type=int, default=1, help='ID used for routes taking an ID')
+    size_arguments(parser)
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    if args.rebuild or not os.path.exists(path):
+        print(f"Building dataset in {path}...")
+        started = time.perf_counter()
+        build_dataset(path, sizes_from(args), args.seed)
+        print(f"Dataset built in {time.perf_counter() - started:.1f}s")
+
+    # Write routes modify the data, so every run works on a fresh copy
+    workdir = tempfile.mkdtemp()
+    working_copy = os.path.join(workdir, 'bench.db')
+    shutil.copyfile(path, working_copy)
+    os.environ['DATABASE_PATH'] = working_copy
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+
+    headers = auth_headers(app.test_client())
+    requests = discover_requests(app, args.item_id)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'requests_per_route': args.requests,
+            'concurrency': args.concurrency,
+            'dataset': dict(sizes_from(args), seed=args.seed),
+            'database_bytes': os.path.getsize(path)
+        },
+        'results': {}
+    }
+
+    if args.mode in ('client', 'both'):
+        print(f"Test client: {len(requests)} routes x {args.requests} requests")
+        report['results']['client'] = run_client(app, requests, args.requests, headers)
+        report['memory'] = {'peak_alloc_kb': measure_memory(app, requests, headers)}
+
+    if args.mode in ('server', 'both'):
+        print(f"Server: {len(requests)} routes x {args.requests} requests, concurrency {args.concurrency}")
+        with contextlib.ExitStack() as stack:
+            base_url = args.url or stack.enter_context(local_server(app))
+            report['results']['server'] = run_server(base_url, requests, args.requests, args.concurrency, headers)
+
+    report.setdefault('memory', {})['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for mode, results in report['results'].items():
+        print(f"\n[{mode}]")
+        print(f"{'route':60} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>5}")
+        for name, stats in results.items():
+            print(f"{name[:60]:60} {stats['rps']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+                  f"{stats['p99_ms']:>9} {stats['errors']:>5}")
+    print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
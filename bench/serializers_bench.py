@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: compiled row serializers vs dict(row) + jsonify
+
+Builds a temporary database with the requested number of generated blog
+items and times both serialization paths over the same query results.
+
+Usage: python bench/serializers_bench.py [--rows 20000] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_database(path, rows):
+    """Create a database with generated sample data and ``rows`` blog items"""
+    os.environ['DATABASE_PATH'] = path
+
+    import init_db
+    import add_sample_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db.init_db()
+        add_sample_data.add_sample_data(rows={'blog_items': rows}, throwaway=True)
+
+def timed(fn, repeat):
+    """Best wall time in milliseconds over ``repeat`` runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='Number of blog items to serialize')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per variant, best time is reported')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    build_database(os.path.join(workdir, 'bench.db'), args.rows)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+    from flask.json.provider import DefaultJSONProvider
+    from serializers import serialize_rows
+
+    baseline = DefaultJSONProvider(app)
+    query = """
+        SELECT bi.id, bi.category_id, bi.title, bi.img_or_video_link, bi.date_time,
+               bi.views, bi.intro_text, bi.is_deleted, bc.name as category_name
+        FROM blog_items bi
+        LEFT JOIN blog_categories bc ON bi.category_id = bc.id
+        ORDER BY bi.date_time DESC
+    """
+
+    conn = sqlite3.connect(os.environ['DATABASE_PATH'])
+    conn.row_factory = sqlite3.Row
+
+    def dict_jsonify():
+        rows = conn.execute(query)
+        return baseline.response([dict(row) for row in rows.fetchall()]).get_data()
+
+    def compiled():
+        rows = conn.execute(query)
+        return app.json.response(serialize_rows(rows)).get_data()
+
+    with app.app_context():
+        expected = dict_jsonify()
+        actual = compiled()
+        if expected != actual:
+            print("Output mismatch between serializers", file=sys.stderr)
+            sys.exit(1)
+
+        baseline_ms = timed(dict_jsonify, args.repeat)
+        compiled_ms = timed(compiled, args.repeat)
+
+    print(f"Rows:              {args.rows}")
+    print(f"Payload:           {len(expected) / 1024:.0f} KB")
+    print(f"dict(row)+jsonify: {baseline_ms:.1f} ms")
+    print(f"compiled:          {compiled_ms:.1f} ms")
+    print(f"Speedup:           {baseline_ms / compiled_ms:.2f}x")
+
+if __name__ == '__main__':
+    main()
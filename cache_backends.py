@@ -0,0 +1,239 @@
+from collections import OrderedDict, namedtuple
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class LocalCache:
+    """
+    Thread-safe LRU of byte strings for one process, bounded by total size.
+
+    Values larger than ``max_bytes`` are not stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+# Slot sizes of the slab classes of SharedMemoryCache; each class gets an
+# equal share of the file and a value goes to the smallest slot it fits
+SLOT_SIZES = (4 * 1024, 32 * 1024, 256 * 1024, 2 * 1024 * 1024)
+
+# Slots per set; a key can only live in one set of each class
+WAYS = 8
+
+MAGIC = b'LOYHCACH'
+FILE_HEADER = struct.Struct('<8sQ')     # magic, max_bytes the file was laid out for
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct('<QQIIB')   # sequence, key hash, key length, value length, referenced
+SEQUENCE = struct.Struct('<Q')
+REFERENCED_OFFSET = 24
+
+# Attempts to read a slot that is being written before treating it as a miss
+READ_RETRIES = 3
+
+SlabClass = namedtuple('SlabClass', 'slot_size sets ways hands offset')
+
+def slab_layout(max_bytes):
+    """Slab classes for a file of about ``max_bytes`` and the exact file size"""
+    share = max_bytes // len(SLOT_SIZES)
+    counts = []
+    for slot_size in SLOT_SIZES:
+        count = max(1, share // slot_size)
+        ways = min(WAYS, count)
+        counts.append((slot_size, count // ways, ways))
+
+    # One CLOCK hand byte per set after the header, then the slots
+    hands = HEADER_SIZE
+    offset = HEADER_SIZE + sum(sets for _, sets, _ in counts)
+    offset += -offset % HEADER_SIZE
+    classes = []
+    for slot_size, sets, ways in counts:
+        classes.append(SlabClass(slot_size, sets, ways, hands, offset))
+        hands += sets
+        offset += slot_size * sets * ways
+    return classes, offset
+
+def key_hash(key):
+    # Never 0, which marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') | 1
+
+class SharedMemoryCache:
+    """
+    Cache of byte strings in a memory-mapped file shared by all processes
+    that open the same ``path``, with the same interface as LocalCache for
+    string keys.
+
+    The file is split into slab classes of fixed-size slots (SLOT_SIZES).
+    Each class is set-associative: a key hashes to one set of WAYS slots,
+    and a full set evicts with CLOCK, using a per-set hand and a referenced
+    flag that reads set. Reads take no lock: every slot starts with a
+    sequence number that writers make odd while they change the slot, and a
+    read that sees it odd or changed is retried. Writers are serialized
+    across processes with flock. All processes must use the same
+    ``max_bytes``; a file laid out for another size is reinitialized.
+    """
+
+    def __init__(self, path, max_bytes):
+        if fcntl is None:
+            raise RuntimeError("The shared cache backend needs fcntl (Unix only)")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.classes, size = slab_layout(max_bytes)
+        self._pid = None
+        self._fd = None
+        self._lock = threading.Lock()
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = FILE_HEADER.pack(MAGIC, max_bytes)
+            if os.fstat(fd).st_size != size or os.pread(fd, FILE_HEADER.size, 0) != header:
+                # New file or another layout: start empty
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, header, 0)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            # mmap keeps a duplicate of fd, which would keep the lock held
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # flock excludes other open files, so each process opens its own;
+        # a lock or descriptor inherited over fork is not used
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._fd = os.open(self.path, os.O_RDWR)
+            self._pid = os.getpid()
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slots(self, slab, hashed):
+        """Positions of the slots of the set ``hashed`` maps to in ``slab``"""
+        # The low bit is always set
+        first = slab.offset + (hashed >> 1) % slab.sets * slab.ways * slab.slot_size
+        return range(first, first + slab.ways * slab.slot_size, slab.slot_size)
+
+    def _read(self, position, hashed, key):
+        for _ in range(READ_RETRIES):
+            sequence, stored_hash, key_length, value_length, _ = SLOT_HEADER.unpack_from(self._map, position)
+            if sequence % 2:
+                continue
+            if stored_hash != hashed:
+                return None
+            start = position + SLOT_HEADER.size
+            stored_key = self._map[start:start + key_length]
+            value = self._map[start + key_length:start + key_length + value_length]
+            if SEQUENCE.unpack_from(self._map, position)[0] != sequence:
+                continue
+            return value if stored_key == key else None
+        return None
+
+    def _write(self, position, hashed=0, key=b'', value=b''):
+        """Replace a slot, making readers retry while it changes"""
+        sequence = SEQUENCE.unpack_from(self._map, position)[0]
+        # An odd sequence left by a crashed writer stays odd
+        sequence += 1 if sequence % 2 == 0 else 2
+        SEQUENCE.pack_into(self._map, position, sequence)
+        SLOT_HEADER.pack_into(self._map, position, sequence, hashed, len(key), len(value), 0)
+        start = position + SLOT_HEADER.size
+        self._map[start:start + len(key)] = key
+        self._map[start + len(key):start + len(key) + len(value)] = value
+        SEQUENCE.pack_into(self._map, position, sequence + 1)
+
+    def _victim(self, slab, hashed):
+        """Slot to overwrite in the set of ``hashed``: empty, else CLOCK"""
+        slots = self._slots(slab, hashed)
+        hand_position = slab.hands + (hashed >> 1) % slab.sets
+        hand = self._map[hand_position] % slab.ways
+        for _ in range(2 * slab.ways):
+            position = slots[hand]
+            _, stored_hash, _, _, referenced = SLOT_HEADER.unpack_from(self._map, position)
+            if stored_hash == 0 or not referenced:
+                break
+            # Second chance
+            self._map[position + REFERENCED_OFFSET] = 0
+            hand = (hand + 1) % slab.ways
+        self._map[hand_position] = (hand + 1) % slab.ways
+        return position
+
+    def get(self, key):
+        key = key.encode()
+        hashed = key_hash(key)
+        for slab in self.classes:
+            for position in self._slots(slab, hashed):
+                value = self._read(position, hashed, key)
+                if value is not None:
+                    self._map[position + REFERENCED_OFFSET] = 1
+                    return value
+        return None
+
+    def set(self, key, value):
+        key = key.encode()
+        needed = SLOT_HEADER.size + len(key) + len(value)
+        target = next((slab for slab in self.classes if needed <= slab.slot_size), None)
+        if target is None:
+            return
+        hashed = key_hash(key)
+
+        with self._locked():
+            position = None
+            for slab in self.classes:
+                for slot in self._slots(slab, hashed):
+                    if self._read(slot, hashed, key) is None:
+                        continue
+                    if slab is target:
+                        position = slot
+                    else:
+                        # The value changed size class
+                        self._write(slot)
+            if position is None:
+                position = self._victim(target, hashed)
+            self._write(position, hashed, key, value)
+
+    def clear(self):
+        with self._locked():
+            for slab in self.classes:
+                for position in range(slab.offset, slab.offset + slab.sets * slab.ways * slab.slot_size, slab.slot_size):
+                    if SLOT_HEADER.unpack_from(self._map, position)[1]:
+                        self._write(position)
@@ -0,0 +1,179 @@
+import atexit
+import contextlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+from write_hooks import ALL_TABLES, written_tables
+
+def _unlink(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+class VersionWatcher:
+    """
+    This process's view of the cache_versions table.
+
+    Every write bumps the version of the tables it touched in the same
+    transaction (see write_hooks.record_write). A background thread re-reads
+    the table every ``interval`` seconds, or as soon as another process
+    signals a commit through a UNIX datagram socket in ``signal_dir``, and
+    tells the subscribed caches which tables changed. Requests only compare
+    in-memory versions and never query the table themselves.
+    """
+
+    def __init__(self, path, interval, signal_dir=None):
+        self.path = path
+        self.interval = interval
+        self.signal_dir = signal_dir
+        self.versions = {}
+        self.listeners = []
+        self.active = False
+        self._pid = None
+        self._db = None
+        self._socket = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def subscribe(self, listener=None):
+        """
+        Keep versions current for a cache, calling ``listener(tables)`` with
+        the set of tables whose version changed
+        """
+        self.active = True
+        if listener is not None:
+            self.listeners.append(listener)
+
+    def current(self, tables):
+        """Last seen versions of ``tables``, to tag values cached from them"""
+        versions = self.versions
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def start(self):
+        """Start watching in this process, again after a fork"""
+        if self._pid == os.getpid() or not self.active:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Connections, locks and threads do not survive a fork
+            self._db = None
+            self._lock = threading.Lock()
+            self._socket = self._bind()
+            self.poll()
+            threading.Thread(target=self._run, name='cache-versions', daemon=True).start()
+            self._pid = os.getpid()
+
+    @property
+    def started(self):
+        return self._pid == os.getpid()
+
+    def poll(self):
+        """Re-read cache_versions and notify subscribers of changed tables"""
+        with self._lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+            row = self._db.execute("SELECT version FROM cache_versions WHERE name = ?", (ALL_TABLES,)).fetchone()
+            if row is not None and row[0] == self.versions.get(ALL_TABLES):
+                return
+            versions = dict(self._db.execute("SELECT name, version FROM cache_versions").fetchall())
+            changed = {name for name, version in versions.items() if self.versions.get(name) != version}
+            self.versions = versions
+
+        for listener in self.listeners:
+            listener(changed)
+
+    def notify(self):
+        """Wake the watchers of the other processes after a local commit"""
+        if self._socket is None:
+            return
+        own = self._socket.getsockname()
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        with sender:
+            for name in os.listdir(self.signal_dir):
+                path = os.path.join(self.signal_dir, name)
+                if path == own or not name.endswith('.sock'):
+                    continue
+                try:
+                    sender.sendto(b'1', path)
+                except BlockingIOError:
+                    # The peer has signals queued already
+                    pass
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a process that exited
+                    _unlink(path)
+
+    def _bind(self):
+        if not self.signal_dir or not hasattr(socket, 'AF_UNIX'):
+            return None
+        os.makedirs(self.signal_dir, exist_ok=True)
+        path = os.path.join(self.signal_dir, f"{os.getpid()}.sock")
+        _unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.settimeout(self.interval)
+        atexit.register(_unlink, path)
+        return sock
+
+    def _wait(self):
+        """Sleep until the next poll is due or another process signals"""
+        if self._socket is None:
+            time.sleep(self.interval)
+            return
+        try:
+            self._socket.recv(16)
+        except socket.timeout:
+            return
+        # A burst of commits needs only one poll
+        self._socket.setblocking(False)
+        try:
+            while True:
+                self._socket.recv(16)
+        except BlockingIOError:
+            pass
+        finally:
+            self._socket.settimeout(self.interval)
+
+    def _run(self):
+        while True:
+            self._wait()
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                print(f"Cache version poll failed: {e}")
+
+def configure_cache_versions(app):
+    """
+    Create the VersionWatcher that keeps in-process caches coherent.
+
+    CACHE_VERSION_INTERVAL (seconds, default 1) bounds how long a cache can
+    serve data changed by another process. When CACHE_SIGNAL_DIR is set,
+    processes sharing it signal each other after commits and usually see
+    changes within milliseconds. Writes by this process are seen before its
+    next request. The watcher only runs when a cache subscribed to it.
+    """
+    app.config.setdefault('CACHE_VERSION_INTERVAL', float(os.environ.get('CACHE_VERSION_INTERVAL', 1.0)))
+    app.config.setdefault('CACHE_SIGNAL_DIR', os.environ.get('CACHE_SIGNAL_DIR'))
+
+    watcher = VersionWatcher(
+        app.config['DATABASE_PATH'],
+        app.config['CACHE_VERSION_INTERVAL'],
+        app.config['CACHE_SIGNAL_DIR']
+    )
+
+    @app.before_request
+    def start_watcher():
+        # Started lazily so forked workers each get their own thread
+        watcher.start()
+
+    @app.after_request
+    def publish_writes(response):
+        if watcher.started and written_tables():
+            watcher.poll()
+            watcher.notify()
+        return response
+
+    app.extensions['cache_versions'] = watcher
+    return watcher
@@ -0,0 +1,112 @@
+from write_hooks import BODY_TABLES
+
+# Tables clients can sync from /api/changes: those the public endpoints
+# read. Feedback and admin users are logged but not served.
+CHANGE_FEED_TABLES = (
+    'menu', 'menu_links', 'year_name', 'contacts', 'social_networks', 'staff',
+    'blog_categories', 'blog_items', 'about_company', 'about_company_categories',
+    'about_company_category_items', 'documents_categories', 'documents_items'
+)
+
+# Internal columns left out of the row data of a delta
+HIDDEN_COLUMNS = ('json_cache', 'deleted_at')
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+def parse_changes_args(args):
+    """(since, limit, tables) from the query string; raises ValueError"""
+    try:
+        since = int(args.get('since', 0))
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("Invalid value for since or limit: expected an integer")
+    if since < 0 or not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"since must be 0 or more and limit between 1 and {MAX_LIMIT}")
+
+    tables = CHANGE_FEED_TABLES
+    if args.get('tables'):
+        tables = tuple(table.strip() for table in args['tables'].split(','))
+        unknown = [table for table in tables if table not in CHANGE_FEED_TABLES]
+        if unknown:
+            raise ValueError(f"Cannot sync {', '.join(unknown)}. Allowed: {', '.join(CHANGE_FEED_TABLES)}")
+    return since, limit, tables
+
+def current_rows(db, table, ids):
+    """Rows of ``table`` by id as dicts, with the body text of split tables"""
+    marks = ', '.join('?' * len(ids))
+    if table in BODY_TABLES:
+        sql = f"""SELECT t.*, b.text FROM {table} t
+                  LEFT JOIN {BODY_TABLES[table][0]} b ON b.item_id = t.id
+                  WHERE t.id IN ({marks})"""
+    else:
+        sql = f"SELECT * FROM {table} WHERE id IN ({marks})"
+    cur = db.execute(sql, ids)
+    names = [column[0] for column in cur.description]
+    rows = {}
+    for row in cur.fetchall():
+        item = {name: value for name, value in zip(names, row) if name not in HIDDEN_COLUMNS}
+        rows[item['id']] = item
+    return rows
+
+def changes_since(db, since, limit=DEFAULT_LIMIT, tables=CHANGE_FEED_TABLES):
+    """
+    Compacted changes after sequence number ``since``: one delta per changed
+    row, for its latest change, ordered by sequence number.
+
+    A delta's ``op`` is 'upsert' with the current row in ``data``, 'delete'
+    when the row is gone or soft-deleted, or 'reload' (no ``id``) when a
+    write touched a whole table. Returns (deltas, next_since, has_more);
+    pass ``next_since`` as ``since`` to get the following page.
+    """
+    # Every page ends at a fixed point, even while writes are logged
+    latest = db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+    marks = ', '.join('?' * len(tables))
+    # SQLite takes the bare columns from the row with the MAX(seq)
+    rows = db.execute(
+        f"""SELECT table_name, item_id, action, MAX(seq) AS seq FROM changes
+            WHERE seq > ? AND seq <= ? AND table_name IN ({marks})
+            GROUP BY table_name, item_id
+            ORDER BY seq
+            LIMIT ?""",
+        (since, latest, *tables, limit + 1)
+    ).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed = {}
+    for table, item_id, _, _ in rows:
+        if item_id is not None:
+            changed.setdefault(table, []).append(item_id)
+    current = {table: current_rows(db, table, ids) for table, ids in changed.items()}
+
+    deltas = []
+    for table, item_id, action, seq in rows:
+        delta = {'seq': seq, 'table': table, 'id': item_id, 'action': action}
+        if item_id is None:
+            delta['op'] = 'reload'
+        else:
+            row = current[table].get(item_id)
+            if row is None or row.get('is_deleted'):
+                delta['op'] = 'delete'
+            else:
+                delta['op'] = 'upsert'
+                delta['data'] = row
+        deltas.append(delta)
+
+    next_since = rows[-1][3] if has_more else max(since, latest)
+    return deltas, next_since, has_more
+
+def compact_changes(db):
+    """
+    Delete log entries superseded by a later change of the same row. Deltas
+    only report the latest change of each row, so clients see no difference.
+    Returns the number of entries deleted.
+    """
+    cur = db.execute(
+        """DELETE FROM changes WHERE seq NOT IN (
+               SELECT MAX(seq) FROM changes GROUP BY table_name, item_id
+           )"""
+    )
+    db.commit()
+    return cur.rowcount
@@ -0,0 +1,127 @@
+from flask import request
+from werkzeug.security import safe_join
+import gzip
+import hashlib
+import os
+import zlib
+from cache_backends import LocalCache
+
+# Content types worth compressing; everything else (images, archives) is
+# usually compressed already
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+}
+
+# Supported encodings in order of preference
+ENCODINGS = ['gzip', 'deflate']
+
+def compress(data, encoding, level):
+    """Compress ``data`` for the given Content-Encoding"""
+    if encoding == 'gzip':
+        # Fixed mtime so identical bodies give identical output
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)
+
+def is_compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+def add_vary(response, value):
+    """
+    Add a value to the Vary header, folding repeated Vary headers (such as
+    the one flask_cors adds for Origin) into a single header.
+    """
+    values = []
+    for header in response.headers.getlist('Vary'):
+        for item in header.split(','):
+            item = item.strip()
+            if item and item.lower() not in [v.lower() for v in values]:
+                values.append(item)
+    if value.lower() not in [v.lower() for v in values]:
+        values.append(value)
+    response.headers['Vary'] = ', '.join(values)
+
+def configure_compression(app):
+    """
+    Compress responses with gzip or deflate based on Accept-Encoding.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE and non-text content types are
+    sent as they are. Compressed bodies are cached by a hash of the
+    uncompressed body, and the Swagger UI static files by path and
+    modification time, so repeated responses are not compressed again.
+    Streamed responses are left untouched.
+    """
+    app.config.setdefault('COMPRESSION_MIN_SIZE', int(os.environ.get('COMPRESSION_MIN_SIZE', 500)))
+    app.config.setdefault('COMPRESSION_LEVEL', int(os.environ.get('COMPRESSION_LEVEL', 6)))
+    app.config.setdefault('COMPRESSION_CACHE_SIZE', int(os.environ.get('COMPRESSION_CACHE_SIZE', 16 * 1024 * 1024)))
+
+    cache = LocalCache(app.config['COMPRESSION_CACHE_SIZE'])
+    app.extensions['compression'] = cache
+
+    def static_path():
+        """Filesystem path of the flasgger static file being served, if any"""
+        if request.endpoint is None or not request.endpoint.endswith('.static'):
+            return None
+        blueprint = app.blueprints.get(request.blueprint)
+        if blueprint is None or not blueprint.static_folder:
+            return None
+        return safe_join(blueprint.static_folder, request.view_args.get('filename', ''))
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        if not is_compressible(response):
+            return response
+
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        level = app.config['COMPRESSION_LEVEL']
+
+        if response.direct_passthrough:
+            # Static files: compress once per file version
+            path = static_path()
+            if path is None or not os.path.isfile(path):
+                return response
+            stat = os.stat(path)
+            if stat.st_size < app.config['COMPRESSION_MIN_SIZE']:
+                return response
+            add_vary(response, 'Accept-Encoding')
+            if encoding is None:
+                return response
+
+            key = ('static', path, stat.st_mtime_ns, encoding)
+            body = cache.get(key)
+            if body is None:
+                with open(path, 'rb') as f:
+                    body = compress(f.read(), encoding, level)
+                cache.set(key, body)
+            response.direct_passthrough = False
+            response.response.close()
+        elif response.is_streamed:
+            return response
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESSION_MIN_SIZE']:
+                return response
+            add_vary(response, 'Accept-Encoding')
+            if encoding is None:
+                return response
+
+            key = (hashlib.sha1(data).digest(), encoding)
+            body = cache.get(key)
+            if body is None:
+                body = compress(data, encoding, level)
+                cache.set(key, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+
+        # The compressed representation needs its own validator
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+
+        return response
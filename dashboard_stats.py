@@ -0,0 +1,155 @@
+import datetime
+
+# Tables whose rows are counted per category, and the category table
+CATEGORY_TABLES = {
+    'blog_items': 'blog_categories',
+    'documents_items': 'documents_categories',
+    'about_company_category_items': 'about_company_categories'
+}
+
+# Aggregate tables kept current by triggers; each row holds active and
+# deleted row counts and the views of the active rows for its key
+STATS_KEYS = {
+    'stats_table_counts': ('table_name',),
+    'stats_category_counts': ('table_name', 'category_id'),
+    'stats_feedback_daily': ('day', 'theme')
+}
+
+def _key_expressions(table, row):
+    """Aggregate table -> key expressions that ``row`` of ``table`` counts under"""
+    keys = {'stats_table_counts': (f"'{table}'",)}
+    if table in CATEGORY_TABLES:
+        keys['stats_category_counts'] = (f"'{table}'", f"COALESCE({row}.category_id, 0)")
+    if table == 'feedback':
+        keys['stats_feedback_daily'] = (f"COALESCE(substr({row}.created_at, 1, 10), '')", f"COALESCE({row}.theme, '')")
+    return keys
+
+def _apply(table, columns, row, sign):
+    """Statements adding (sign 1) or removing (sign -1) ``row`` from the aggregates"""
+    alive = f"(COALESCE({row}.is_deleted, 0) = 0)"
+    views = f"(CASE WHEN {alive} THEN COALESCE({row}.views, 0) ELSE 0 END)" if 'views' in columns else "0"
+    statements = []
+    for stats_table, expressions in _key_expressions(table, row).items():
+        names = STATS_KEYS[stats_table]
+        match = ' AND '.join(f"{name} = {expression}" for name, expression in zip(names, expressions))
+        statements.append(
+            f"INSERT OR IGNORE INTO {stats_table} ({', '.join(names)}) VALUES ({', '.join(expressions)});"
+        )
+        statements.append(
+            f"""UPDATE {stats_table} SET active = active + {sign} * {alive},
+                       deleted = deleted + {sign} * (1 - {alive}),
+                       views = views + {sign} * {views}
+                WHERE {match};"""
+        )
+    return statements
+
+def counted_tables(db):
+    """Tables with soft deletes, and their columns"""
+    tables = {}
+    for (table,) in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall():
+        columns = [row[1] for row in db.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'is_deleted' in columns:
+            tables[table] = columns
+    return tables
+
+def create_stats_triggers(db):
+    """(Re)create the triggers that keep the aggregate tables current"""
+    for table, columns in counted_tables(db).items():
+        watched = [column for column in ('is_deleted', 'views', 'category_id', 'created_at', 'theme')
+                   if column in columns]
+        triggers = {
+            'insert': ('INSERT', _apply(table, columns, 'NEW', 1)),
+            'delete': ('DELETE', _apply(table, columns, 'OLD', -1)),
+            'update': (f"UPDATE OF {', '.join(watched)}",
+                       _apply(table, columns, 'OLD', -1) + _apply(table, columns, 'NEW', 1))
+        }
+        for name, (event, statements) in triggers.items():
+            db.execute(f"DROP TRIGGER IF EXISTS stats_{table}_{name}")
+            db.execute(
+                f"CREATE TRIGGER stats_{table}_{name} AFTER {event} ON {table} BEGIN\n"
+                + '\n'.join(statements)
+                + "\nEND"
+            )
+
+def rebuild_stats(db):
+    """Recompute the aggregate tables from scratch"""
+    for stats_table in STATS_KEYS:
+        db.execute(f"DELETE FROM {stats_table}")
+    alive = "(COALESCE(is_deleted, 0) = 0)"
+    for table, columns in counted_tables(db).items():
+        views = f"CASE WHEN {alive} THEN COALESCE(views, 0) ELSE 0 END" if 'views' in columns else "0"
+        sums = f"COALESCE(SUM({alive}), 0), COALESCE(SUM(1 - {alive}), 0), COALESCE(SUM({views}), 0)"
+        db.execute(
+            f"INSERT INTO stats_table_counts (table_name, active, deleted, views) SELECT ?, {sums} FROM {table}",
+            (table,)
+        )
+        if table in CATEGORY_TABLES:
+            db.execute(
+                f"""INSERT INTO stats_category_counts (table_name, category_id, active, deleted, views)
+                    SELECT ?, COALESCE(category_id, 0), {sums} FROM {table}
+                    GROUP BY COALESCE(category_id, 0)""",
+                (table,)
+            )
+    db.execute(
+        f"""INSERT INTO stats_feedback_daily (day, theme, active, deleted, views)
+            SELECT COALESCE(substr(created_at, 1, 10), ''), COALESCE(theme, ''),
+                   SUM({alive}), SUM(1 - {alive}), 0
+            FROM feedback
+            GROUP BY 1, 2"""
+    )
+
+def dashboard_stats(db, days=30):
+    """
+    Dashboard figures read from the aggregate tables only: row counts and
+    views per table, per category, and feedback per day for the last
+    ``days`` days and per theme.
+    """
+    tables = {}
+    for table, active, deleted, views in db.execute(
+        "SELECT table_name, active, deleted, views FROM stats_table_counts ORDER BY table_name"
+    ).fetchall():
+        tables[table] = {'active': active, 'deleted': deleted, 'views': views}
+
+    categories = {}
+    for table, category_table in CATEGORY_TABLES.items():
+        categories[table] = [
+            {'category_id': category_id or None, 'name': name, 'active': active, 'deleted': deleted, 'views': views}
+            for category_id, name, active, deleted, views in db.execute(
+                f"""SELECT s.category_id, c.name, s.active, s.deleted, s.views
+                    FROM stats_category_counts s
+                    LEFT JOIN {category_table} c ON c.id = s.category_id
+                    WHERE s.table_name = ? AND (s.active OR s.deleted)
+                    ORDER BY s.active DESC""",
+                (table,)
+            ).fetchall()
+        ]
+
+    first_day = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    per_day = [
+        {'day': day, 'active': active, 'deleted': deleted}
+        for day, active, deleted in db.execute(
+            """SELECT day, SUM(active), SUM(deleted) FROM stats_feedback_daily
+               WHERE day >= ? GROUP BY day ORDER BY day""",
+            (first_day,)
+        ).fetchall()
+    ]
+    per_theme = [
+        {'theme': theme or None, 'active': active, 'deleted': deleted}
+        for theme, active, deleted in db.execute(
+            """SELECT theme, SUM(active), SUM(deleted) FROM stats_feedback_daily
+               GROUP BY theme ORDER BY SUM(active) DESC"""
+        ).fetchall()
+    ]
+
+    return {
+        'tables': tables,
+        'totals': {
+            'active': sum(counts['active'] for counts in tables.values()),
+            'deleted': sum(counts['deleted'] for counts in tables.values()),
+            'views': sum(counts['views'] for counts in tables.values())
+        },
+        'categories': categories,
+        'feedback': {'per_day': per_day, 'per_theme': per_theme}
+    }
@@ -0,0 +1,186 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+FEEDBACK_EVENT_COLUMNS = "id, full_name, phone_number, email, theme, text, created_at"
+
+# Rows read per query when a stream catches up from Last-Event-ID
+REPLAY_PAGE_SIZE = 100
+
+# Milliseconds browsers wait before reconnecting a closed stream
+RETRY_MILLISECONDS = 3000
+
+def fetch_feedback(db, after_id, limit=None):
+    """Active feedback with an id above ``after_id``, oldest first, as dicts"""
+    sql = f"SELECT {FEEDBACK_EVENT_COLUMNS} FROM feedback WHERE id > ? AND is_deleted = 0 ORDER BY id"
+    params = [after_id]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cur = db.execute(sql, params)
+    names = [column[0] for column in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+def format_event(row):
+    return f"id: {row['id']}\nevent: feedback\ndata: {json.dumps(row)}\n\n"
+
+class Subscription:
+    """Events queued for one stream, at most ``buffer_size`` of them"""
+
+    def __init__(self, buffer_size):
+        self.events = queue.Queue(buffer_size)
+        self.overflowed = False
+
+class FeedbackBroadcaster:
+    """
+    Fans new feedback out to the open streams of this process.
+
+    It subscribes to the VersionWatcher when the first stream opens, so a
+    commit by any worker wakes it. Each change is read from the database
+    once and queued for every stream. A stream whose queue is full is marked
+    overflowed and ends; the client reconnects with Last-Event-ID and
+    catches up from the database. At most ``max_streams`` are open at once.
+    """
+
+    def __init__(self, path, watcher, buffer_size, max_streams):
+        self.path = path
+        self.watcher = watcher
+        self.buffer_size = buffer_size
+        self.max_streams = max_streams
+        self.last_id = None
+        self._subscriptions = set()
+        self._subscribed = False
+        self._pid = None
+
+    def _reset(self):
+        # Locks and connections do not survive a fork
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._slots = threading.BoundedSemaphore(self.max_streams)
+            self._db = None
+            self._subscriptions = set()
+            self.last_id = None
+            self._pid = os.getpid()
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+        return self._db
+
+    def open(self):
+        """A new Subscription, or None when max_streams are open"""
+        self._reset()
+        if not self._slots.acquire(blocking=False):
+            return None
+        subscription = Subscription(self.buffer_size)
+        with self._lock:
+            if self.last_id is None:
+                self.last_id = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM feedback").fetchone()[0]
+            self._subscriptions.add(subscription)
+            if not self._subscribed:
+                self.watcher.subscribe(self.publish)
+                self._subscribed = True
+        self.watcher.start()
+        return subscription
+
+    def close(self, subscription):
+        """Free the slot of ``subscription``; later calls do nothing"""
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+        self._slots.release()
+
+    def publish(self, tables):
+        """VersionWatcher listener: queue feedback committed since the last call"""
+        if 'feedback' not in tables or self._pid != os.getpid():
+            return
+        with self._lock:
+            if not self._subscriptions:
+                # Streams opened later start from the newest id again
+                self.last_id = None
+                return
+            rows = fetch_feedback(self._connect(), self.last_id)
+            if not rows:
+                return
+            self.last_id = rows[-1]['id']
+            for subscription in self._subscriptions:
+                if subscription.overflowed:
+                    continue
+                for row in rows:
+                    try:
+                        subscription.events.put_nowait(row)
+                    except queue.Full:
+                        subscription.overflowed = True
+                        break
+
+    def stream(self, subscription, last_event_id, heartbeat, max_duration):
+        """
+        Server-sent events for ``subscription``: feedback after
+        ``last_event_id`` from the database first, then new feedback as it
+        is committed, with a comment line every ``heartbeat`` seconds. Ends
+        after ``max_duration`` seconds so the worker thread is freed; clients
+        reconnect on their own. A client that went away is noticed at the
+        next write, at the latest with the next heartbeat.
+        """
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            last = last_event_id
+            if last is not None:
+                db = sqlite3.connect(self.path)
+                try:
+                    while True:
+                        rows = fetch_feedback(db, last, REPLAY_PAGE_SIZE)
+                        for row in rows:
+                            yield format_event(row)
+                            last = row['id']
+                        if len(rows) < REPLAY_PAGE_SIZE:
+                            break
+                finally:
+                    db.close()
+
+            deadline = time.monotonic() + max_duration
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = subscription.events.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                # Queued while the replay above already sent it
+                if last is not None and row['id'] <= last:
+                    continue
+                yield format_event(row)
+                last = row['id']
+        finally:
+            self.close(subscription)
+
+def configure_event_stream(app, watcher):
+    """
+    Set up the feedback event stream (/api/feedback/stream).
+
+    SSE_MAX_STREAMS (default 8) caps the open streams per process, since
+    each holds a worker thread. SSE_BUFFER_SIZE (default 100) bounds the
+    events queued per stream, SSE_HEARTBEAT (default 15 seconds) the time
+    between keep-alive comments, and SSE_MAX_DURATION (default 300 seconds)
+    how long one stream stays open. Other workers' feedback arrives within
+    CACHE_VERSION_INTERVAL, or immediately with CACHE_SIGNAL_DIR.
+    """
+    app.config.setdefault('SSE_MAX_STREAMS', int(os.environ.get('SSE_MAX_STREAMS', 8)))
+    app.config.setdefault('SSE_BUFFER_SIZE', int(os.environ.get('SSE_BUFFER_SIZE', 100)))
+    app.config.setdefault('SSE_HEARTBEAT', float(os.environ.get('SSE_HEARTBEAT', 15.0)))
+    app.config.setdefault('SSE_MAX_DURATION', float(os.environ.get('SSE_MAX_DURATION', 300.0)))
+
+    broadcaster = FeedbackBroadcaster(
+        app.config['DATABASE_PATH'],
+        watcher,
+        app.config['SSE_BUFFER_SIZE'],
+        app.config['SSE_MAX_STREAMS']
+    )
+    app.extensions['event_stream'] = broadcaster
+    return broadcaster
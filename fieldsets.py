@@ -0,0 +1,36 @@
+def parse_fields(value, allowed, default):
+    """
+    Resolve the ``fields`` query parameter against a resource whitelist.
+
+    ``allowed`` maps public field names to the SQL expression selecting them,
+    ``default`` is the projection used when the parameter is absent.
+    ``fields=all`` selects every whitelisted field.
+    Raises ValueError for unknown field names.
+    """
+    if not value:
+        return list(default)
+
+    if value.strip().lower() == 'all':
+        return list(allowed)
+
+    names = []
+    unknown = []
+    for name in value.split(','):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in allowed:
+            unknown.append(name)
+        names.append(name)
+
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    if not names:
+        return list(default)
+
+    return names
+
+def select_clause(names, allowed):
+    """Build the SELECT column list for the resolved field names"""
+    return ', '.join(f"{allowed[name]} AS {name}" for name in names)
@@ -1,18 +1,151 @@
 import sqlite3
 import os
+import sys
+import contextlib
 from werkzeug.security import generate_password_hash
 import datetime
+from json_cache import JSON_CACHE_TABLES, refresh_json_cache
+from dashboard_stats import create_stats_triggers, rebuild_stats
+from rendering import render_all
+from write_hooks import BODY_TABLES
 
-def init_db():
+def prepare_body_migration(c):
+    """
+    Move old-layout tables (with an inline text column) out of the way so the
+    narrow tables can be created. Returns the list of tables to copy back.
+    """
+    pending = []
+    for table in BODY_TABLES:
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'text' in columns:
+            c.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            pending.append(table)
+    return pending
+
+def finish_body_migration(c, pending):
+    """Copy rows and bodies from the renamed old-layout tables and drop them."""
+    for table in pending:
+        bodies_table, columns = BODY_TABLES[table]
+        column_list = ', '.join(columns)
+        c.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_old")
+        c.execute(f"INSERT INTO {bodies_table} (item_id, text) SELECT id, text FROM {table}_old")
+        # Keep AUTOINCREMENT from reusing ids of rows deleted before the migration
+        c.execute(
+            "UPDATE sqlite_sequence SET seq = (SELECT seq FROM sqlite_sequence WHERE name = ?) WHERE name = ?",
+            (f"{table}_old", table)
+        )
+        c.execute("DELETE FROM sqlite_sequence WHERE name = ?", (f"{table}_old",))
+        c.execute(f"DROP TABLE {table}_old")
+        print(f"Moved {table}.text into {bodies_table}")
+
+# Back the filters and sort keys whitelisted by the list endpoints
+# index name -> table and columns
+INDEXES = {
+    'idx_feedback_created_at': 'feedback (created_at)',
+    'idx_feedback_theme': 'feedback (theme, created_at)',
+    'idx_staff_position': 'staff (position)',
+    'idx_blog_items_date_time': 'blog_items (date_time)',
+    'idx_blog_items_category': 'blog_items (category_id, date_time)',
+    'idx_blog_items_views': 'blog_items (views)',
+    'idx_about_company_items_date_time': 'about_company_category_items (date_time)',
+    'idx_about_company_items_category': 'about_company_category_items (category_id, date_time)',
+    'idx_about_company_items_views': 'about_company_category_items (views)',
+    'idx_documents_items_category': 'documents_items (category_id)',
+    'idx_menu_links_position': 'menu_links (position)',
+    'idx_menu_links_menu': 'menu_links (menu_id, position)',
+    'idx_views_daily_period': 'views_daily (table_name, period)',
+    'idx_views_weekly_period': 'views_weekly (table_name, period)',
+    'idx_views_monthly_period': 'views_monthly (table_name, period)',
+    'idx_jobs_due': 'jobs (status, priority DESC, run_at)',
+    'idx_jobs_finished': 'jobs (status, finished_at)'
+}
+
+def create_indexes(c):
+    for name, definition in INDEXES.items():
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+def drop_indexes(c):
+    """Drop the secondary indexes, e.g. before a bulk load"""
+    for name in INDEXES:
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+
+def add_missing_columns(c):
+    """Add columns introduced after a table was first created"""
+    for table in JSON_CACHE_TABLES:
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'json_cache' not in columns:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN json_cache TEXT")
+
+    # Unique reader counts (see view_analytics.py)
+    for table, column, definition in (
+        ('blog_items', 'unique_views', 'INTEGER DEFAULT 0'),
+        ('about_company', 'unique_views', 'INTEGER DEFAULT 0'),
+        ('about_company_category_items', 'unique_views', 'INTEGER DEFAULT 0'),
+        ('views_daily', 'sketch', 'BLOB'),
+        ('views_weekly', 'sketch', 'BLOB'),
+        ('views_monthly', 'sketch', 'BLOB')
+    ):
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+        if column not in columns:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    # When a row was soft-deleted, for the archive retention (see archive.py)
+    now = datetime.datetime.now().isoformat()
+    for (table,) in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'is_deleted' in columns and 'deleted_at' not in columns:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN deleted_at TIMESTAMP")
+            # Rows deleted before the column existed age from now
+            c.execute(f"UPDATE {table} SET deleted_at = ? WHERE is_deleted = 1", (now,))
+
+# Stored in PRAGMA user_version. Bump it whenever init_db() creates or
+# changes a table, column, index or trigger, so existing databases are
+# migrated when the application starts (see migrate()).
+SCHEMA_VERSION = 1
+
+def schema_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def migrate(db_path):
+    """
+    Run init_db() on ``db_path`` if it was created by an older version;
+    returns whether it ran. Output goes to stderr, since under CGI stdout
+    is the response.
+    """
+    if schema_version(db_path) >= SCHEMA_VERSION:
+        return False
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            init_db(db_path)
+    except sqlite3.OperationalError:
+        # Another process starting at the same time may have migrated it
+        if schema_version(db_path) < SCHEMA_VERSION:
+            raise
+    return True
+
+def init_db(db_path=None):
     """Initialize the database with tables and default admin user."""
     # Connect to SQLite database (creates it if it doesn't exist)
-    db_path = os.environ.get('DATABASE_PATH', 'database.db')
+    db_path = db_path or os.environ.get('DATABASE_PATH', 'database.db')
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
 
     # Enable foreign keys
     c.execute("PRAGMA foreign_keys = ON")
 
+    # New databases return pages freed by deletes to the file system in
+    # small steps (see maintenance.py); this can only be set before the
+    # first table is created
+    if not c.execute("SELECT 1 FROM sqlite_master").fetchone():
+        c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Tables created before bodies were split out are migrated in place
+    pending_body_migrations = prepare_body_migration(c)
+
     # Create tables
     # ===================== CORE NAVIGATION & CONTACTS =====================
     c.execute('''
@@ -20,7 +153,8 @@ def init_db():
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
         icon TEXT,
-        is_deleted INTEGER DEFAULT 0
+        is_deleted INTEGER DEFAULT 0,
+        json_cache TEXT
     )
     ''')
 
@@ -49,7 +183,8 @@ def init_db():
         name TEXT NOT NULL,
         icon TEXT,
         link TEXT NOT NULL,
-        is_deleted INTEGER DEFAULT 0
+        is_deleted INTEGER DEFAULT 0,
+        json_cache TEXT
     )
     ''')
 
@@ -75,7 +210,8 @@ def init_db():
         email TEXT,
         phone TEXT,
         photo TEXT,
-        is_deleted INTEGER DEFAULT 0
+        is_deleted INTEGER DEFAULT 0,
+        json_cache TEXT
     )
     ''')
 
@@ -96,13 +232,22 @@ def init_db():
         img_or_video_link TEXT,
         date_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         views INTEGER DEFAULT 0,
-        text TEXT NOT NULL,
+        unique_views INTEGER DEFAULT 0,
         intro_text TEXT,
         is_deleted INTEGER DEFAULT 0,
+        json_cache TEXT,
         FOREIGN KEY (category_id) REFERENCES blog_categories(id)
     )
     ''')
 
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS blog_item_bodies (
+        item_id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        FOREIGN KEY (item_id) REFERENCES blog_items(id) ON DELETE CASCADE
+    )
+    ''')
+
     # ===================== ABOUT COMPANY =====================
     c.execute('''
     CREATE TABLE IF NOT EXISTS about_company (
@@ -111,11 +256,19 @@ def init_db():
         img TEXT,
         date_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         views INTEGER DEFAULT 0,
-        text TEXT NOT NULL,
+        unique_views INTEGER DEFAULT 0,
         is_deleted INTEGER DEFAULT 0
     )
     ''')
 
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS about_company_bodies (
+        item_id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        FOREIGN KEY (item_id) REFERENCES about_company(id) ON DELETE CASCADE
+    )
+    ''')
+
     c.execute('''
     CREATE TABLE IF NOT EXISTS about_company_categories (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -129,8 +282,8 @@ def init_db():
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         category_id INTEGER,
         title TEXT NOT NULL,
-        text TEXT NOT NULL,
         views INTEGER DEFAULT 0,
+        unique_views INTEGER DEFAULT 0,
         date_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         feedback_id INTEGER,
         is_deleted INTEGER DEFAULT 0,
@@ -139,6 +292,23 @@ def init_db():
     )
     ''')
 
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS about_company_category_item_bodies (
+        item_id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        FOREIGN KEY (item_id) REFERENCES about_company_category_items(id) ON DELETE CASCADE
+    )
+    ''')
+
+    # Sanitized HTML of the bodies above, keyed by a hash of the markdown
+    # (see rendering.py)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS rendered_html (
+        content_hash TEXT PRIMARY KEY,
+        html TEXT NOT NULL
+    ) WITHOUT ROWID
+    ''')
+
     # ===================== DOCUMENTS =====================
     c.execute('''
     CREATE TABLE IF NOT EXISTS documents_categories (
@@ -156,6 +326,7 @@ def init_db():
         name TEXT NOT NULL,
         link TEXT NOT NULL,
         is_deleted INTEGER DEFAULT 0,
+        json_cache TEXT,
         FOREIGN KEY (category_id) REFERENCES documents_categories(id)
     )
     ''')
@@ -187,6 +358,139 @@ def init_db():
     )
     ''')
 
+    # ===================== CACHE COHERENCE =====================
+    # One row per table, bumped in the same transaction as every write
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    # ===================== CHANGE FEED =====================
+    # Append-only log of row changes, written next to cache_versions
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        item_id INTEGER,
+        action TEXT NOT NULL,
+        changed_at TIMESTAMP
+    )
+    ''')
+
+    # ===================== VIEW ANALYTICS =====================
+    # Views per item and day, ISO week (its Monday) and month (YYYY-MM),
+    # written in batches by view_analytics.ViewCounter, with a HyperLogLog
+    # sketch of the readers
+    for series_table in ('views_daily', 'views_weekly', 'views_monthly'):
+        c.execute(f'''
+        CREATE TABLE IF NOT EXISTS {series_table} (
+            table_name TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            views INTEGER NOT NULL DEFAULT 0,
+            sketch BLOB,
+            PRIMARY KEY (table_name, item_id, period)
+        ) WITHOUT ROWID
+        ''')
+
+    # Readers of each item over its lifetime, behind items.unique_views
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS item_sketches (
+        table_name TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        sketch BLOB NOT NULL,
+        PRIMARY KEY (table_name, item_id)
+    ) WITHOUT ROWID
+    ''')
+
+    # Random salt of the day for visitor hashes; older ones are deleted so
+    # hashes cannot be linked across days
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS visitor_salts (
+        day TEXT PRIMARY KEY,
+        salt BLOB NOT NULL
+    )
+    ''')
+
+    # ===================== DASHBOARD STATS =====================
+    # Aggregates for /api/admin/stats, kept current by triggers
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_table_counts (
+        table_name TEXT PRIMARY KEY,
+        active INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        views INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_category_counts (
+        table_name TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        active INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        views INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, category_id)
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS stats_feedback_daily (
+        day TEXT NOT NULL,
+        theme TEXT NOT NULL,
+        active INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        views INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, theme)
+    )
+    ''')
+
+    # ===================== JOBS =====================
+    # Background work queued by requests (see jobs.py); times are epoch
+    # seconds
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at REAL NOT NULL,
+        locked_until REAL,
+        worker TEXT,
+        unique_key TEXT UNIQUE,
+        last_error TEXT,
+        result TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''')
+
+    # ===================== MAINTENANCE =====================
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        task TEXT PRIMARY KEY,
+        last_run REAL,
+        duration REAL,
+        result TEXT
+    )
+    ''')
+
+    finish_body_migration(c, pending_body_migrations)
+    add_missing_columns(c)
+
+    # Triggers see the final columns; the aggregates start from the rows
+    create_stats_triggers(c)
+    rebuild_stats(c)
+
+    # ===================== INDEXES =====================
+    create_indexes(c)
+
     # Create default admin user
     now = datetime.datetime.now().isoformat()
     default_username = "admin"
@@ -202,6 +506,16 @@ def init_db():
         print(f"Created default admin user: {default_username} / {default_password}")
         print("IMPORTANT: Change this password after first login!")
 
+    # Render pre-serialized list fragments
+    for table in JSON_CACHE_TABLES:
+        refresh_json_cache(c, table)
+
+    # Render bodies written before rendering existed
+    rendered = render_all(c)
+    if rendered:
+        print(f"Rendered {rendered} bodies to HTML")
+
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
     conn.close()
     
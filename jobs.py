@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+
+# Seconds a claimed job stays invisible to other workers; a job still
+# running after that is assumed lost (its worker died) and retried
+DEFAULT_VISIBILITY_TIMEOUT = 300
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Seconds before the first retry, doubled for every further attempt
+DEFAULT_BACKOFF = 10
+MAX_BACKOFF = 3600
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_WORKERS = 0
+DEFAULT_RETENTION_DAYS = 7
+
+# Jobs that schedule their next run when they finish, and their default
+# seconds between runs
+DEFAULT_PERIODIC = {
+    'prune_jobs': 24 * 3600
+}
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+# Times a worker retries when another one claimed the same job first
+CLAIM_TRIES = 5
+
+def notify_feedback(db, payload, settings):
+    """POST new feedback to FEEDBACK_WEBHOOK_URL, if set"""
+    url = settings.get('feedback_webhook_url')
+    if not url:
+        return {'skipped': 'FEEDBACK_WEBHOOK_URL is not set'}
+    cur = db.execute(
+        "SELECT id, full_name, phone_number, email, theme, text, created_at FROM feedback WHERE id = ?",
+        (payload['feedback_id'],)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return {'skipped': 'feedback no longer exists'}
+    body = json.dumps({'event': 'feedback', 'feedback': dict(zip([c[0] for c in cur.description], row))})
+    request = urllib.request.Request(url, data=body.encode(), headers={'Content-Type': 'application/json'})
+    # Errors and non-2xx responses raise, so the job is retried
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return {'status': response.status}
+
+def prune_jobs(db, payload, settings):
+    """Delete finished jobs older than JOB_RETENTION_DAYS"""
+    cutoff = time.time() - settings['retention_days'] * 86400
+    cur = db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,))
+    return {'deleted_jobs': cur.rowcount}
+
+# Job kinds -> handler(db, payload, settings). Handlers run on their own
+# connection; what they write is committed together with the job's status.
+HANDLERS = {
+    'notify_feedback': notify_feedback,
+    'prune_jobs': prune_jobs
+}
+
+def enqueue(db, kind, payload=None, priority=0, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS, unique_key=None):
+    """
+    Add a job that runs ``delay`` seconds from now; higher ``priority``
+    runs first. Does not commit: call it before committing the write the
+    job belongs to, so both are saved or neither is. A job with the
+    ``unique_key`` of a job that has not finished yet is not added.
+    Returns the job id, or None when it was not added.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind}. Allowed: {', '.join(HANDLERS)}")
+    now = time.time()
+    cur = db.execute(
+        """INSERT OR IGNORE INTO jobs (kind, payload, priority, run_at, max_attempts, unique_key, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (kind, json.dumps(payload or {}), priority, now + delay, max_attempts, unique_key, now)
+    )
+    return cur.lastrowid if cur.rowcount == 1 else None
+
+def schedule_periodic(db, periodic):
+    """Queue the periodic jobs that have no pending run; does not commit"""
+    for kind in periodic:
+        enqueue(db, kind, unique_key=f"periodic:{kind}")
+
+def backoff(attempts, base=DEFAULT_BACKOFF):
+    """Seconds to wait before retrying a job that failed ``attempts`` times"""
+    return min(MAX_BACKOFF, base * 2 ** (attempts - 1))
+
+def expire_jobs(db, now, base_backoff=DEFAULT_BACKOFF):
+    """
+    Retry (or fail, when out of attempts) running jobs whose visibility
+    timeout passed. Returns how many there were.
+    """
+    expired = db.execute(
+        "SELECT id, attempts, max_attempts FROM jobs WHERE status = 'running' AND locked_until <= ?", (now,)
+    ).fetchall()
+    for job_id, attempts, max_attempts in expired:
+        failed = attempts >= max_attempts
+        db.execute(
+            """UPDATE jobs SET status = ?, run_at = ?, locked_until = NULL, worker = NULL,
+                              last_error = 'Visibility timeout expired', finished_at = ?,
+                              unique_key = CASE WHEN ? THEN NULL ELSE unique_key END
+               WHERE id = ? AND status = 'running' AND attempts = ?""",
+            ('failed' if failed else 'queued', now + backoff(attempts, base_backoff),
+             now if failed else None, failed, job_id, attempts)
+        )
+    if expired:
+        db.commit()
+    return len(expired)
+
+def claim_job(db, worker, visibility_timeout, now):
+    """
+    Mark the most urgent due job as running by ``worker`` until
+    ``visibility_timeout`` seconds from now and return it as a dict, or
+    None when no job is due. The update only succeeds while the job is
+    still queued, so concurrent workers never get the same job.
+    """
+    for _ in range(CLAIM_TRIES):
+        row = db.execute(
+            """SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ?
+               ORDER BY priority DESC, run_at, id LIMIT 1""",
+            (now,)
+        ).fetchone()
+        if row is None:
+            return None
+        cur = db.execute(
+            """UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?, worker = ?, started_at = ?
+               WHERE id = ? AND status = 'queued'""",
+            (now + visibility_timeout, worker, now, row[0])
+        )
+        db.commit()
+        if cur.rowcount == 1:
+            cur = db.execute("SELECT * FROM jobs WHERE id = ?", (row[0],))
+            return dict(zip([column[0] for column in cur.description], cur.fetchone()))
+    return None
+
+def run_job(db, job, worker, settings, periodic, base_backoff=DEFAULT_BACKOFF):
+    """
+    Run a claimed job and record the outcome, unless the job was given to
+    another worker meanwhile. Failed jobs are retried with exponential
+    backoff until they run out of attempts. Returns the new status.
+    """
+    try:
+        result = HANDLERS[job['kind']](db, json.loads(job['payload']), settings)
+        error = None
+    except Exception as e:
+        # Drop what the handler wrote before failing
+        db.rollback()
+        result = None
+        error = f"{type(e).__name__}: {e}"
+
+    now = time.time()
+    if error is None:
+        status = 'done'
+    elif job['attempts'] >= job['max_attempts']:
+        status = 'failed'
+    else:
+        status = 'queued'
+    finished = status != 'queued'
+    cur = db.execute(
+        """UPDATE jobs SET status = ?, run_at = ?, locked_until = NULL, worker = NULL, last_error = ?,
+                          result = ?, finished_at = ?, unique_key = CASE WHEN ? THEN NULL ELSE unique_key END
+           WHERE id = ? AND worker = ? AND attempts = ?""",
+        (status, now + backoff(job['attempts'], base_backoff) if status == 'queued' else job['run_at'],
+         error, json.dumps(result) if result is not None else None, now if finished else None, finished,
+         job['id'], worker, job['attempts'])
+    )
+    if cur.rowcount == 0:
+        # Timed out and claimed again; the other run records the outcome
+        db.rollback()
+        return None
+    if finished and job['kind'] in periodic:
+        enqueue(db, job['kind'], delay=periodic[job['kind']], unique_key=f"periodic:{job['kind']}")
+    db.commit()
+    return status
+
+def job_counts(db):
+    """Jobs per status, and the age in seconds of the oldest due queued job"""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    oldest = db.execute(
+        "SELECT MIN(run_at) FROM jobs WHERE status = 'queued' AND run_at <= ?", (time.time(),)
+    ).fetchone()[0]
+    return {
+        'counts': counts,
+        'oldest_due_seconds': round(time.time() - oldest, 3) if oldest is not None else None
+    }
+
+def retry_job(db, job_id):
+    """
+    Queue a failed job again with fresh attempts. Raises LookupError when
+    there is no such job and ValueError when it has not failed.
+    """
+    row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        raise LookupError('Job not found')
+    if row[0] != 'failed':
+        raise ValueError(f"Only failed jobs can be retried, this one is {row[0]}")
+    db.execute(
+        """UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, finished_at = NULL, last_error = NULL
+           WHERE id = ?""",
+        (time.time(), job_id)
+    )
+    db.commit()
+
+class JobRunner:
+    """
+    Worker threads running queued jobs in this process.
+
+    Each thread polls the jobs table every ``poll_interval`` seconds while
+    idle and runs due jobs back to back otherwise. Any number of processes
+    can run workers on the same database; claims are atomic, and jobs of a
+    worker that died are retried once their visibility timeout passes.
+    """
+
+    def __init__(self, path, workers, poll_interval, visibility_timeout, base_backoff, settings, periodic):
+        self.path = path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.base_backoff = base_backoff
+        self.settings = settings
+        self.periodic = periodic
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads in this process, again after a fork"""
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            db = sqlite3.connect(self.path)
+            try:
+                schedule_periodic(db, self.periodic)
+                db.commit()
+            finally:
+                db.close()
+            for number in range(self.workers):
+                threading.Thread(target=self._run, args=(number,), name=f"jobs-{number}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def worker_name(self, number):
+        return f"{socket.gethostname()}:{os.getpid()}:{number}"
+
+    def run_due(self, worker):
+        """Run due jobs until none is left; returns how many ran"""
+        ran = 0
+        db = sqlite3.connect(self.path)
+        try:
+            if expire_jobs(db, time.time(), self.base_backoff):
+                # A periodic job that ran out of attempts needs a next run
+                schedule_periodic(db, self.periodic)
+                db.commit()
+            while True:
+                job = claim_job(db, worker, self.visibility_timeout, time.time())
+                if job is None:
+                    return ran
+                run_job(db, job, worker, self.settings, self.periodic, self.base_backoff)
+                ran += 1
+        finally:
+            db.close()
+
+    def _run(self, number):
+        worker = self.worker_name(number)
+        while True:
+            try:
+                self.run_due(worker)
+            except sqlite3.Error as e:
+                print(f"Running jobs failed: {e}")
+            time.sleep(self.poll_interval)
+
+def job_settings(config):
+    return {
+        'feedback_webhook_url': config['FEEDBACK_WEBHOOK_URL'],
+        'retention_days': config['JOB_RETENTION_DAYS']
+    }
+
+def periodic_intervals(config):
+    intervals = {}
+    for kind in DEFAULT_PERIODIC:
+        interval = config[f"JOB_{kind.upper()}_INTERVAL"]
+        if interval > 0:
+            intervals[kind] = interval
+    return intervals
+
+def configure_jobs(app):
+    """
+    Run queued jobs in JOB_WORKERS threads per process. The default 0
+    starts no threads and leaves jobs to `python jobs.py` (`--once` from
+    cron on shared hosting, where every request may be a new process).
+
+    JOB_POLL_INTERVAL (default 1 second) is how soon an idle worker picks
+    up new jobs, JOB_VISIBILITY_TIMEOUT (default 300 seconds) how long a
+    job may run before it is considered lost, and JOB_BACKOFF (default 10
+    seconds) the wait before the first retry. Finished jobs are kept for
+    JOB_RETENTION_DAYS (default 7). JOB_<KIND>_INTERVAL sets the seconds
+    between runs of the periodic jobs in DEFAULT_PERIODIC (0 disables one).
+    FEEDBACK_WEBHOOK_URL receives new feedback as JSON.
+    """
+    app.config.setdefault('JOB_WORKERS', int(os.environ.get('JOB_WORKERS', DEFAULT_WORKERS)))
+    app.config.setdefault('JOB_POLL_INTERVAL', float(os.environ.get('JOB_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)))
+    app.config.setdefault('JOB_VISIBILITY_TIMEOUT', float(os.environ.get('JOB_VISIBILITY_TIMEOUT', DEFAULT_VISIBILITY_TIMEOUT)))
+    app.config.setdefault('JOB_BACKOFF', float(os.environ.get('JOB_BACKOFF', DEFAULT_BACKOFF)))
+    app.config.setdefault('JOB_RETENTION_DAYS', int(os.environ.get('JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)))
+    app.config.setdefault('FEEDBACK_WEBHOOK_URL', os.environ.get('FEEDBACK_WEBHOOK_URL'))
+    for kind, interval in DEFAULT_PERIODIC.items():
+        key = f"JOB_{kind.upper()}_INTERVAL"
+        app.config.setdefault(key, float(os.environ.get(key, interval)))
+
+    runner = JobRunner(
+        app.config['DATABASE_PATH'],
+        app.config['JOB_WORKERS'],
+        app.config['JOB_POLL_INTERVAL'],
+        app.config['JOB_VISIBILITY_TIMEOUT'],
+        app.config['JOB_BACKOFF'],
+        job_settings(app.config),
+        periodic_intervals(app.config)
+    )
+
+    if runner.workers > 0:
+        @app.before_request
+        def start_job_workers():
+            # Started lazily so forked workers each get their own threads
+            runner.start()
+
+    app.extensions['jobs'] = runner
+    return runner
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued jobs')
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'database.db'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('JOB_WORKERS', DEFAULT_WORKERS)) or 1)
+    parser.add_argument('--once', action='store_true', help='Run the jobs that are due now and exit')
+    args = parser.parse_args()
+
+    config = {
+        'FEEDBACK_WEBHOOK_URL': os.environ.get('FEEDBACK_WEBHOOK_URL'),
+        'JOB_RETENTION_DAYS': int(os.environ.get('JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+    }
+    for kind, interval in DEFAULT_PERIODIC.items():
+        key = f"JOB_{kind.upper()}_INTERVAL"
+        config[key] = float(os.environ.get(key, interval))
+    runner = JobRunner(
+        args.db,
+        args.workers,
+        float(os.environ.get('JOB_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)),
+        float(os.environ.get('JOB_VISIBILITY_TIMEOUT', DEFAULT_VISIBILITY_TIMEOUT)),
+        float(os.environ.get('JOB_BACKOFF', DEFAULT_BACKOFF)),
+        job_settings(config),
+        periodic_intervals(config)
+    )
+
+    if args.once:
+        db = sqlite3.connect(args.db)
+        try:
+            schedule_periodic(db, runner.periodic)
+            db.commit()
+        finally:
+            db.close()
+        print(f"Ran {runner.run_due(runner.worker_name(0))} jobs")
+        return
+    runner.start()
+    print(f"{args.workers} job workers running on {args.db}")
+    while True:
+        time.sleep(3600)
+
+if __name__ == "__main__":
+    main()
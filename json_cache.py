@@ -0,0 +1,64 @@
+from serializers import SerializedRows, compile_row_serializer
+
+# Read-mostly tables whose rows carry a pre-rendered JSON fragment of their
+# list representation in a json_cache column. Each query selects exactly the
+# fields the list endpoint returns and is filtered on the given alias.
+# table -> (query, alias)
+JSON_CACHE_TABLES = {
+    'menu': (
+        "SELECT m.id, m.name, m.icon, m.is_deleted FROM menu m",
+        'm'
+    ),
+    'social_networks': (
+        "SELECT s.id, s.name, s.icon, s.link, s.is_deleted FROM social_networks s",
+        's'
+    ),
+    'staff': (
+        "SELECT s.id, s.position, s.full_name, s.email, s.phone, s.photo, s.is_deleted FROM staff s",
+        's'
+    ),
+    'documents_items': (
+        """SELECT di.id, di.category_id, di.title, di.name, di.link, di.is_deleted,
+                  dc.name AS category_name
+           FROM documents_items di
+           LEFT JOIN documents_categories dc ON di.category_id = dc.id""",
+        'di'
+    ),
+    # BLOG_ITEM_SUMMARY_FIELDS in routes/blog.py without views and
+    # unique_views, which every flush of buffered view counts changes; the
+    # list query appends them
+    'blog_items': (
+        """SELECT bi.id, bi.category_id, bc.name AS category_name, bi.title,
+                  bi.img_or_video_link, bi.date_time, bi.intro_text, bi.is_deleted
+           FROM blog_items bi
+           LEFT JOIN blog_categories bc ON bi.category_id = bc.id""",
+        'bi'
+    )
+}
+
+def refresh_json_cache(db, table, column='id', value=None):
+    """
+    Re-render the json_cache fragment of the rows in ``table`` where
+    ``column`` equals ``value`` (all rows when value is None).
+
+    Call before committing a write so the fragment changes in the same
+    transaction as the row.
+    """
+    if table not in JSON_CACHE_TABLES:
+        return
+
+    query, alias = JSON_CACHE_TABLES[table]
+    params = ()
+    if value is not None:
+        query += f" WHERE {alias}.{column} = ?"
+        params = (value,)
+
+    cur = db.execute(query, params)
+    serialize = compile_row_serializer(cur.description)
+    updates = [(serialize(row), row[0]) for row in cur.fetchall()]
+
+    db.executemany(f"UPDATE {table} SET json_cache = ? WHERE id = ?", updates)
+
+def cached_rows(cur):
+    """Assemble a list response from a cursor selecting json_cache"""
+    return SerializedRows(row[0] for row in cur.fetchall())
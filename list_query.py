@@ -0,0 +1,135 @@
+import datetime
+
+# Cache of EXPLAIN QUERY PLAN results keyed by SQL text
+_plan_cache = {}
+
+def _parse_value(name, value, value_type):
+    """Convert a query string value to the type declared for the filter"""
+    if value_type == 'int':
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: expected an integer")
+    if value_type == 'date':
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: expected an ISO date")
+    return value
+
+def _parse_filters(args, filters):
+    """
+    Build WHERE conditions from whitelisted filters.
+
+    ``filters`` maps a parameter name to ``(column, type)``. Filters of type
+    ``date`` are exposed as ``<name>_from`` and ``<name>_to`` range bounds,
+    all other types as ``<name>`` equality.
+    """
+    conditions = []
+    params = []
+
+    for name, (column, value_type) in filters.items():
+        if value_type == 'date':
+            date_from = args.get(f"{name}_from")
+            if date_from:
+                value = _parse_value(f"{name}_from", date_from, 'date')
+                conditions.append(f"{column} >= ?")
+                params.append(value.isoformat())
+
+            date_to = args.get(f"{name}_to")
+            if date_to:
+                value = _parse_value(f"{name}_to", date_to, 'date')
+                if len(date_to) == 10:
+                    # A bare date includes the whole day
+                    conditions.append(f"{column} < ?")
+                    params.append((value + datetime.timedelta(days=1)).isoformat())
+                else:
+                    conditions.append(f"{column} <= ?")
+                    params.append(value.isoformat())
+        else:
+            value = args.get(name)
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(_parse_value(name, value, value_type))
+
+    return conditions, params
+
+def _parse_sort(value, sorts):
+    """Build an ORDER BY clause from a sort spec such as ``-date_time,id``"""
+    terms = []
+    for key in value.split(','):
+        key = key.strip()
+        if not key:
+            continue
+        direction = 'ASC'
+        if key.startswith('-'):
+            key = key[1:]
+            direction = 'DESC'
+        if key not in sorts:
+            raise ValueError(f"Cannot sort by {key}. Allowed: {', '.join(sorts)}")
+        terms.append(f"{sorts[key]} {direction}")
+
+    if not terms:
+        raise ValueError("Empty sort parameter")
+
+    return ', '.join(terms)
+
+def build_list_query(spec, args, columns='*', joins=''):
+    """
+    Compose a parameterized list query from a resource spec and request args.
+
+    ``spec`` keys:
+      - ``from``: table (with alias) and joins that are always needed
+      - ``filters``: whitelisted filters, see ``_parse_filters``
+      - ``sorts``: sort keys mapped to indexed columns
+      - ``default_sort``: sort spec used when ``sort`` is not given
+      - ``active`` (optional): condition selecting non-deleted rows, applied
+        unless ``include_deleted=true``
+
+    Returns ``(sql, params)``. Raises ValueError for invalid input.
+    """
+    conditions, params = _parse_filters(args, spec.get('filters', {}))
+
+    include_deleted = args.get('include_deleted', 'false').lower() == 'true'
+    if spec.get('active') and not include_deleted:
+        conditions.insert(0, spec['active'])
+
+    order_by = _parse_sort(args.get('sort') or spec['default_sort'], spec['sorts'])
+
+    sql = f"SELECT {columns} FROM {spec['from']}"
+    if joins:
+        sql += f" {joins}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    sql += f" ORDER BY {order_by}"
+
+    return sql, params
+
+def requires_full_sort(db, sql, params):
+    """
+    Return True if SQLite would scan the whole table and sort it in a temp
+    B-tree to answer the query, i.e. the ORDER BY is not backed by an index
+    and no filter narrows the scan.
+    """
+    if sql not in _plan_cache:
+        plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        temp_sort = any('TEMP B-TREE FOR ORDER BY' in detail for detail in plan)
+        full_scan = any(detail.startswith('SCAN') for detail in plan)
+        _plan_cache[sql] = temp_sort and full_scan
+    return _plan_cache[sql]
+
+def execute_list_query(db, spec, args, columns='*', joins=''):
+    """
+    Build and run a list query, returning the cursor.
+
+    Client-supplied sorts that would need a full-table temp sort are
+    rejected with ValueError; default sorts are index-backed by schema.
+    """
+    sql, params = build_list_query(spec, args, columns, joins)
+
+    if args.get('sort') and requires_full_sort(db, sql, params):
+        raise ValueError(f"Sorting by {args.get('sort')} is not supported with these filters")
+
+    cur = db.cursor()
+    cur.execute(sql, params)
+    return cur
@@ -0,0 +1,341 @@
+import sqlite3
+import os
+import argparse
+import datetime
+import json
+import threading
+import time
+from archive import DEFAULT_BATCH_SIZE, archive_deleted_rows, default_archive_path, parse_retention
+from changes import compact_changes
+from rendering import prune_rendered
+from view_analytics import DEFAULT_DAILY_RETENTION_DAYS, compact_daily_views
+
+# Default seconds between runs of each task
+DEFAULT_INTERVALS = {
+    'optimize': 3600,
+    'analyze': 24 * 3600,
+    'incremental_vacuum': 3600,
+    'wal_checkpoint': 300,
+    'archive': 24 * 3600,
+    'compact_changes': 24 * 3600,
+    'compact_views': 24 * 3600,
+    'prune_rendered': 24 * 3600
+}
+
+# Pages returned to the file system per incremental_vacuum run, so one run
+# never holds the write lock for long
+DEFAULT_VACUUM_PAGES = 2000
+
+# WAL size above which a checkpoint also truncates the file
+DEFAULT_WAL_MAX_BYTES = 64 * 1024 * 1024
+
+def optimize(db, settings):
+    db.execute("PRAGMA optimize")
+    return {}
+
+def analyze(db, settings):
+    db.execute("ANALYZE")
+    return {}
+
+def incremental_vacuum(db, settings):
+    if db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return {'skipped': 'auto_vacuum is not INCREMENTAL'}
+    before = db.execute("PRAGMA freelist_count").fetchone()[0]
+    if before:
+        # The pragma frees one page per step and has no result columns, so
+        # execute() would step it once; executescript() runs it to the end
+        db.executescript(f"PRAGMA incremental_vacuum({int(settings['vacuum_pages'])});")
+    after = db.execute("PRAGMA freelist_count").fetchone()[0]
+    return {'freed_pages': before - after, 'freelist_count': after}
+
+def wal_checkpoint(db, settings):
+    if db.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+        return {'skipped': 'journal_mode is not WAL'}
+    wal_bytes = file_size(settings['path'] + '-wal')
+    mode = 'TRUNCATE' if wal_bytes > settings['wal_max_bytes'] else 'PASSIVE'
+    busy, log_frames, checkpointed = db.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return {
+        'mode': mode,
+        'busy': bool(busy),
+        'wal_bytes_before': wal_bytes,
+        'log_frames': log_frames,
+        'checkpointed_frames': checkpointed
+    }
+
+def archive(db, settings):
+    moved = archive_deleted_rows(db, settings['archive_path'], settings['archive_retention'], settings['archive_batch_size'])
+    return {'archived_rows': moved}
+
+def compact_changes_log(db, settings):
+    return {'deleted_entries': compact_changes(db)}
+
+def compact_views(db, settings):
+    return {'deleted_daily_rows': compact_daily_views(db, settings['views_daily_retention_days'])}
+
+def prune_rendered_html(db, settings):
+    return {'deleted_renders': prune_rendered(db)}
+
+TASKS = {
+    'optimize': optimize,
+    'analyze': analyze,
+    'incremental_vacuum': incremental_vacuum,
+    'wal_checkpoint': wal_checkpoint,
+    'archive': archive,
+    'compact_changes': compact_changes_log,
+    'compact_views': compact_views,
+    'prune_rendered': prune_rendered_html
+}
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def claim_task(db, task, interval, now):
+    """
+    Record that ``task`` runs now unless it ran within ``interval`` seconds.
+
+    The check and the update are one statement, so when several workers
+    find a task due at the same time only one of them gets it.
+    """
+    cur = db.execute(
+        """INSERT INTO maintenance_runs (task, last_run) VALUES (?, ?)
+           ON CONFLICT (task) DO UPDATE SET last_run = excluded.last_run
+           WHERE last_run <= ?""",
+        (task, now, now - interval)
+    )
+    db.commit()
+    return cur.rowcount == 1
+
+def run_task(db, task, settings):
+    """Run one maintenance task and record its duration and result"""
+    started = time.perf_counter()
+    result = TASKS[task](db, settings)
+    duration = round(time.perf_counter() - started, 3)
+    db.execute(
+        """INSERT INTO maintenance_runs (task, last_run, duration, result) VALUES (?, ?, ?, ?)
+           ON CONFLICT (task) DO UPDATE SET duration = excluded.duration, result = excluded.result""",
+        (task, time.time(), duration, json.dumps(result))
+    )
+    db.commit()
+    return dict(result, duration=duration)
+
+def last_runs(db):
+    runs = {}
+    for task, last_run, duration, result in db.execute(
+        "SELECT task, last_run, duration, result FROM maintenance_runs"
+    ).fetchall():
+        runs[task] = {
+            'last_run': datetime.datetime.fromtimestamp(last_run).isoformat() if last_run else None,
+            'duration': duration,
+            'result': json.loads(result) if result else None
+        }
+    return runs
+
+def database_stats(db, path, tables=False):
+    """
+    File size, page and freelist counts of the database. With ``tables``,
+    also the size and unused bytes of every table and index (needs SQLite
+    built with the dbstat virtual table, and reads the whole file).
+    """
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = db.execute("PRAGMA freelist_count").fetchone()[0]
+    stats = {
+        'file_bytes': file_size(path),
+        'wal_bytes': file_size(path + '-wal'),
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'freelist_bytes': freelist_count * page_size,
+        'freelist_ratio': round(freelist_count / page_count, 4) if page_count else 0,
+        'auto_vacuum': ['NONE', 'FULL', 'INCREMENTAL'][db.execute("PRAGMA auto_vacuum").fetchone()[0]],
+        'journal_mode': db.execute("PRAGMA journal_mode").fetchone()[0]
+    }
+    if tables:
+        try:
+            rows = db.execute(
+                """SELECT name, COUNT(*), SUM(pgsize), SUM(unused)
+                   FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC"""
+            ).fetchall()
+        except sqlite3.OperationalError:
+            stats['tables'] = None
+        else:
+            stats['tables'] = [
+                {
+                    'name': name,
+                    'pages': pages,
+                    'bytes': size,
+                    'unused_bytes': unused,
+                    'fragmentation': round(unused / size, 4) if size else 0
+                }
+                for name, pages, size, unused in rows
+            ]
+    return stats
+
+class MaintenanceScheduler:
+    """
+    Background thread running the maintenance TASKS of one worker process.
+
+    A task is due ``intervals[task]`` seconds after its last run by any
+    worker, as recorded in the maintenance_runs table. Due tasks wait until
+    no request was handled for ``idle_seconds``, but run anyway once they
+    are a full interval overdue.
+    """
+
+    def __init__(self, path, intervals, idle_seconds, settings):
+        self.path = path
+        self.intervals = intervals
+        self.idle_seconds = idle_seconds
+        self.settings = dict(settings, path=path)
+        self.last_request = time.monotonic()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def touch(self):
+        """Note that a request is being handled"""
+        self.last_request = time.monotonic()
+
+    def start(self):
+        """Start the thread in this process, again after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name='maintenance', daemon=True).start()
+            self._pid = os.getpid()
+
+    def run_due(self):
+        """Run the tasks that are due now; returns their names"""
+        now = time.time()
+        idle = time.monotonic() - self.last_request >= self.idle_seconds
+        ran = []
+        db = sqlite3.connect(self.path)
+        try:
+            last = dict(db.execute("SELECT task, last_run FROM maintenance_runs").fetchall())
+            for task, interval in self.intervals.items():
+                elapsed = now - (last.get(task) or 0)
+                if elapsed < interval or (not idle and elapsed < 2 * interval):
+                    continue
+                if claim_task(db, task, interval, now):
+                    run_task(db, task, self.settings)
+                    ran.append(task)
+        finally:
+            db.close()
+        return ran
+
+    def _run(self):
+        # Often enough to catch short idle periods, rarely enough to be free
+        tick = max(1.0, min(60.0, min(self.intervals.values()) / 10))
+        while True:
+            time.sleep(tick)
+            try:
+                self.run_due()
+            except sqlite3.Error as e:
+                print(f"Database maintenance failed: {e}")
+
+def maintenance_settings(config):
+    return {
+        'vacuum_pages': config['MAINTENANCE_VACUUM_PAGES'],
+        'wal_max_bytes': config['MAINTENANCE_WAL_MAX_BYTES'],
+        'archive_path': config['ARCHIVE_PATH'],
+        'archive_retention': config['ARCHIVE_RETENTION'],
+        'archive_batch_size': config['ARCHIVE_BATCH_SIZE'],
+        'views_daily_retention_days': config['VIEWS_DAILY_RETENTION_DAYS']
+    }
+
+def configure_maintenance(app):
+    """
+    Run database maintenance in the background when MAINTENANCE is enabled.
+
+    MAINTENANCE_<TASK>_INTERVAL overrides the seconds between runs of a task
+    in DEFAULT_INTERVALS (0 disables it). Tasks wait for
+    MAINTENANCE_IDLE_SECONDS (default 5) without requests, for at most one
+    more interval. Returns the scheduler or None.
+    """
+    app.config.setdefault('MAINTENANCE', os.environ.get('MAINTENANCE', 'false').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('MAINTENANCE_IDLE_SECONDS', float(os.environ.get('MAINTENANCE_IDLE_SECONDS', 5)))
+    app.config.setdefault('MAINTENANCE_VACUUM_PAGES', int(os.environ.get('MAINTENANCE_VACUUM_PAGES', DEFAULT_VACUUM_PAGES)))
+    app.config.setdefault('MAINTENANCE_WAL_MAX_BYTES', int(os.environ.get('MAINTENANCE_WAL_MAX_BYTES', DEFAULT_WAL_MAX_BYTES)))
+    for task, interval in DEFAULT_INTERVALS.items():
+        key = f"MAINTENANCE_{task.upper()}_INTERVAL"
+        app.config.setdefault(key, float(os.environ.get(key, interval)))
+
+    if not app.config['MAINTENANCE']:
+        return None
+
+    intervals = {
+        task: app.config[f"MAINTENANCE_{task.upper()}_INTERVAL"]
+        for task in DEFAULT_INTERVALS
+        if app.config[f"MAINTENANCE_{task.upper()}_INTERVAL"] > 0
+    }
+    if not intervals:
+        return None
+
+    scheduler = MaintenanceScheduler(
+        app.config['DATABASE_PATH'],
+        intervals,
+        app.config['MAINTENANCE_IDLE_SECONDS'],
+        maintenance_settings(app.config)
+    )
+
+    @app.before_request
+    def track_activity():
+        # Started lazily so forked workers each get their own thread
+        scheduler.start()
+        scheduler.touch()
+
+    app.extensions['maintenance'] = scheduler
+    return scheduler
+
+def enable_incremental_vacuum(path):
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL. This rewrites
+    the whole file with VACUUM, so run it while the application is stopped.
+    """
+    db = sqlite3.connect(path)
+    try:
+        db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db.execute("VACUUM")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run database maintenance tasks now')
+    parser.add_argument('tasks', nargs='*', help=f"Tasks to run: {', '.join(TASKS)} (default: all)")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'database.db'))
+    parser.add_argument('--stats', action='store_true', help='Only print database stats, including per-table fragmentation')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='Switch an existing database to auto_vacuum=INCREMENTAL (the app must be stopped)')
+    args = parser.parse_args()
+    unknown = set(args.tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown tasks: {', '.join(sorted(unknown))}")
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(args.db)
+        print(f"{args.db} now uses auto_vacuum=INCREMENTAL")
+
+    db = sqlite3.connect(args.db)
+    try:
+        if not args.stats:
+            settings = {
+                'path': args.db,
+                'vacuum_pages': int(os.environ.get('MAINTENANCE_VACUUM_PAGES', DEFAULT_VACUUM_PAGES)),
+                'wal_max_bytes': int(os.environ.get('MAINTENANCE_WAL_MAX_BYTES', DEFAULT_WAL_MAX_BYTES)),
+                'archive_path': os.environ.get('ARCHIVE_PATH') or default_archive_path(args.db),
+                'archive_retention': parse_retention(os.environ.get('ARCHIVE_RETENTION')),
+                'archive_batch_size': int(os.environ.get('ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+                'views_daily_retention_days': int(os.environ.get('VIEWS_DAILY_RETENTION_DAYS', DEFAULT_DAILY_RETENTION_DAYS))
+            }
+            for task in args.tasks or TASKS:
+                claim_task(db, task, 0, time.time())
+                print(f"{task}: {run_task(db, task, settings)}")
+        print(json.dumps(database_stats(db, args.db, tables=args.stats), indent=2))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
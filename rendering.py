@@ -0,0 +1,91 @@
+import hashlib
+import sqlite3
+import mistune
+
+# Tables holding the markdown text of blog items and about company pages
+BODY_TEXT_TABLES = ('blog_item_bodies', 'about_company_bodies', 'about_company_category_item_bodies')
+
+# Values of the ?format= parameter of the single item endpoints
+FORMATS = ('raw', 'html')
+
+# Part of every content hash; change it when the renderer or its plugins
+# change so stored HTML is rendered again
+RENDERER_VERSION = 'mistune-3/1'
+
+# Raw HTML in the text is escaped rather than passed through, and links
+# and images with javascript:, vbscript:, file: or data: URLs (other than
+# data: images) are replaced by "#harmful-link"
+_markdown = mistune.create_markdown(escape=True, plugins=['strikethrough', 'table', 'url'])
+
+def parse_format(args):
+    """The requested ?format=, 'raw' by default; raises ValueError"""
+    format_ = args.get('format', 'raw')
+    if format_ not in FORMATS:
+        raise ValueError(f"Invalid format. Allowed: {', '.join(FORMATS)}")
+    return format_
+
+def content_hash(text):
+    return hashlib.sha256(f"{RENDERER_VERSION}\0{text or ''}".encode()).hexdigest()
+
+def render_html(text):
+    """Sanitized HTML of markdown ``text``"""
+    return _markdown(text or '')
+
+def store_rendered(db, text):
+    """
+    Render ``text`` unless its HTML is stored already. Call before
+    committing a write so the HTML is saved in the same transaction.
+    Returns whether it was rendered.
+    """
+    key = content_hash(text)
+    if db.execute("SELECT 1 FROM rendered_html WHERE content_hash = ?", (key,)).fetchone():
+        return False
+    db.execute("INSERT INTO rendered_html (content_hash, html) VALUES (?, ?)", (key, render_html(text)))
+    return True
+
+def rendered_html(db, text):
+    """
+    Stored HTML of ``text``. Text written before rendering existed is
+    rendered now and stored when the connection can write; read-only
+    snapshot connections just return it.
+    """
+    row = db.execute("SELECT html FROM rendered_html WHERE content_hash = ?", (content_hash(text),)).fetchone()
+    if row:
+        return row[0]
+    html = render_html(text)
+    try:
+        db.execute("INSERT OR IGNORE INTO rendered_html (content_hash, html) VALUES (?, ?)", (content_hash(text), html))
+        db.commit()
+    except sqlite3.Error:
+        pass
+    return html
+
+def apply_format(db, item, format_):
+    """``item`` (a dict) with its text replaced by HTML for format 'html'"""
+    if format_ == 'html' and item.get('text') is not None:
+        item['text'] = rendered_html(db, item['text'])
+    return item
+
+def render_all(db):
+    """Store the HTML of every body not rendered yet; returns how many were rendered"""
+    rendered = 0
+    for table in BODY_TEXT_TABLES:
+        for (text,) in db.execute(f"SELECT text FROM {table}").fetchall():
+            rendered += store_rendered(db, text)
+    return rendered
+
+def prune_rendered(db):
+    """
+    Delete stored HTML no body has any more (edited or archived texts, or
+    an older RENDERER_VERSION). Returns the number of rows deleted.
+    """
+    current = set()
+    for table in BODY_TEXT_TABLES:
+        current.update(content_hash(text) for (text,) in db.execute(f"SELECT text FROM {table}"))
+    stale = [
+        (key,) for (key,) in db.execute("SELECT content_hash FROM rendered_html").fetchall()
+        if key not in current
+    ]
+    db.executemany("DELETE FROM rendered_html WHERE content_hash = ?", stale)
+    db.commit()
+    return len(stale)
@@ -0,0 +1,174 @@
+from flask import g, request
+import json
+import os
+import threading
+from cache_backends import LocalCache, SharedMemoryCache
+from snapshot import is_snapshot_request
+from write_hooks import ALL_TABLES
+
+# Tables each group of public endpoints reads from, by path prefix. Paths
+# not listed depend on every table.
+CACHE_DEPENDENCIES = {
+    '/api/menu': ('menu', 'menu_links'),
+    '/api/year-name': ('year_name',),
+    '/api/contacts': ('contacts',),
+    '/api/social-networks': ('social_networks',),
+    '/api/staff': ('staff',),
+    '/api/blog': ('blog_categories', 'blog_items'),
+    '/api/about-company': ('about_company', 'about_company_categories', 'about_company_category_items'),
+    '/api/documents': ('documents_categories', 'documents_items')
+}
+
+def dependencies(path):
+    for prefix, tables in CACHE_DEPENDENCIES.items():
+        if path == prefix or path.startswith(prefix + '/'):
+            return tables
+    return (ALL_TABLES,)
+
+def cache_key(request):
+    # Accept selects between JSON arrays and NDJSON on list endpoints
+    return f"{request.full_path}|{request.headers.get('Accept', '')}"
+
+def pack(versions, response):
+    """Cache entry for ``response``: a JSON header line followed by the body"""
+    header = json.dumps({'versions': versions, 'mimetype': response.mimetype}).encode()
+    return header + b'\n' + response.get_data()
+
+def unpack(entry):
+    header, _, body = entry.partition(b'\n')
+    return json.loads(header), body
+
+class SingleFlight:
+    """
+    Per-key markers for values being recomputed, so that concurrent misses
+    for the same key wait for one request instead of all doing the work.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """
+        Returns (True, event) when the caller should compute ``key`` and call
+        end() afterwards, or (False, event) with the event set when the
+        request already computing it ends.
+        """
+        with self._lock:
+            event = self._flights.get(key)
+            if event is not None:
+                return False, event
+            event = self._flights[key] = threading.Event()
+            return True, event
+
+    def end(self, key):
+        with self._lock:
+            event = self._flights.pop(key, None)
+        if event is not None:
+            event.set()
+
+def configure_response_cache(app, watcher):
+    """
+    Cache successful anonymous GET responses in memory when RESPONSE_CACHE
+    is enabled.
+
+    Entries are tagged with the cache_versions of the tables their endpoint
+    reads and are only served while those versions are current, so ``watcher``
+    (a VersionWatcher) bounds how stale they can get. RESPONSE_CACHE_SIZE
+    limits the cached bytes (default 32 MB). Compression and CORS headers are
+    applied to cached responses as to fresh ones.
+
+    RESPONSE_CACHE_BACKEND selects where entries live: 'local' (default)
+    keeps them in each process, 'shared' in a memory-mapped file
+    (RESPONSE_CACHE_FILE, default next to the database) that all workers on
+    the host read and fill together.
+
+    On a miss only one request per process recomputes a key. The others
+    wait up to RESPONSE_CACHE_WAIT seconds (default 5) for its result and
+    then compute it themselves. While the previous response for the key is
+    still cached, they get that one instead of waiting, unless
+    RESPONSE_CACHE_SERVE_STALE is disabled.
+    """
+    app.config.setdefault('RESPONSE_CACHE', os.environ.get('RESPONSE_CACHE', 'false').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('RESPONSE_CACHE_SIZE', int(os.environ.get('RESPONSE_CACHE_SIZE', 32 * 1024 * 1024)))
+    app.config.setdefault('RESPONSE_CACHE_BACKEND', os.environ.get('RESPONSE_CACHE_BACKEND', 'local'))
+    app.config.setdefault('RESPONSE_CACHE_FILE', os.environ.get('RESPONSE_CACHE_FILE', app.config['DATABASE_PATH'] + '.cache'))
+    app.config.setdefault('RESPONSE_CACHE_WAIT', float(os.environ.get('RESPONSE_CACHE_WAIT', 5.0)))
+    app.config.setdefault('RESPONSE_CACHE_SERVE_STALE', os.environ.get('RESPONSE_CACHE_SERVE_STALE', 'true').lower() in ('1', 'true', 'yes'))
+
+    if not app.config['RESPONSE_CACHE']:
+        return None
+
+    backend = app.config['RESPONSE_CACHE_BACKEND']
+    if backend == 'shared':
+        cache = SharedMemoryCache(app.config['RESPONSE_CACHE_FILE'], app.config['RESPONSE_CACHE_SIZE'])
+        # Versions start over when the database is recreated
+        cache.clear()
+    elif backend == 'local':
+        cache = LocalCache(app.config['RESPONSE_CACHE_SIZE'])
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+
+    # Entries carry their versions, so stale ones are never served as fresh
+    watcher.subscribe()
+    flights = SingleFlight()
+
+    def lookup(key, versions):
+        """Cached (header, body) for ``key`` and whether it is current"""
+        entry = cache.get(key)
+        if entry is None:
+            return None, False
+        header, body = unpack(entry)
+        return (header, body), header['versions'] == versions
+
+    def cached_response(header, body):
+        return app.response_class(body, mimetype=header['mimetype'])
+
+    @app.before_request
+    def serve_cached_response():
+        if not is_snapshot_request(request):
+            return None
+
+        key = cache_key(request)
+        # Versions are taken before the database is read, so a response
+        # computed while a write commits is stored as already stale
+        versions = list(watcher.current(dependencies(request.path)))
+
+        found, current = lookup(key, versions)
+        if current:
+            return cached_response(*found)
+
+        leader, event = flights.begin(key)
+        if leader:
+            g._response_cache_flight = key
+        elif found is not None and app.config['RESPONSE_CACHE_SERVE_STALE']:
+            # Another request is recomputing it; serve the previous value
+            return cached_response(*found)
+        elif event.wait(app.config['RESPONSE_CACHE_WAIT']):
+            found, current = lookup(key, versions)
+            if current:
+                return cached_response(*found)
+
+        # The leader, or a waiter whose leader failed or was too slow,
+        # computes the response and stores it
+        g._response_cache = (key, versions)
+        return None
+
+    @app.after_request
+    def store_response(response):
+        pending = g.pop('_response_cache', None)
+        if pending is None or response.status_code != 200 or response.is_streamed:
+            return response
+        key, versions = pending
+        cache.set(key, pack(versions, response))
+        return response
+
+    @app.teardown_request
+    def end_flight(exception):
+        # Also runs when the view failed, so waiters do not wait for nothing
+        key = g.pop('_response_cache_flight', None)
+        if key is not None:
+            flights.end(key)
+
+    app.extensions['response_cache'] = cache
+    return cache
@@ -1,5 +1,53 @@
 from flask import jsonify, request
 import datetime
+from fieldsets import parse_fields, select_clause
+from list_query import execute_list_query
+from serializers import serialize_rows
+from rendering import apply_format, parse_format, store_rendered
+from view_analytics import visitor_key
+from write_hooks import record_write
+
+ABOUT_COMPANY_COLUMNS = "a.id, a.title, a.img, a.date_time, a.views, a.unique_views, a.is_deleted"
+
+ABOUT_COMPANY_CATEGORY_COLUMNS = "id, name, is_deleted"
+
+ABOUT_COMPANY_ITEM_COLUMNS = "i.id, i.category_id, i.title, i.views, i.unique_views, i.date_time, i.feedback_id, i.is_deleted"
+
+ABOUT_COMPANY_CATEGORY_LIST = {
+    'from': 'about_company_categories',
+    'sorts': {'id': 'id'},
+    'default_sort': 'id'
+}
+
+ABOUT_COMPANY_ITEM_LIST = {
+    'from': 'about_company_category_items i LEFT JOIN about_company_categories c ON i.category_id = c.id',
+    'filters': {
+        'category_id': ('i.category_id', 'int'),
+        'date_time': ('i.date_time', 'date')
+    },
+    'sorts': {'id': 'i.id', 'date_time': 'i.date_time', 'views': 'i.views'},
+    'default_sort': '-date_time'
+}
+
+# Fields that may be requested from the about company item list via ?fields=
+ABOUT_COMPANY_ITEM_FIELDS = {
+    'id': 'i.id',
+    'category_id': 'i.category_id',
+    'category_name': 'c.name',
+    'title': 'i.title',
+    'text': 'b.text',
+    'views': 'i.views',
+    'unique_views': 'i.unique_views',
+    'date_time': 'i.date_time',
+    'feedback_id': 'i.feedback_id',
+    'is_deleted': 'i.is_deleted'
+}
+
+# Default list projection: everything except the item text
+ABOUT_COMPANY_ITEM_SUMMARY_FIELDS = [
+    'id', 'category_id', 'category_name', 'title', 'views', 'unique_views',
+    'date_time', 'feedback_id', 'is_deleted'
+]
 
 def register_about_company_routes(app, get_db, token_required):
     
@@ -17,17 +65,34 @@ def register_about_company_routes(app, get_db, token_required):
             type: boolean
             required: false
             description: Increment view count
+          - name: format
+            in: query
+            type: string
+            required: false
+            default: raw
+            description: raw returns the text as stored, html as sanitized HTML rendered from markdown
         responses:
           200:
             description: About company information
+          400:
+            description: Invalid format
           404:
             description: About company information not found
         """
         increment_views = request.args.get('increment_views', 'false').lower() == 'true'
+        try:
+            format_ = parse_format(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM about_company ORDER BY id DESC LIMIT 1")
+        cur.execute(f"""
+            SELECT {ABOUT_COMPANY_COLUMNS}, b.text 
+            FROM about_company a
+            LEFT JOIN about_company_bodies b ON b.item_id = a.id
+            ORDER BY a.id DESC LIMIT 1
+        """)
         item = cur.fetchone()
         
         if not item:
@@ -35,13 +100,11 @@ def register_about_company_routes(app, get_db, token_required):
         
         # Increment views if requested
         if increment_views:
-            new_views = item['views'] + 1
-            cur.execute("UPDATE about_company SET views = ? WHERE id = ?", (new_views, item['id']))
-            db.commit()
             item = dict(item)
-            item['views'] = new_views
+            # Buffered and written in batches; add the views not written yet
+            item['views'] += app.extensions['view_counter'].record('about_company', item['id'], visitor_key(request))
             
-        return jsonify(dict(item))
+        return jsonify(apply_format(db, dict(item), format_))
     
     @app.route('/api/about-company', methods=['POST'])
     @token_required
@@ -59,13 +122,19 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - text
               properties:
                 title:
                   type: string
+                  minLength: 1
                 img:
                   type: string
+                  x-nullable: true
                 text:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: About company information created
@@ -82,12 +151,19 @@ def register_about_company_routes(app, get_db, token_required):
         now = datetime.datetime.now().isoformat()
         
         cur.execute(
-            "INSERT INTO about_company (title, img, date_time, views, text) VALUES (?, ?, ?, ?, ?)",
-            (data['title'], data.get('img'), now, 0, data['text'])
+            "INSERT INTO about_company (title, img, date_time, views) VALUES (?, ?, ?, ?)",
+            (data['title'], data.get('img'), now, 0)
+        )
+        about_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO about_company_bodies (item_id, text) VALUES (?, ?)",
+            (about_id, data['text'])
         )
+        store_rendered(db, data['text'])
+        record_write(db, 'about_company', about_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'About company information created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'About company information created', 'id': about_id}), 201
     
     @app.route('/api/about-company/<int:about_id>', methods=['PUT'])
     @token_required
@@ -110,13 +186,19 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - text
               properties:
                 title:
                   type: string
+                  minLength: 1
                 img:
                   type: string
+                  x-nullable: true
                 text:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: About company information updated
@@ -140,9 +222,15 @@ def register_about_company_routes(app, get_db, token_required):
             
         # Update about company
         cur.execute(
-            "UPDATE about_company SET title = ?, img = ?, text = ? WHERE id = ?",
-            (data.get('title'), data.get('img'), data.get('text'), about_id)
+            "UPDATE about_company SET title = ?, img = ? WHERE id = ?",
+            (data.get('title'), data.get('img'), about_id)
+        )
+        cur.execute(
+            "INSERT OR REPLACE INTO about_company_bodies (item_id, text) VALUES (?, ?)",
+            (about_id, data.get('text'))
         )
+        store_rendered(db, data.get('text'))
+        record_write(db, 'about_company', about_id)
         db.commit()
         
         return jsonify({'message': 'About company information updated'})
@@ -155,14 +243,27 @@ def register_about_company_routes(app, get_db, token_required):
         ---
         tags:
           - About Company
+        parameters:
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of about company categories
+          400:
+            description: Invalid sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT * FROM about_company_categories")
-        items = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, ABOUT_COMPANY_CATEGORY_LIST, request.args, ABOUT_COMPANY_CATEGORY_COLUMNS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        items = serialize_rows(cur)
         
         return jsonify(items)
     
@@ -187,7 +288,7 @@ def register_about_company_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM about_company_categories WHERE id = ?", (category_id,))
+        cur.execute(f"SELECT {ABOUT_COMPANY_CATEGORY_COLUMNS} FROM about_company_categories WHERE id = ?", (category_id,))
         item = cur.fetchone()
         
         if not item:
@@ -211,9 +312,12 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: About company category created
@@ -231,6 +335,7 @@ def register_about_company_routes(app, get_db, token_required):
             "INSERT INTO about_company_categories (name) VALUES (?)",
             (data['name'],)
         )
+        record_write(db, 'about_company_categories', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'About company category created', 'id': cur.lastrowid}), 201
@@ -256,9 +361,12 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: About company category updated
@@ -285,6 +393,7 @@ def register_about_company_routes(app, get_db, token_required):
             "UPDATE about_company_categories SET name = ? WHERE id = ?",
             (data['name'], category_id)
         )
+        record_write(db, 'about_company_categories', category_id)
         db.commit()
         
         return jsonify({'message': 'About company category updated'})
@@ -329,6 +438,7 @@ def register_about_company_routes(app, get_db, token_required):
             
         # Delete category
         cur.execute("DELETE FROM about_company_categories WHERE id = ?", (category_id,))
+        record_write(db, 'about_company_categories', category_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'About company category deleted'})
@@ -347,32 +457,51 @@ def register_about_company_routes(app, get_db, token_required):
             type: integer
             required: false
             description: Filter by category ID
+          - name: date_time_from
+            in: query
+            type: string
+            required: false
+            description: Only items dated at or after this ISO date/time
+          - name: date_time_to
+            in: query
+            type: string
+            required: false
+            description: Only items dated at or before this ISO date/time
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: -date_time
+            description: Sort key (id, date_time, views), prefix with - for descending
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: >
+              Comma-separated list of fields to return, or "all".
+              Defaults to a summary without the item text.
         responses:
           200:
             description: List of about company category items
+          400:
+            description: Unknown field, invalid filter or unsupported sort
         """
-        category_id = request.args.get('category_id')
+        try:
+            fields = parse_fields(request.args.get('fields'), ABOUT_COMPANY_ITEM_FIELDS, ABOUT_COMPANY_ITEM_SUMMARY_FIELDS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        columns = select_clause(fields, ABOUT_COMPANY_ITEM_FIELDS)
+        # Item bodies are only read when explicitly requested
+        bodies_join = "LEFT JOIN about_company_category_item_bodies b ON b.item_id = i.id" if 'text' in fields else ""
         
         db = get_db()
-        cur = db.cursor()
         
-        if category_id:
-            cur.execute("""
-                SELECT i.*, c.name as category_name 
-                FROM about_company_category_items i
-                LEFT JOIN about_company_categories c ON i.category_id = c.id
-                WHERE i.category_id = ?
-                ORDER BY i.date_time DESC
-            """, (category_id,))
-        else:
-            cur.execute("""
-                SELECT i.*, c.name as category_name 
-                FROM about_company_category_items i
-                LEFT JOIN about_company_categories c ON i.category_id = c.id
-                ORDER BY i.date_time DESC
-            """)
+        try:
+            cur = execute_list_query(db, ABOUT_COMPANY_ITEM_LIST, request.args, columns, bodies_join)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
             
-        items = [dict(row) for row in cur.fetchall()]
+        items = serialize_rows(cur)
         
         return jsonify(items)
     
@@ -394,19 +523,32 @@ def register_about_company_routes(app, get_db, token_required):
             type: boolean
             required: false
             description: Increment view count
+          - name: format
+            in: query
+            type: string
+            required: false
+            default: raw
+            description: raw returns the text as stored, html as sanitized HTML rendered from markdown
         responses:
           200:
             description: About company category item details
+          400:
+            description: Invalid format
           404:
             description: About company category item not found
         """
         increment_views = request.args.get('increment_views', 'false').lower() == 'true'
+        try:
+            format_ = parse_format(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         db = get_db()
         cur = db.cursor()
-        cur.execute("""
-            SELECT i.*, c.name as category_name 
+        cur.execute(f"""
+            SELECT {ABOUT_COMPANY_ITEM_COLUMNS}, b.text, c.name as category_name 
             FROM about_company_category_items i
+            LEFT JOIN about_company_category_item_bodies b ON b.item_id = i.id
             LEFT JOIN about_company_categories c ON i.category_id = c.id
             WHERE i.id = ?
         """, (item_id,))
@@ -417,13 +559,11 @@ def register_about_company_routes(app, get_db, token_required):
         
         # Increment views if requested
         if increment_views:
-            new_views = item['views'] + 1
-            cur.execute("UPDATE about_company_category_items SET views = ? WHERE id = ?", (new_views, item_id))
-            db.commit()
             item = dict(item)
-            item['views'] = new_views
+            # Buffered and written in batches; add the views not written yet
+            item['views'] += app.extensions['view_counter'].record('about_company_category_items', item_id, visitor_key(request))
             
-        return jsonify(dict(item))
+        return jsonify(apply_format(db, dict(item), format_))
     
     @app.route('/api/about-company/items', methods=['POST'])
     @token_required
@@ -441,15 +581,23 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - category_id
+                - title
+                - text
               properties:
                 category_id:
                   type: integer
+                  minimum: 1
                 title:
                   type: string
+                  minLength: 1
                 text:
                   type: string
+                  minLength: 1
                 feedback_id:
                   type: integer
+                  x-nullable: true
         responses:
           201:
             description: About company category item created
@@ -481,13 +629,20 @@ def register_about_company_routes(app, get_db, token_required):
         
         cur.execute(
             """INSERT INTO about_company_category_items 
-               (category_id, title, text, views, date_time, feedback_id) 
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (data['category_id'], data['title'], data['text'], 0, now, data.get('feedback_id'))
+               (category_id, title, views, date_time, feedback_id) 
+               VALUES (?, ?, ?, ?, ?)""",
+            (data['category_id'], data['title'], 0, now, data.get('feedback_id'))
+        )
+        item_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO about_company_category_item_bodies (item_id, text) VALUES (?, ?)",
+            (item_id, data['text'])
         )
+        store_rendered(db, data['text'])
+        record_write(db, 'about_company_category_items', item_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'About company category item created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'About company category item created', 'id': item_id}), 201
     
     @app.route('/api/about-company/items/<int:item_id>', methods=['PUT'])
     @token_required
@@ -510,15 +665,22 @@ def register_about_company_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - text
               properties:
                 category_id:
                   type: integer
+                  x-nullable: true
                 title:
                   type: string
+                  minLength: 1
                 text:
                   type: string
+                  minLength: 1
                 feedback_id:
                   type: integer
+                  x-nullable: true
         responses:
           200:
             description: About company category item updated
@@ -555,11 +717,17 @@ def register_about_company_routes(app, get_db, token_required):
         # Update item
         cur.execute(
             """UPDATE about_company_category_items 
-               SET category_id = ?, title = ?, text = ?, feedback_id = ? 
+               SET category_id = ?, title = ?, feedback_id = ? 
                WHERE id = ?""",
-            (data.get('category_id'), data.get('title'), data.get('text'), 
+            (data.get('category_id'), data.get('title'), 
              data.get('feedback_id'), item_id)
         )
+        cur.execute(
+            "INSERT OR REPLACE INTO about_company_category_item_bodies (item_id, text) VALUES (?, ?)",
+            (item_id, data.get('text'))
+        )
+        store_rendered(db, data.get('text'))
+        record_write(db, 'about_company_category_items', item_id)
         db.commit()
         
         return jsonify({'message': 'About company category item updated'})
@@ -596,6 +764,7 @@ def register_about_company_routes(app, get_db, token_required):
             
         # Delete item
         cur.execute("DELETE FROM about_company_category_items WHERE id = ?", (item_id,))
+        record_write(db, 'about_company_category_items', item_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'About company category item deleted'})
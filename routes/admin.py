@@ -1,6 +1,19 @@
 from flask import jsonify, request
 from werkzeug.security import generate_password_hash
 import datetime
+from list_query import execute_list_query
+from serializers import serialize_rows
+from write_hooks import record_write
+from dashboard_stats import dashboard_stats
+
+ADMIN_USER_LIST = {
+    'from': 'admin_users',
+    'filters': {
+        'role': ('role', 'str')
+    },
+    'sorts': {'id': 'id'},
+    'default_sort': 'id'
+}
 
 def register_admin_routes(app, get_db, token_required):
     
@@ -14,9 +27,23 @@ def register_admin_routes(app, get_db, token_required):
           - Admin
         security:
           - Bearer: []
+        parameters:
+          - name: role
+            in: query
+            type: string
+            required: false
+            description: Filter by role
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of admin users
+          400:
+            description: Invalid filter or sort
           403:
             description: Not authorized
         """
@@ -25,9 +52,13 @@ def register_admin_routes(app, get_db, token_required):
             return jsonify({'message': 'Not authorized'}), 403
         
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT id, username, role, created_at, last_login FROM admin_users")
-        users = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, ADMIN_USER_LIST, request.args, 'id, username, role, created_at, last_login')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        users = serialize_rows(cur)
         
         return jsonify(users)
     
@@ -93,8 +124,10 @@ def register_admin_routes(app, get_db, token_required):
               properties:
                 username:
                   type: string
+                  minLength: 1
                 password:
                   type: string
+                  minLength: 1
                 role:
                   type: string
         responses:
@@ -151,6 +184,7 @@ def register_admin_routes(app, get_db, token_required):
             f"UPDATE admin_users SET {', '.join(updates)} WHERE id = ?",
             tuple(params)
         )
+        record_write(db, 'admin_users', user_id)
         db.commit()
         
         return jsonify({'message': 'User updated'})
@@ -197,6 +231,48 @@ def register_admin_routes(app, get_db, token_required):
             
         # Delete user
         cur.execute("DELETE FROM admin_users WHERE id = ?", (user_id,))
+        record_write(db, 'admin_users', user_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'User deleted'})
+
+    @app.route('/api/admin/stats', methods=['GET'])
+    @token_required
+    def get_admin_stats(current_user):
+        """
+        Get dashboard statistics
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: days
+            in: query
+            type: integer
+            required: false
+            default: 30
+            description: Number of days of feedback per day to return (at most 366)
+        responses:
+          200:
+            description: >
+              Active and deleted rows and views per table and per category,
+              and feedback per day and per theme
+          400:
+            description: Invalid days
+          403:
+            description: Not authorized
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        try:
+            days = int(request.args.get('days', 30))
+        except ValueError:
+            return jsonify({'message': 'Invalid value for days: expected an integer'}), 400
+        if not 1 <= days <= 366:
+            return jsonify({'message': 'days must be between 1 and 366'}), 400
+
+        # Read from the aggregate tables, not the content tables
+        return jsonify(dashboard_stats(get_db(), days))
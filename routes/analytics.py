@@ -0,0 +1,89 @@
+from flask import jsonify, request
+import datetime
+from view_analytics import GRANULARITIES, VIEW_TABLES, view_series
+
+def register_analytics_routes(app, get_db, token_required):
+
+    @app.route('/api/admin/analytics/views', methods=['GET'])
+    @token_required
+    def get_view_analytics(current_user):
+        """
+        Get views per day, week or month
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: table
+            in: query
+            type: string
+            required: false
+            default: blog_items
+            description: blog_items, about_company or about_company_category_items
+          - name: item
+            in: query
+            type: integer
+            required: false
+            description: Item id (default all items of the table)
+          - name: from
+            in: query
+            type: string
+            required: false
+            description: First ISO date (default 29 days before to)
+          - name: to
+            in: query
+            type: string
+            required: false
+            description: Last ISO date (default today)
+          - name: granularity
+            in: query
+            type: string
+            required: false
+            default: day
+            description: >
+              day, week (periods are the Monday starting each ISO week) or
+              month; daily rows are only kept for VIEWS_DAILY_RETENTION_DAYS
+        responses:
+          200:
+            description: >
+              Views and unique readers per period, periods without views
+              left out; unique_views estimates the readers of the whole range
+          400:
+            description: Invalid parameters
+          403:
+            description: Not authorized
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        table = request.args.get('table', 'blog_items')
+        if table not in VIEW_TABLES:
+            return jsonify({'message': f"Invalid table. Allowed: {', '.join(VIEW_TABLES)}"}), 400
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return jsonify({'message': f"Invalid granularity. Allowed: {', '.join(GRANULARITIES)}"}), 400
+
+        try:
+            item_id = int(request.args['item']) if request.args.get('item') else None
+            end = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.date.today()
+            start = (datetime.date.fromisoformat(request.args['from']) if request.args.get('from')
+                     else end - datetime.timedelta(days=29))
+        except ValueError:
+            return jsonify({'message': 'Invalid value for item, from or to'}), 400
+        if start > end:
+            return jsonify({'message': 'from must not be after to'}), 400
+
+        series, unique_views = view_series(get_db(), table, item_id, granularity, start.isoformat(), end.isoformat())
+
+        return jsonify({
+            'table': table,
+            'item': item_id,
+            'granularity': granularity,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'total': sum(point['views'] for point in series),
+            'unique_views': unique_views,
+            'series': series
+        })
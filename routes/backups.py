@@ -0,0 +1,103 @@
+from flask import jsonify, request
+import datetime
+import os
+import sqlite3
+from backup import BackupInProgress, archive_backup_path, backup_database, list_backups
+
+def register_backup_routes(app, get_db, token_required):
+
+    @app.route('/api/admin/backups', methods=['GET'])
+    @token_required
+    def get_backups(current_user):
+        """
+        List database backups
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        responses:
+          200:
+            description: >
+              Backup files, newest first, with the archive database backup
+              taken with each (null when there was no archive)
+          403:
+            description: Not authorized
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        backups = []
+        for path in list_backups(app.config['BACKUP_DIR'], app.config['DATABASE_PATH']):
+            stat = os.stat(path)
+            archive = archive_backup_path(path, app.config['ARCHIVE_PATH'])
+            backups.append({
+                'name': os.path.basename(path),
+                'size': stat.st_size,
+                'created_at': datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'archive': os.path.basename(archive) if os.path.exists(archive) else None
+            })
+
+        return jsonify(backups)
+
+    @app.route('/api/admin/backups', methods=['POST'])
+    @token_required
+    def create_backup(current_user):
+        """
+        Back up the database now
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: compress
+            in: query
+            type: boolean
+            required: false
+            default: true
+            description: Write a gzip-compressed backup
+          - name: verify
+            in: query
+            type: boolean
+            required: false
+            default: true
+            description: Restore the backup into a temporary file and run an integrity check
+        responses:
+          201:
+            description: >
+              Backup written, with timing and size stats; those of the
+              archive database backup are under archive
+          403:
+            description: Not authorized
+          409:
+            description: A backup is already running
+          500:
+            description: The backup failed its integrity check
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        try:
+            stats = backup_database(
+                app.config['DATABASE_PATH'],
+                app.config['BACKUP_DIR'],
+                compress=request.args.get('compress', 'true').lower() == 'true',
+                keep=app.config['BACKUP_KEEP'],
+                verify=request.args.get('verify', 'true').lower() == 'true',
+                archive_path=app.config['ARCHIVE_PATH']
+            )
+        except BackupInProgress as e:
+            return jsonify({'message': str(e)}), 409
+        except (sqlite3.Error, OSError) as e:
+            return jsonify({'message': f'Backup failed: {e}'}), 500
+
+        # File system paths stay on the server
+        stats['name'] = os.path.basename(stats.pop('path'))
+        if stats['archive']:
+            stats['archive']['name'] = os.path.basename(stats['archive'].pop('path'))
+        stats['removed'] = [os.path.basename(path) for path in stats['removed']]
+
+        return jsonify(stats), 201
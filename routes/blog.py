@@ -1,5 +1,64 @@
 from flask import jsonify, request
 import datetime
+from fieldsets import parse_fields, select_clause
+from list_query import execute_list_query
+from serializers import serialize_rows
+from streaming import list_response
+from json_cache import refresh_json_cache
+from rendering import apply_format, parse_format, store_rendered
+from view_analytics import visitor_key
+from write_hooks import record_write
+
+BLOG_CATEGORY_LIST = {
+    'from': 'blog_categories',
+    'sorts': {'id': 'id'},
+    'default_sort': 'id',
+    'active': 'is_deleted = 0'
+}
+
+BLOG_ITEM_LIST = {
+    'from': 'blog_items bi LEFT JOIN blog_categories bc ON bi.category_id = bc.id',
+    'filters': {
+        'category_id': ('bi.category_id', 'int'),
+        'date_time': ('bi.date_time', 'date')
+    },
+    'sorts': {'id': 'bi.id', 'date_time': 'bi.date_time', 'views': 'bi.views'},
+    'default_sort': '-date_time',
+    'active': 'bi.is_deleted = 0 AND (bc.is_deleted = 0 OR bc.is_deleted IS NULL)'
+}
+
+# Fields that may be requested from the blog item list via ?fields=
+BLOG_ITEM_FIELDS = {
+    'id': 'bi.id',
+    'category_id': 'bi.category_id',
+    'category_name': 'bc.name',
+    'title': 'bi.title',
+    'img_or_video_link': 'bi.img_or_video_link',
+    'date_time': 'bi.date_time',
+    'views': 'bi.views',
+    'unique_views': 'bi.unique_views',
+    'intro_text': 'bi.intro_text',
+    'text': 'bb.text',
+    'is_deleted': 'bi.is_deleted'
+}
+
+# Default list projection: everything a list page renders, without the body
+BLOG_ITEM_SUMMARY_FIELDS = [
+    'id', 'category_id', 'category_name', 'title', 'img_or_video_link',
+    'date_time', 'views', 'unique_views', 'intro_text', 'is_deleted'
+]
+
+# The stored fragment leaves out the view counts so flushing them does not
+# rewrite it; keys are sorted and unique_views and views sort last, so they
+# go at the end
+BLOG_ITEM_CACHED_COLUMN = (
+    "substr(bi.json_cache, 1, length(bi.json_cache) - 1)"
+    " || ',\"unique_views\":' || bi.unique_views || ',\"views\":' || bi.views || '}'"
+)
+
+BLOG_CATEGORY_COLUMNS = "id, name, is_deleted"
+
+BLOG_ITEM_COLUMNS = "bi.id, bi.category_id, bi.title, bi.img_or_video_link, bi.date_time, bi.views, bi.unique_views, bi.intro_text, bi.is_deleted"
 
 def register_blog_routes(app, get_db, token_required):
     
@@ -18,21 +77,26 @@ def register_blog_routes(app, get_db, token_required):
             required: false
             default: false
             description: Whether to include soft-deleted records
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of blog categories
+          400:
+            description: Invalid sort
         """
-        include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
-        
         db = get_db()
-        cur = db.cursor()
         
-        if include_deleted:
-            cur.execute("SELECT * FROM blog_categories")
-        else:
-            cur.execute("SELECT * FROM blog_categories WHERE is_deleted = 0")
+        try:
+            cur = execute_list_query(db, BLOG_CATEGORY_LIST, request.args, BLOG_CATEGORY_COLUMNS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
-        items = [dict(row) for row in cur.fetchall()]
+        items = serialize_rows(cur)
         
         return jsonify(items)
     
@@ -57,7 +121,7 @@ def register_blog_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM blog_categories WHERE id = ?", (category_id,))
+        cur.execute(f"SELECT {BLOG_CATEGORY_COLUMNS} FROM blog_categories WHERE id = ?", (category_id,))
         item = cur.fetchone()
         
         if not item:
@@ -81,9 +145,12 @@ def register_blog_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: Blog category created
@@ -101,6 +168,7 @@ def register_blog_routes(app, get_db, token_required):
             "INSERT INTO blog_categories (name) VALUES (?)",
             (data['name'],)
         )
+        record_write(db, 'blog_categories', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'Blog category created', 'id': cur.lastrowid}), 201
@@ -126,9 +194,12 @@ def register_blog_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: Blog category updated
@@ -155,6 +226,9 @@ def register_blog_routes(app, get_db, token_required):
             "UPDATE blog_categories SET name = ? WHERE id = ?",
             (data['name'], category_id)
         )
+        # Items embed the category name in their cached JSON
+        refresh_json_cache(db, 'blog_items', 'category_id', category_id)
+        record_write(db, 'blog_categories', category_id)
         db.commit()
         
         return jsonify({'message': 'Blog category updated'})
@@ -198,7 +272,9 @@ def register_blog_routes(app, get_db, token_required):
             return jsonify({'message': 'Cannot delete category with blog items'}), 400
         
         # Soft delete category
-        cur.execute("UPDATE blog_categories SET is_deleted = 1 WHERE id = ?", (category_id,))
+        cur.execute("UPDATE blog_categories SET is_deleted = 1, deleted_at = ? WHERE id = ?",
+                    (datetime.datetime.now().isoformat(), category_id))
+        record_write(db, 'blog_categories', category_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Blog category deleted'})
@@ -223,53 +299,61 @@ def register_blog_routes(app, get_db, token_required):
             required: false
             default: false
             description: Whether to include soft-deleted records
+          - name: date_time_from
+            in: query
+            type: string
+            required: false
+            description: Only items published at or after this ISO date/time
+          - name: date_time_to
+            in: query
+            type: string
+            required: false
+            description: Only items published at or before this ISO date/time
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: -date_time
+            description: Sort key (id, date_time, views), prefix with - for descending
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: >
+              Comma-separated list of fields to return, or "all".
+              Defaults to a summary without the article text.
+          - name: stream
+            in: query
+            type: boolean
+            required: false
+            default: false
+            description: >
+              Stream the JSON array in chunks instead of building it in memory.
+              Send "Accept: application/x-ndjson" for one JSON object per line.
         responses:
           200:
             description: List of blog items
+          400:
+            description: Unknown field, invalid filter or unsupported sort
         """
-        category_id = request.args.get('category_id')
-        include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
+        try:
+            fields = parse_fields(request.args.get('fields'), BLOG_ITEM_FIELDS, BLOG_ITEM_SUMMARY_FIELDS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        # The default summary is stored pre-rendered with each row
+        cached = set(fields) == set(BLOG_ITEM_SUMMARY_FIELDS)
+        columns = BLOG_ITEM_CACHED_COLUMN if cached else select_clause(fields, BLOG_ITEM_FIELDS)
+        # Article bodies are only read when explicitly requested
+        bodies_join = "LEFT JOIN blog_item_bodies bb ON bb.item_id = bi.id" if 'text' in fields else ""
         
         db = get_db()
-        cur = db.cursor()
         
-        if category_id:
-            if include_deleted:
-                cur.execute("""
-                    SELECT bi.*, bc.name as category_name 
-                    FROM blog_items bi
-                    LEFT JOIN blog_categories bc ON bi.category_id = bc.id
-                    WHERE bi.category_id = ?
-                    ORDER BY bi.date_time DESC
-                """, (category_id,))
-            else:
-                cur.execute("""
-                    SELECT bi.*, bc.name as category_name 
-                    FROM blog_items bi
-                    LEFT JOIN blog_categories bc ON bi.category_id = bc.id
-                    WHERE bi.category_id = ? AND bi.is_deleted = 0 AND (bc.is_deleted = 0 OR bc.is_deleted IS NULL)
-                    ORDER BY bi.date_time DESC
-                """, (category_id,))
-        else:
-            if include_deleted:
-                cur.execute("""
-                    SELECT bi.*, bc.name as category_name 
-                    FROM blog_items bi
-                    LEFT JOIN blog_categories bc ON bi.category_id = bc.id
-                    ORDER BY bi.date_time DESC
-                """)
-            else:
-                cur.execute("""
-                    SELECT bi.*, bc.name as category_name 
-                    FROM blog_items bi
-                    LEFT JOIN blog_categories bc ON bi.category_id = bc.id
-                    WHERE bi.is_deleted = 0 AND (bc.is_deleted = 0 OR bc.is_deleted IS NULL)
-                    ORDER BY bi.date_time DESC
-                """)
+        try:
+            cur = execute_list_query(db, BLOG_ITEM_LIST, request.args, columns, bodies_join)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
             
-        items = [dict(row) for row in cur.fetchall()]
-        
-        return jsonify(items)
+        return list_response(cur, cached)
     
     @app.route('/api/blog/items/<int:item_id>', methods=['GET'])
     def get_blog_item(item_id):
@@ -289,19 +373,32 @@ def register_blog_routes(app, get_db, token_required):
             type: boolean
             required: false
             description: Increment view count
+          - name: format
+            in: query
+            type: string
+            required: false
+            default: raw
+            description: raw returns the text as stored, html as sanitized HTML rendered from markdown
         responses:
           200:
             description: Blog item details
+          400:
+            description: Invalid format
           404:
             description: Blog item not found
         """
         increment_views = request.args.get('increment_views', 'false').lower() == 'true'
+        try:
+            format_ = parse_format(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         db = get_db()
         cur = db.cursor()
-        cur.execute("""
-            SELECT bi.*, bc.name as category_name 
+        cur.execute(f"""
+            SELECT {BLOG_ITEM_COLUMNS}, bb.text, bc.name as category_name 
             FROM blog_items bi
+            LEFT JOIN blog_item_bodies bb ON bb.item_id = bi.id
             LEFT JOIN blog_categories bc ON bi.category_id = bc.id
             WHERE bi.id = ?
         """, (item_id,))
@@ -312,13 +409,11 @@ def register_blog_routes(app, get_db, token_required):
             
         # Increment views if requested
         if increment_views:
-            new_views = item['views'] + 1
-            cur.execute("UPDATE blog_items SET views = ? WHERE id = ?", (new_views, item_id))
-            db.commit()
             item = dict(item)
-            item['views'] = new_views
+            # Buffered and written in batches; add the views not written yet
+            item['views'] += app.extensions['view_counter'].record('blog_items', item_id, visitor_key(request))
             
-        return jsonify(dict(item))
+        return jsonify(apply_format(db, dict(item), format_))
     
     @app.route('/api/blog/items', methods=['POST'])
     @token_required
@@ -336,17 +431,25 @@ def register_blog_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - text
               properties:
                 category_id:
                   type: integer
+                  x-nullable: true
                 title:
                   type: string
+                  minLength: 1
                 img_or_video_link:
                   type: string
+                  x-nullable: true
                 text:
                   type: string
+                  minLength: 1
                 intro_text:
                   type: string
+                  x-nullable: true
         responses:
           201:
             description: Blog item created
@@ -371,14 +474,22 @@ def register_blog_routes(app, get_db, token_required):
         
         cur.execute(
             """INSERT INTO blog_items 
-               (category_id, title, img_or_video_link, date_time, views, text, intro_text) 
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+               (category_id, title, img_or_video_link, date_time, views, intro_text) 
+               VALUES (?, ?, ?, ?, ?, ?)""",
             (data.get('category_id'), data['title'], data.get('img_or_video_link'),
-             now, 0, data['text'], data.get('intro_text'))
+             now, 0, data.get('intro_text'))
         )
+        item_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO blog_item_bodies (item_id, text) VALUES (?, ?)",
+            (item_id, data['text'])
+        )
+        store_rendered(db, data['text'])
+        refresh_json_cache(db, 'blog_items', 'id', item_id)
+        record_write(db, 'blog_items', item_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'Blog item created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Blog item created', 'id': item_id}), 201
     
     @app.route('/api/blog/items/<int:item_id>', methods=['PUT'])
     @token_required
@@ -401,17 +512,25 @@ def register_blog_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - text
               properties:
                 category_id:
                   type: integer
+                  x-nullable: true
                 title:
                   type: string
+                  minLength: 1
                 img_or_video_link:
                   type: string
+                  x-nullable: true
                 text:
                   type: string
+                  minLength: 1
                 intro_text:
                   type: string
+                  x-nullable: true
         responses:
           200:
             description: Blog item updated
@@ -442,12 +561,18 @@ def register_blog_routes(app, get_db, token_required):
         # Update blog item
         cur.execute(
             """UPDATE blog_items 
-               SET category_id = ?, title = ?, img_or_video_link = ?, 
-                   text = ?, intro_text = ? 
+               SET category_id = ?, title = ?, img_or_video_link = ?, intro_text = ? 
                WHERE id = ?""",
             (data.get('category_id'), data.get('title'), data.get('img_or_video_link'), 
-             data.get('text'), data.get('intro_text'), item_id)
+             data.get('intro_text'), item_id)
+        )
+        cur.execute(
+            "INSERT OR REPLACE INTO blog_item_bodies (item_id, text) VALUES (?, ?)",
+            (item_id, data.get('text'))
         )
+        store_rendered(db, data.get('text'))
+        refresh_json_cache(db, 'blog_items', 'id', item_id)
+        record_write(db, 'blog_items', item_id)
         db.commit()
         
         return jsonify({'message': 'Blog item updated'})
@@ -483,7 +608,10 @@ def register_blog_routes(app, get_db, token_required):
             return jsonify({'message': 'Blog item not found'}), 404
         
         # Soft delete blog item
-        cur.execute("UPDATE blog_items SET is_deleted = 1 WHERE id = ?", (item_id,))
+        cur.execute("UPDATE blog_items SET is_deleted = 1, deleted_at = ? WHERE id = ?",
+                    (datetime.datetime.now().isoformat(), item_id))
+        refresh_json_cache(db, 'blog_items', 'id', item_id)
+        record_write(db, 'blog_items', item_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Blog item deleted'})
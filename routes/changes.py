@@ -0,0 +1,51 @@
+from flask import jsonify, request
+from changes import changes_since, parse_changes_args
+
+def register_changes_routes(app, get_db, token_required):
+
+    @app.route('/api/changes', methods=['GET'])
+    def get_changes():
+        """
+        Get the changes since a sequence number, for incremental sync
+        ---
+        tags:
+          - Utility
+        parameters:
+          - name: since
+            in: query
+            type: integer
+            required: false
+            default: 0
+            description: The next_since of the previous response (0 for everything)
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            default: 100
+            description: Maximum number of deltas (at most 1000)
+          - name: tables
+            in: query
+            type: string
+            required: false
+            description: Comma-separated tables to sync (default all public tables)
+        responses:
+          200:
+            description: >
+              One delta per changed row for its latest change (op upsert with
+              the current row, delete, or reload for a whole table), the
+              next_since to pass next time and whether more pages follow
+          400:
+            description: Invalid parameters
+        """
+        try:
+            since, limit, tables = parse_changes_args(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        deltas, next_since, has_more = changes_since(get_db(), since, limit, tables)
+
+        return jsonify({
+            'changes': deltas,
+            'next_since': next_since,
+            'has_more': has_more
+        })
@@ -1,4 +1,7 @@
 from flask import jsonify, request
+from write_hooks import record_write
+
+CONTACT_COLUMNS = "id, address, phone_number, email, is_deleted"
 
 def register_contacts_routes(app, get_db, token_required):
     
@@ -17,7 +20,7 @@ def register_contacts_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM contacts LIMIT 1")
+        cur.execute(f"SELECT {CONTACT_COLUMNS} FROM contacts LIMIT 1")
         contacts = cur.fetchone()
         
         if not contacts:
@@ -44,10 +47,13 @@ def register_contacts_routes(app, get_db, token_required):
               properties:
                 address:
                   type: string
+                  x-nullable: true
                 phone_number:
                   type: string
+                  x-nullable: true
                 email:
                   type: string
+                  x-nullable: true
         responses:
           201:
             description: Contact information created
@@ -70,6 +76,7 @@ def register_contacts_routes(app, get_db, token_required):
             # Update existing contacts instead of creating new
             cur.execute("UPDATE contacts SET address = ?, phone_number = ?, email = ?", 
                       (data.get('address'), data.get('phone_number'), data.get('email')))
+            record_write(db, 'contacts')
             db.commit()
             return jsonify({'message': 'Contacts updated'}), 200
             
@@ -78,6 +85,7 @@ def register_contacts_routes(app, get_db, token_required):
             "INSERT INTO contacts (address, phone_number, email) VALUES (?, ?, ?)",
             (data.get('address'), data.get('phone_number'), data.get('email'))
         )
+        record_write(db, 'contacts', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'Contacts created', 'id': cur.lastrowid}), 201
@@ -106,10 +114,13 @@ def register_contacts_routes(app, get_db, token_required):
               properties:
                 address:
                   type: string
+                  x-nullable: true
                 phone_number:
                   type: string
+                  x-nullable: true
                 email:
                   type: string
+                  x-nullable: true
         responses:
           200:
             description: Contact information updated
@@ -136,6 +147,7 @@ def register_contacts_routes(app, get_db, token_required):
             "UPDATE contacts SET address = ?, phone_number = ?, email = ? WHERE id = ?",
             (data.get('address'), data.get('phone_number'), data.get('email'), contact_id)
         )
+        record_write(db, 'contacts', contact_id)
         db.commit()
         
         return jsonify({'message': 'Contacts updated'})
@@ -1,4 +1,27 @@
 from flask import jsonify, request
+from list_query import execute_list_query
+from serializers import serialize_rows
+from json_cache import cached_rows, refresh_json_cache
+from write_hooks import record_write
+
+DOCUMENT_CATEGORY_LIST = {
+    'from': 'documents_categories',
+    'sorts': {'id': 'id'},
+    'default_sort': 'id'
+}
+
+DOCUMENT_ITEM_LIST = {
+    'from': 'documents_items di LEFT JOIN documents_categories dc ON di.category_id = dc.id',
+    'filters': {
+        'category_id': ('di.category_id', 'int')
+    },
+    'sorts': {'id': 'di.id'},
+    'default_sort': 'id'
+}
+
+DOCUMENT_CATEGORY_COLUMNS = "id, name, is_deleted"
+
+DOCUMENT_ITEM_COLUMNS = "di.id, di.category_id, di.title, di.name, di.link, di.is_deleted"
 
 def register_documents_routes(app, get_db, token_required):
     
@@ -10,14 +33,27 @@ def register_documents_routes(app, get_db, token_required):
         ---
         tags:
           - Documents
+        parameters:
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of document categories
+          400:
+            description: Invalid sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT * FROM documents_categories")
-        items = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, DOCUMENT_CATEGORY_LIST, request.args, DOCUMENT_CATEGORY_COLUMNS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        items = serialize_rows(cur)
         
         return jsonify(items)
     
@@ -42,7 +78,7 @@ def register_documents_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM documents_categories WHERE id = ?", (category_id,))
+        cur.execute(f"SELECT {DOCUMENT_CATEGORY_COLUMNS} FROM documents_categories WHERE id = ?", (category_id,))
         item = cur.fetchone()
         
         if not item:
@@ -66,9 +102,12 @@ def register_documents_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: Document category created
@@ -86,6 +125,7 @@ def register_documents_routes(app, get_db, token_required):
             "INSERT INTO documents_categories (name) VALUES (?)",
             (data['name'],)
         )
+        record_write(db, 'documents_categories', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'Document category created', 'id': cur.lastrowid}), 201
@@ -111,9 +151,12 @@ def register_documents_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: Document category updated
@@ -140,6 +183,9 @@ def register_documents_routes(app, get_db, token_required):
             "UPDATE documents_categories SET name = ? WHERE id = ?",
             (data['name'], category_id)
         )
+        # Items embed the category name in their cached JSON
+        refresh_json_cache(db, 'documents_items', 'category_id', category_id)
+        record_write(db, 'documents_categories', category_id)
         db.commit()
         
         return jsonify({'message': 'Document category updated'})
@@ -184,6 +230,7 @@ def register_documents_routes(app, get_db, token_required):
             
         # Delete category
         cur.execute("DELETE FROM documents_categories WHERE id = ?", (category_id,))
+        record_write(db, 'documents_categories', category_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Document category deleted'})
@@ -202,30 +249,26 @@ def register_documents_routes(app, get_db, token_required):
             type: integer
             required: false
             description: Filter by category ID
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of document items
+          400:
+            description: Invalid filter or sort
         """
-        category_id = request.args.get('category_id')
-        
         db = get_db()
-        cur = db.cursor()
         
-        if category_id:
-            cur.execute("""
-                SELECT di.*, dc.name as category_name 
-                FROM documents_items di
-                LEFT JOIN documents_categories dc ON di.category_id = dc.id
-                WHERE di.category_id = ?
-            """, (category_id,))
-        else:
-            cur.execute("""
-                SELECT di.*, dc.name as category_name 
-                FROM documents_items di
-                LEFT JOIN documents_categories dc ON di.category_id = dc.id
-            """)
+        try:
+            cur = execute_list_query(db, DOCUMENT_ITEM_LIST, request.args, 'di.json_cache')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
             
-        items = [dict(row) for row in cur.fetchall()]
+        items = cached_rows(cur)
         
         return jsonify(items)
     
@@ -250,8 +293,8 @@ def register_documents_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("""
-            SELECT di.*, dc.name as category_name 
+        cur.execute(f"""
+            SELECT {DOCUMENT_ITEM_COLUMNS}, dc.name as category_name 
             FROM documents_items di
             LEFT JOIN documents_categories dc ON di.category_id = dc.id
             WHERE di.id = ?
@@ -279,15 +322,23 @@ def register_documents_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - name
+                - link
               properties:
                 category_id:
                   type: integer
+                  x-nullable: true
                 title:
                   type: string
+                  minLength: 1
                 name:
                   type: string
+                  minLength: 1
                 link:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: Document item created
@@ -314,9 +365,12 @@ def register_documents_routes(app, get_db, token_required):
             "INSERT INTO documents_items (category_id, title, name, link) VALUES (?, ?, ?, ?)",
             (data.get('category_id'), data['title'], data['name'], data['link'])
         )
+        item_id = cur.lastrowid
+        refresh_json_cache(db, 'documents_items', 'id', item_id)
+        record_write(db, 'documents_items', item_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'Document item created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Document item created', 'id': item_id}), 201
     
     @app.route('/api/documents/items/<int:item_id>', methods=['PUT'])
     @token_required
@@ -339,15 +393,23 @@ def register_documents_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - title
+                - name
+                - link
               properties:
                 category_id:
                   type: integer
+                  x-nullable: true
                 title:
                   type: string
+                  minLength: 1
                 name:
                   type: string
+                  minLength: 1
                 link:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: Document item updated
@@ -383,6 +445,8 @@ def register_documents_routes(app, get_db, token_required):
             (data.get('category_id'), data.get('title'), data.get('name'), 
              data.get('link'), item_id)
         )
+        refresh_json_cache(db, 'documents_items', 'id', item_id)
+        record_write(db, 'documents_items', item_id)
         db.commit()
         
         return jsonify({'message': 'Document item updated'})
@@ -419,6 +483,7 @@ def register_documents_routes(app, get_db, token_required):
             
         # Delete document item
         cur.execute("DELETE FROM documents_items WHERE id = ?", (item_id,))
+        record_write(db, 'documents_items', item_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Document item deleted'})
@@ -1,5 +1,22 @@
-from flask import jsonify, request
+from flask import Response, jsonify, request
 import datetime
+from jobs import enqueue
+from list_query import execute_list_query
+from streaming import list_response
+from write_hooks import record_write
+
+FEEDBACK_COLUMNS = "id, full_name, phone_number, email, theme, text, created_at, is_deleted"
+
+FEEDBACK_LIST = {
+    'from': 'feedback',
+    'filters': {
+        'theme': ('theme', 'str'),
+        'created_at': ('created_at', 'date')
+    },
+    'sorts': {'id': 'id', 'created_at': 'created_at'},
+    'default_sort': '-created_at',
+    'active': 'is_deleted = 0'
+}
 
 def register_feedback_routes(app, get_db, token_required):
     
@@ -20,24 +37,111 @@ def register_feedback_routes(app, get_db, token_required):
             required: false
             default: false
             description: Whether to include soft-deleted records
+          - name: theme
+            in: query
+            type: string
+            required: false
+            description: Filter by feedback theme
+          - name: created_at_from
+            in: query
+            type: string
+            required: false
+            description: Only messages submitted at or after this ISO date/time
+          - name: created_at_to
+            in: query
+            type: string
+            required: false
+            description: Only messages submitted at or before this ISO date/time
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: -created_at
+            description: Sort key (id, created_at), prefix with - for descending
+          - name: stream
+            in: query
+            type: boolean
+            required: false
+            default: false
+            description: >
+              Stream the JSON array in chunks instead of building it in memory.
+              Send "Accept: application/x-ndjson" for one JSON object per line.
         responses:
           200:
             description: List of feedback messages
+          400:
+            description: Invalid filter or unsupported sort
         """
-        include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
-        
         db = get_db()
-        cur = db.cursor()
         
-        if include_deleted:
-            cur.execute("SELECT * FROM feedback ORDER BY created_at DESC")
-        else:
-            cur.execute("SELECT * FROM feedback WHERE is_deleted = 0 ORDER BY created_at DESC")
+        try:
+            cur = execute_list_query(db, FEEDBACK_LIST, request.args, FEEDBACK_COLUMNS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
             
-        items = [dict(row) for row in cur.fetchall()]
-        
-        return jsonify(items)
-    
+        return list_response(cur)
+
+    @app.route('/api/feedback/stream', methods=['GET'])
+    @token_required
+    def stream_feedback(current_user):
+        """
+        Stream new feedback messages as server-sent events
+        ---
+        tags:
+          - Feedback
+        security:
+          - Bearer: []
+        parameters:
+          - name: Last-Event-ID
+            in: header
+            type: integer
+            required: false
+            description: Resume after this feedback id (sent by EventSource on reconnect)
+          - name: last_event_id
+            in: query
+            type: integer
+            required: false
+            description: Same as the Last-Event-ID header, for clients that cannot set it
+        produces:
+          - text/event-stream
+        responses:
+          200:
+            description: >
+              A "feedback" event per new message, with the message id as event
+              id, and a comment line as heartbeat
+          400:
+            description: Invalid Last-Event-ID
+          503:
+            description: Too many open streams
+        """
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return jsonify({'message': 'Invalid Last-Event-ID'}), 400
+
+        broadcaster = app.extensions['event_stream']
+        subscription = broadcaster.open()
+        if subscription is None:
+            response = jsonify({'message': 'Too many open streams, try again later'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        events = broadcaster.stream(
+            subscription,
+            last_event_id,
+            app.config['SSE_HEARTBEAT'],
+            app.config['SSE_MAX_DURATION']
+        )
+        response = Response(events, mimetype='text/event-stream')
+        # Also frees the slot when the stream never started
+        response.call_on_close(lambda: broadcaster.close(subscription))
+        response.headers['Cache-Control'] = 'no-cache'
+        # Keep nginx from buffering the events
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @app.route('/api/feedback/<int:feedback_id>', methods=['GET'])
     @token_required
     def get_feedback_item(current_user, feedback_id):
@@ -62,7 +166,7 @@ def register_feedback_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM feedback WHERE id = ?", (feedback_id,))
+        cur.execute(f"SELECT {FEEDBACK_COLUMNS} FROM feedback WHERE id = ?", (feedback_id,))
         item = cur.fetchone()
         
         if not item:
@@ -83,17 +187,25 @@ def register_feedback_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - full_name
+                - text
               properties:
                 full_name:
                   type: string
+                  minLength: 1
                 phone_number:
                   type: string
+                  x-nullable: true
                 email:
                   type: string
+                  x-nullable: true
                 theme:
                   type: string
+                  x-nullable: true
                 text:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: Feedback submitted
@@ -113,9 +225,13 @@ def register_feedback_routes(app, get_db, token_required):
             "INSERT INTO feedback (full_name, phone_number, email, theme, text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
             (data['full_name'], data.get('phone_number'), data.get('email'), data.get('theme'), data['text'], now)
         )
+        feedback_id = cur.lastrowid
+        record_write(db, 'feedback', feedback_id, 'create')
+        # Staff are notified in the background, once the feedback is saved
+        enqueue(db, 'notify_feedback', {'feedback_id': feedback_id}, priority=10)
         db.commit()
         
-        return jsonify({'message': 'Feedback submitted', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Feedback submitted', 'id': feedback_id}), 201
     
     @app.route('/api/feedback/<int:feedback_id>', methods=['DELETE'])
     @token_required
@@ -148,7 +264,9 @@ def register_feedback_routes(app, get_db, token_required):
             return jsonify({'message': 'Feedback not found'}), 404
             
         # Soft delete feedback
-        cur.execute("UPDATE feedback SET is_deleted = 1 WHERE id = ?", (feedback_id,))
+        cur.execute("UPDATE feedback SET is_deleted = 1, deleted_at = ? WHERE id = ?",
+                    (datetime.datetime.now().isoformat(), feedback_id))
+        record_write(db, 'feedback', feedback_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Feedback deleted'})
@@ -0,0 +1,158 @@
+from flask import jsonify, request
+import json
+from jobs import job_counts, retry_job
+from list_query import build_list_query
+
+JOB_LIST = {
+    'from': 'jobs',
+    'filters': {
+        'status': ('status', 'str'),
+        'kind': ('kind', 'str')
+    },
+    'sorts': {'id': 'id', 'run_at': 'run_at', 'priority': 'priority'},
+    'default_sort': '-id'
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+def job_dict(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+def register_jobs_routes(app, get_db, token_required):
+
+    @app.route('/api/admin/jobs', methods=['GET'])
+    @token_required
+    def get_jobs(current_user):
+        """
+        Background job queue: counts per status and the latest jobs
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: status
+            in: query
+            type: string
+            required: false
+            description: queued, running, done or failed
+          - name: kind
+            in: query
+            type: string
+            required: false
+            description: Filter by job kind, e.g. notify_feedback
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: -id
+            description: Sort key (id, run_at, priority), prefix with - for descending
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            default: 100
+            description: Jobs to return (at most 1000)
+        responses:
+          200:
+            description: >
+              Jobs per status, the age of the oldest due job in seconds, and
+              the matching jobs (times are epoch seconds)
+          400:
+            description: Invalid filter, sort or limit
+          403:
+            description: Not authorized
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_LIMIT))
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+            sql, params = build_list_query(JOB_LIST, request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        db = get_db()
+        jobs = [job_dict(row) for row in db.execute(f"{sql} LIMIT ?", params + [limit]).fetchall()]
+
+        return jsonify(dict(job_counts(db), jobs=jobs))
+
+    @app.route('/api/admin/jobs/<int:job_id>', methods=['GET'])
+    @token_required
+    def get_job(current_user, job_id):
+        """
+        Get a background job
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: job_id
+            in: path
+            type: integer
+            required: true
+            description: ID of the job
+        responses:
+          200:
+            description: Job details, including its last error and result
+          403:
+            description: Not authorized
+          404:
+            description: Job not found
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        row = get_db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return jsonify({'message': 'Job not found'}), 404
+
+        return jsonify(job_dict(row))
+
+    @app.route('/api/admin/jobs/<int:job_id>/retry', methods=['POST'])
+    @token_required
+    def retry_failed_job(current_user, job_id):
+        """
+        Queue a failed job again with fresh attempts
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: job_id
+            in: path
+            type: integer
+            required: true
+            description: ID of the job
+        responses:
+          200:
+            description: Job queued
+          403:
+            description: Not authorized
+          404:
+            description: Job not found
+          409:
+            description: Job has not failed
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        try:
+            retry_job(get_db(), job_id)
+        except LookupError as e:
+            return jsonify({'message': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 409
+
+        return jsonify({'message': 'Job queued'})
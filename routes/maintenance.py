@@ -0,0 +1,87 @@
+from flask import jsonify, request
+import sqlite3
+import time
+from maintenance import TASKS, claim_task, database_stats, last_runs, maintenance_settings, run_task
+
+def register_maintenance_routes(app, get_db, token_required):
+
+    @app.route('/api/admin/maintenance', methods=['GET'])
+    @token_required
+    def get_maintenance_stats(current_user):
+        """
+        Database size, fragmentation and maintenance history
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: tables
+            in: query
+            type: boolean
+            required: false
+            default: false
+            description: Include size and unused space per table and index (reads the whole file)
+        responses:
+          200:
+            description: File, page and freelist stats and the last run of each task
+          403:
+            description: Not authorized
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        db = get_db()
+        stats = database_stats(
+            db,
+            app.config['DATABASE_PATH'],
+            tables=request.args.get('tables', 'false').lower() == 'true'
+        )
+        stats['scheduler'] = 'maintenance' in app.extensions
+        stats['tasks'] = last_runs(db)
+
+        return jsonify(stats)
+
+    @app.route('/api/admin/maintenance/<string:task>', methods=['POST'])
+    @token_required
+    def run_maintenance_task(current_user, task):
+        """
+        Run a maintenance task now
+        ---
+        tags:
+          - Admin
+        security:
+          - Bearer: []
+        parameters:
+          - name: task
+            in: path
+            type: string
+            required: true
+            description: >
+              optimize, analyze, incremental_vacuum, wal_checkpoint, archive,
+              compact_changes, compact_views or prune_rendered
+        responses:
+          200:
+            description: Task result and duration
+          403:
+            description: Not authorized
+          404:
+            description: Unknown task
+        """
+        # Only allow if current user has admin role
+        if current_user['role'] != 'admin':
+            return jsonify({'message': 'Not authorized'}), 403
+
+        if task not in TASKS:
+            return jsonify({'message': 'Unknown maintenance task'}), 404
+
+        db = get_db()
+        settings = dict(maintenance_settings(app.config), path=app.config['DATABASE_PATH'])
+        try:
+            claim_task(db, task, 0, time.time())
+            result = run_task(db, task, settings)
+        except sqlite3.OperationalError as e:
+            return jsonify({'message': f'Maintenance failed: {e}'}), 503
+
+        return jsonify(result)
@@ -1,4 +1,30 @@
 from flask import jsonify, request
+import datetime
+from list_query import execute_list_query
+from serializers import serialize_rows
+from json_cache import cached_rows, refresh_json_cache
+from write_hooks import record_write
+
+MENU_COLUMNS = "id, name, icon, is_deleted"
+
+MENU_LINK_COLUMNS = "ml.id, ml.menu_id, ml.target_type, ml.target_id, ml.label, ml.position, ml.is_deleted"
+
+MENU_LIST = {
+    'from': 'menu',
+    'sorts': {'id': 'id'},
+    'default_sort': 'id',
+    'active': 'is_deleted = 0'
+}
+
+MENU_LINK_LIST = {
+    'from': 'menu_links ml JOIN menu m ON ml.menu_id = m.id',
+    'filters': {
+        'menu_id': ('ml.menu_id', 'int'),
+        'target_type': ('ml.target_type', 'str')
+    },
+    'sorts': {'id': 'ml.id', 'position': 'ml.position'},
+    'default_sort': 'position'
+}
 
 def register_menu_routes(app, get_db, token_required):
     
@@ -16,21 +42,26 @@ def register_menu_routes(app, get_db, token_required):
             required: false
             default: false
             description: Whether to include soft-deleted records
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of menu items
+          400:
+            description: Invalid sort
         """
-        include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
-        
         db = get_db()
-        cur = db.cursor()
         
-        if include_deleted:
-            cur.execute("SELECT * FROM menu ORDER BY id")
-        else:
-            cur.execute("SELECT * FROM menu WHERE is_deleted = 0 ORDER BY id")
+        try:
+            cur = execute_list_query(db, MENU_LIST, request.args, 'json_cache')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
-        menu_items = [dict(row) for row in cur.fetchall()]
+        menu_items = cached_rows(cur)
         
         return jsonify(menu_items)
     
@@ -65,9 +96,9 @@ def register_menu_routes(app, get_db, token_required):
         cur = db.cursor()
         
         if include_deleted:
-            cur.execute("SELECT * FROM menu WHERE id = ?", (menu_id,))
+            cur.execute(f"SELECT {MENU_COLUMNS} FROM menu WHERE id = ?", (menu_id,))
         else:
-            cur.execute("SELECT * FROM menu WHERE id = ? AND is_deleted = 0", (menu_id,))
+            cur.execute(f"SELECT {MENU_COLUMNS} FROM menu WHERE id = ? AND is_deleted = 0", (menu_id,))
         
         menu_item = cur.fetchone()
         
@@ -92,11 +123,15 @@ def register_menu_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
                 icon:
                   type: string
+                  x-nullable: true
         responses:
           201:
             description: Menu item created
@@ -114,9 +149,12 @@ def register_menu_routes(app, get_db, token_required):
             "INSERT INTO menu (name, icon) VALUES (?, ?)",
             (data['name'], data.get('icon'))
         )
+        menu_id = cur.lastrowid
+        refresh_json_cache(db, 'menu', 'id', menu_id)
+        record_write(db, 'menu', menu_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'Menu item created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Menu item created', 'id': menu_id}), 201
     
     @app.route('/api/menu/<int:menu_id>', methods=['PUT'])
     @token_required
@@ -139,11 +177,15 @@ def register_menu_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
               properties:
                 name:
                   type: string
+                  minLength: 1
                 icon:
                   type: string
+                  x-nullable: true
         responses:
           200:
             description: Menu item updated
@@ -170,6 +212,8 @@ def register_menu_routes(app, get_db, token_required):
             "UPDATE menu SET name = ?, icon = ? WHERE id = ?",
             (data.get('name'), data.get('icon'), menu_id)
         )
+        refresh_json_cache(db, 'menu', 'id', menu_id)
+        record_write(db, 'menu', menu_id)
         db.commit()
         
         return jsonify({'message': 'Menu item updated'})
@@ -205,7 +249,10 @@ def register_menu_routes(app, get_db, token_required):
             return jsonify({'message': 'Menu item not found'}), 404
         
         # Soft delete menu item
-        cur.execute("UPDATE menu SET is_deleted = 1 WHERE id = ?", (menu_id,))
+        cur.execute("UPDATE menu SET is_deleted = 1, deleted_at = ? WHERE id = ?",
+                    (datetime.datetime.now().isoformat(), menu_id))
+        refresh_json_cache(db, 'menu', 'id', menu_id)
+        record_write(db, 'menu', menu_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Menu item deleted'})
@@ -217,19 +264,37 @@ def register_menu_routes(app, get_db, token_required):
         ---
         tags:
           - Menu Links
+        parameters:
+          - name: menu_id
+            in: query
+            type: integer
+            required: false
+            description: Filter by menu item ID
+          - name: target_type
+            in: query
+            type: string
+            required: false
+            description: Filter by target type
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: position
+            description: Sort key (id, position), prefix with - for descending
         responses:
           200:
             description: List of menu links
+          400:
+            description: Invalid filter or sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("""
-            SELECT ml.*, m.name as menu_name 
-            FROM menu_links ml
-            JOIN menu m ON ml.menu_id = m.id
-            ORDER BY ml.position
-        """)
-        menu_links = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, MENU_LINK_LIST, request.args, f'{MENU_LINK_COLUMNS}, m.name as menu_name')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+            
+        menu_links = serialize_rows(cur)
         
         return jsonify(menu_links)
 
@@ -249,17 +314,25 @@ def register_menu_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - menu_id
+                - target_type
               properties:
                 menu_id:
                   type: integer
+                  minimum: 1
                 target_type:
                   type: string
+                  minLength: 1
                 target_id:
                   type: integer
+                  x-nullable: true
                 label:
                   type: string
+                  x-nullable: true
                 position:
                   type: integer
+                  x-nullable: true
         responses:
           201:
             description: Menu link created
@@ -286,6 +359,7 @@ def register_menu_routes(app, get_db, token_required):
             (data['menu_id'], data['target_type'], data.get('target_id'), 
              data.get('label'), data.get('position', 0))
         )
+        record_write(db, 'menu_links', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'Menu link created', 'id': cur.lastrowid}), 201
@@ -1,4 +1,15 @@
 from flask import jsonify, request
+from list_query import execute_list_query
+from json_cache import cached_rows, refresh_json_cache
+from write_hooks import record_write
+
+SOCIAL_NETWORK_COLUMNS = "id, name, icon, link, is_deleted"
+
+SOCIAL_NETWORK_LIST = {
+    'from': 'social_networks',
+    'sorts': {'id': 'id'},
+    'default_sort': 'id'
+}
 
 def register_social_networks_routes(app, get_db, token_required):
     
@@ -9,14 +20,27 @@ def register_social_networks_routes(app, get_db, token_required):
         ---
         tags:
           - Social Networks
+        parameters:
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of social network links
+          400:
+            description: Invalid sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT * FROM social_networks")
-        items = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, SOCIAL_NETWORK_LIST, request.args, 'json_cache')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        items = cached_rows(cur)
         
         return jsonify(items)
     
@@ -41,7 +65,7 @@ def register_social_networks_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM social_networks WHERE id = ?", (network_id,))
+        cur.execute(f"SELECT {SOCIAL_NETWORK_COLUMNS} FROM social_networks WHERE id = ?", (network_id,))
         item = cur.fetchone()
         
         if not item:
@@ -65,13 +89,19 @@ def register_social_networks_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
+                - link
               properties:
                 name:
                   type: string
+                  minLength: 1
                 icon:
                   type: string
+                  x-nullable: true
                 link:
                   type: string
+                  minLength: 1
         responses:
           201:
             description: Social network created
@@ -89,9 +119,12 @@ def register_social_networks_routes(app, get_db, token_required):
             "INSERT INTO social_networks (name, icon, link) VALUES (?, ?, ?)",
             (data['name'], data.get('icon'), data['link'])
         )
+        network_id = cur.lastrowid
+        refresh_json_cache(db, 'social_networks', 'id', network_id)
+        record_write(db, 'social_networks', network_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'Social network created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Social network created', 'id': network_id}), 201
     
     @app.route('/api/social-networks/<int:network_id>', methods=['PUT'])
     @token_required
@@ -114,13 +147,19 @@ def register_social_networks_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - name
+                - link
               properties:
                 name:
                   type: string
+                  minLength: 1
                 icon:
                   type: string
+                  x-nullable: true
                 link:
                   type: string
+                  minLength: 1
         responses:
           200:
             description: Social network updated
@@ -147,6 +186,8 @@ def register_social_networks_routes(app, get_db, token_required):
             "UPDATE social_networks SET name = ?, icon = ?, link = ? WHERE id = ?",
             (data.get('name'), data.get('icon'), data.get('link'), network_id)
         )
+        refresh_json_cache(db, 'social_networks', 'id', network_id)
+        record_write(db, 'social_networks', network_id)
         db.commit()
         
         return jsonify({'message': 'Social network updated'})
@@ -183,6 +224,7 @@ def register_social_networks_routes(app, get_db, token_required):
             
         # Delete social network
         cur.execute("DELETE FROM social_networks WHERE id = ?", (network_id,))
+        record_write(db, 'social_networks', network_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Social network deleted'})
@@ -1,4 +1,18 @@
 from flask import jsonify, request
+from list_query import execute_list_query
+from json_cache import cached_rows, refresh_json_cache
+from write_hooks import record_write
+
+STAFF_COLUMNS = "id, position, full_name, email, phone, photo, is_deleted"
+
+STAFF_LIST = {
+    'from': 'staff',
+    'filters': {
+        'position': ('position', 'str')
+    },
+    'sorts': {'id': 'id', 'position': 'position'},
+    'default_sort': 'id'
+}
 
 def register_staff_routes(app, get_db, token_required):
     
@@ -9,14 +23,32 @@ def register_staff_routes(app, get_db, token_required):
         ---
         tags:
           - Staff
+        parameters:
+          - name: position
+            in: query
+            type: string
+            required: false
+            description: Filter by position
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: id
+            description: Sort key (id, position), prefix with - for descending
         responses:
           200:
             description: List of staff members
+          400:
+            description: Invalid filter or sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT * FROM staff")
-        items = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, STAFF_LIST, request.args, 'json_cache')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        items = cached_rows(cur)
         
         return jsonify(items)
     
@@ -41,7 +73,7 @@ def register_staff_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM staff WHERE id = ?", (staff_id,))
+        cur.execute(f"SELECT {STAFF_COLUMNS} FROM staff WHERE id = ?", (staff_id,))
         item = cur.fetchone()
         
         if not item:
@@ -65,17 +97,25 @@ def register_staff_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - position
+                - full_name
               properties:
                 position:
                   type: string
+                  minLength: 1
                 full_name:
                   type: string
+                  minLength: 1
                 email:
                   type: string
+                  x-nullable: true
                 phone:
                   type: string
+                  x-nullable: true
                 photo:
                   type: string
+                  x-nullable: true
         responses:
           201:
             description: Staff member created
@@ -93,9 +133,12 @@ def register_staff_routes(app, get_db, token_required):
             "INSERT INTO staff (position, full_name, email, phone, photo) VALUES (?, ?, ?, ?, ?)",
             (data['position'], data['full_name'], data.get('email'), data.get('phone'), data.get('photo'))
         )
+        staff_id = cur.lastrowid
+        refresh_json_cache(db, 'staff', 'id', staff_id)
+        record_write(db, 'staff', staff_id, 'create')
         db.commit()
         
-        return jsonify({'message': 'Staff member created', 'id': cur.lastrowid}), 201
+        return jsonify({'message': 'Staff member created', 'id': staff_id}), 201
     
     @app.route('/api/staff/<int:staff_id>', methods=['PUT'])
     @token_required
@@ -118,17 +161,25 @@ def register_staff_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - position
+                - full_name
               properties:
                 position:
                   type: string
+                  minLength: 1
                 full_name:
                   type: string
+                  minLength: 1
                 email:
                   type: string
+                  x-nullable: true
                 phone:
                   type: string
+                  x-nullable: true
                 photo:
                   type: string
+                  x-nullable: true
         responses:
           200:
             description: Staff member updated
@@ -158,6 +209,8 @@ def register_staff_routes(app, get_db, token_required):
             (data.get('position'), data.get('full_name'), data.get('email'),
              data.get('phone'), data.get('photo'), staff_id)
         )
+        refresh_json_cache(db, 'staff', 'id', staff_id)
+        record_write(db, 'staff', staff_id)
         db.commit()
         
         return jsonify({'message': 'Staff member updated'})
@@ -194,6 +247,7 @@ def register_staff_routes(app, get_db, token_required):
             
         # Delete staff member
         cur.execute("DELETE FROM staff WHERE id = ?", (staff_id,))
+        record_write(db, 'staff', staff_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Staff member deleted'})
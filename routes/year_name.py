@@ -1,4 +1,15 @@
 from flask import jsonify, request
+from list_query import execute_list_query
+from serializers import serialize_rows
+from write_hooks import record_write
+
+YEAR_NAME_COLUMNS = "id, img, text, is_deleted"
+
+YEAR_NAME_LIST = {
+    'from': 'year_name',
+    'sorts': {'id': 'id'},
+    'default_sort': '-id'
+}
 
 def register_year_name_routes(app, get_db, token_required):
     
@@ -9,14 +20,27 @@ def register_year_name_routes(app, get_db, token_required):
         ---
         tags:
           - Year Name
+        parameters:
+          - name: sort
+            in: query
+            type: string
+            required: false
+            default: -id
+            description: Sort key (id), prefix with - for descending
         responses:
           200:
             description: List of year name banners
+          400:
+            description: Invalid sort
         """
         db = get_db()
-        cur = db.cursor()
-        cur.execute("SELECT * FROM year_name ORDER BY id DESC")
-        items = [dict(row) for row in cur.fetchall()]
+        
+        try:
+            cur = execute_list_query(db, YEAR_NAME_LIST, request.args, YEAR_NAME_COLUMNS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        items = serialize_rows(cur)
         
         return jsonify(items)
     
@@ -35,7 +59,7 @@ def register_year_name_routes(app, get_db, token_required):
         """
         db = get_db()
         cur = db.cursor()
-        cur.execute("SELECT * FROM year_name ORDER BY id DESC LIMIT 1")
+        cur.execute(f"SELECT {YEAR_NAME_COLUMNS} FROM year_name ORDER BY id DESC LIMIT 1")
         item = cur.fetchone()
         
         if not item:
@@ -59,11 +83,15 @@ def register_year_name_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - text
               properties:
                 text:
                   type: string
+                  minLength: 1
                 img:
                   type: string
+                  x-nullable: true
         responses:
           201:
             description: Year name banner created
@@ -81,6 +109,7 @@ def register_year_name_routes(app, get_db, token_required):
             "INSERT INTO year_name (text, img) VALUES (?, ?)",
             (data['text'], data.get('img'))
         )
+        record_write(db, 'year_name', cur.lastrowid, 'create')
         db.commit()
         
         return jsonify({'message': 'Year name created', 'id': cur.lastrowid}), 201
@@ -106,11 +135,15 @@ def register_year_name_routes(app, get_db, token_required):
             required: true
             schema:
               type: object
+              required:
+                - text
               properties:
                 text:
                   type: string
+                  minLength: 1
                 img:
                   type: string
+                  x-nullable: true
         responses:
           200:
             description: Year name banner updated
@@ -137,6 +170,7 @@ def register_year_name_routes(app, get_db, token_required):
             "UPDATE year_name SET text = ?, img = ? WHERE id = ?",
             (data.get('text'), data.get('img'), year_id)
         )
+        record_write(db, 'year_name', year_id)
         db.commit()
         
         return jsonify({'message': 'Year name updated'})
@@ -173,6 +207,7 @@ def register_year_name_routes(app, get_db, token_required):
             
         # Delete year name
         cur.execute("DELETE FROM year_name WHERE id = ?", (year_id,))
+        record_write(db, 'year_name', year_id, 'delete')
         db.commit()
         
         return jsonify({'message': 'Year name deleted'})
@@ -0,0 +1,98 @@
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from json.encoder import encode_basestring, encode_basestring_ascii
+import json
+
+# Compiled serializers keyed by (column names, sort_keys, ensure_ascii)
+_serializer_cache = {}
+
+def _encode_float(value):
+    # Same spelling as the json module for non-finite values
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+def _encoders(ensure_ascii):
+    """Encoders for every type the sqlite3 module returns"""
+    return {
+        str: encode_basestring_ascii if ensure_ascii else encode_basestring,
+        int: int.__repr__,
+        float: _encode_float,
+        type(None): lambda value: 'null'
+    }
+
+def compile_row_serializer(description, sort_keys=True, ensure_ascii=True):
+    """
+    Build a function turning a row tuple into a JSON object string.
+
+    The function is generated once per column layout: keys are escaped and
+    ordered up front so serializing a row is a single string join with a
+    type lookup per value. Output matches Flask's default JSON provider.
+    """
+    names = tuple(column[0] for column in description)
+    key = (names, sort_keys, ensure_ascii)
+    if key in _serializer_cache:
+        return _serializer_cache[key]
+
+    encode_key = encode_basestring_ascii if ensure_ascii else encode_basestring
+    order = sorted(range(len(names)), key=lambda i: names[i]) if sort_keys else range(len(names))
+
+    parts = []
+    for position, index in enumerate(order):
+        prefix = ('{' if position == 0 else ',') + encode_key(names[index]) + ':'
+        parts.append(f"{prefix!r}, _encoders[_type(row[{index}])](row[{index}])")
+    body = ', '.join(parts) if parts else "'{'"
+
+    source = (
+        "def serialize(row, _encoders=_encoders, _type=type):\n"
+        f"    return ''.join(({body}, '}}'))\n"
+    )
+    namespace = {'_encoders': _encoders(ensure_ascii)}
+    exec(source, namespace)
+
+    serializer = namespace['serialize']
+    _serializer_cache[key] = serializer
+    return serializer
+
+def row_serializer(cur):
+    """Compiled serializer for the current cursor using the app's JSON settings"""
+    provider = current_app.json
+    return compile_row_serializer(
+        cur.description,
+        getattr(provider, 'sort_keys', True),
+        getattr(provider, 'ensure_ascii', True)
+    )
+
+class SerializedRows(list):
+    """A list of pre-serialized JSON objects, emitted as a JSON array by jsonify"""
+
+    def to_json(self):
+        return '[' + ','.join(self) + ']'
+
+def serialize_rows(cur):
+    """Fetch all rows from a cursor as pre-serialized JSON objects"""
+    serialize = row_serializer(cur)
+    return SerializedRows(serialize(row) for row in cur.fetchall())
+
+class RowsJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider with a fast path for SerializedRows, which are
+    written out directly instead of going through json.dumps.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if isinstance(obj, SerializedRows):
+            return obj.to_json()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], SerializedRows):
+            if self.compact is False or (self.compact is None and self._app.debug):
+                # Pretty-printed output goes through the regular path
+                return super().response([json.loads(item) for item in args[0]])
+            return self._app.response_class(f"{args[0].to_json()}\n", mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
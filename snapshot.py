@@ -0,0 +1,155 @@
+from flask import request
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from write_hooks import ALL_TABLES
+
+# Snapshot names are unique per process and generation
+_generations = itertools.count(1)
+
+class Snapshot:
+    """
+    Read-only in-memory copy of the database for this worker process.
+
+    The copy is made with the sqlite3 backup API into a named shared-cache
+    memory database, so every request thread can open its own connection to
+    it. A refresh builds the next generation next to the current one and then
+    swaps the name new connections use; requests already running keep
+    reading the generation they opened, which stays alive until they close.
+
+    Whether the content changed is detected from the ALL_TABLES row of
+    cache_versions, which only content writes bump (see
+    write_hooks.record_write), on a dedicated connection. It is checked at
+    most once per ``check_interval`` seconds and immediately after writes
+    made by this process (see invalidate()). Bookkeeping writes such as
+    view flushes, logins and job claims do not cause a reload.
+    """
+
+    def __init__(self, path, check_interval, max_bytes):
+        self.path = path
+        self.check_interval = check_interval
+        self.max_bytes = max_bytes
+        self.uri = None
+        self.version = None
+        self.checked_at = 0.0
+        self.disabled = False
+        self._keeper = None
+        self._watch = None
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    def _content_version(self):
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.path, check_same_thread=False)
+        # fetchall() finishes the statement, so the next check reads afresh
+        rows = self._watch.execute("SELECT version FROM cache_versions WHERE name = ?", (ALL_TABLES,)).fetchall()
+        return (rows[0][0] if rows else 0), self._watch
+
+    def _too_large(self, source):
+        page_count = source.execute("PRAGMA page_count").fetchone()[0]
+        page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size > self.max_bytes
+
+    def refresh(self):
+        """Load a new generation if the content changed"""
+        # One thread reloads; the others keep using the current generation
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self.checked_at = time.monotonic()
+            version, source = self._content_version()
+            if self.uri is not None and version == self.version:
+                return
+
+            if self._too_large(source):
+                print(f"Snapshot reads disabled: {self.path} is larger than {self.max_bytes} bytes")
+                self.disabled = True
+                return
+
+            uri = f"file:snapshot-{os.getpid()}-{next(_generations)}?mode=memory&cache=shared"
+            keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            source.backup(keeper)
+
+            with self._swap_lock:
+                previous = self._keeper
+                self._keeper, self.uri, self.version = keeper, uri, version
+                if previous is not None:
+                    # Open request connections keep the old generation alive
+                    previous.close()
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Check for changes on the next read, e.g. after a local write"""
+        self.checked_at = 0.0
+
+    def connect(self):
+        """
+        Read-only connection to the current generation, or None when the
+        snapshot is unavailable and the file should be used instead.
+        """
+        if self.disabled:
+            return None
+        if self.uri is None or time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh()
+
+        # A generation must not be dropped between reading its name and
+        # connecting, or the connection would open a new empty database
+        with self._swap_lock:
+            if self.uri is None:
+                return None
+            db = sqlite3.connect(self.uri, uri=True)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA query_only = ON")
+        return db
+
+def is_snapshot_request(request):
+    """
+    Unauthenticated GETs are served from the snapshot. Reads with
+    increment_views=true go to the file and are never served from the
+    response cache, so every view reaches the view counter.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and 'Authorization' not in request.headers
+        and request.args.get('increment_views', 'false').lower() != 'true'
+    )
+
+def configure_snapshot(app, watcher=None):
+    """
+    Set up the in-memory snapshot when SNAPSHOT_READS is enabled.
+
+    SNAPSHOT_CHECK_INTERVAL (seconds, default 1) bounds how stale anonymous
+    reads can be after a content write by another process; writes by this
+    process are visible on the next read. With a VersionWatcher, writes
+    announced by other processes are picked up as soon as the watcher sees
+    them. Databases larger than SNAPSHOT_MAX_BYTES (default 64 MB) are not
+    mirrored. Returns the Snapshot or None.
+    """
+    app.config.setdefault('SNAPSHOT_READS', os.environ.get('SNAPSHOT_READS', 'false').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('SNAPSHOT_CHECK_INTERVAL', float(os.environ.get('SNAPSHOT_CHECK_INTERVAL', 1.0)))
+    app.config.setdefault('SNAPSHOT_MAX_BYTES', int(os.environ.get('SNAPSHOT_MAX_BYTES', 64 * 1024 * 1024)))
+
+    if not app.config['SNAPSHOT_READS']:
+        return None
+
+    snapshot = Snapshot(
+        app.config['DATABASE_PATH'],
+        app.config['SNAPSHOT_CHECK_INTERVAL'],
+        app.config['SNAPSHOT_MAX_BYTES']
+    )
+
+    @app.after_request
+    def invalidate_snapshot(response):
+        # Anything that went to the file may have written to it
+        if request.method != 'OPTIONS' and not is_snapshot_request(request):
+            snapshot.invalidate()
+        return response
+
+    if watcher is not None:
+        watcher.subscribe(lambda tables: snapshot.invalidate())
+
+    app.extensions['snapshot'] = snapshot
+    return snapshot
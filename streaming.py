@@ -0,0 +1,58 @@
+from flask import Response, jsonify, request, stream_with_context
+from serializers import SerializedRows, row_serializer, serialize_rows
+
+# Rows fetched from the cursor per yielded chunk
+STREAM_BATCH_SIZE = 500
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def _cached_fragment(row):
+    return row[0]
+
+def _json_array(cur, serialize):
+    """Yield a JSON array one batch of rows at a time"""
+    yield '['
+    separator = ''
+    while True:
+        rows = cur.fetchmany(STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        yield separator + ','.join(serialize(row) for row in rows)
+        separator = ','
+    yield ']\n'
+
+def _ndjson(cur, serialize):
+    """Yield one JSON document per line"""
+    while True:
+        rows = cur.fetchmany(STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        yield ''.join(serialize(row) + '\n' for row in rows)
+
+def wants_ndjson():
+    """True if the client prefers newline-delimited JSON over a JSON array"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def list_response(cur, cached=False):
+    """
+    Build the response for a list query.
+
+    ``Accept: application/x-ndjson`` streams one row per line and
+    ``stream=true`` streams a regular JSON array; both iterate the cursor in
+    batches so memory stays flat regardless of result size. Otherwise the
+    rows are serialized up front and returned with jsonify.
+
+    With ``cached=True`` the cursor selects a single json_cache column and
+    the stored fragments are written out as they are.
+    """
+    serialize = _cached_fragment if cached else row_serializer(cur)
+
+    if wants_ndjson():
+        return Response(stream_with_context(_ndjson(cur, serialize)), mimetype=NDJSON_MIMETYPE)
+
+    if request.args.get('stream', 'false').lower() == 'true':
+        return Response(stream_with_context(_json_array(cur, serialize)), mimetype='application/json')
+
+    if cached:
+        return jsonify(SerializedRows(row[0] for row in cur.fetchall()))
+    return jsonify(serialize_rows(cur))
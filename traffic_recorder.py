@@ -0,0 +1,145 @@
+from logging.handlers import RotatingFileHandler
+from werkzeug.exceptions import HTTPException
+import io
+import json
+import logging
+import os
+import time
+
+# Query parameters whose values are never written to the log
+SENSITIVE_PARAMS = {'token', 'access_token', 'password', 'api_key', 'key', 'secret'}
+
+# Request bodies up to this size are recorded (sanitized) so writes can be replayed
+MAX_BODY_BYTES = 64 * 1024
+
+def sanitize_body(value):
+    """Replace every string in a JSON document with a placeholder of the same length"""
+    if isinstance(value, str):
+        return 'x' * len(value)
+    if isinstance(value, list):
+        return [sanitize_body(item) for item in value]
+    if isinstance(value, dict):
+        return {key: sanitize_body(item) for key, item in value.items()}
+    return value
+
+def sanitize_query(query_string):
+    """Query string with the values of SENSITIVE_PARAMS masked"""
+    if not query_string:
+        return ''
+    parts = []
+    for part in query_string.split('&'):
+        name, separator, _ = part.partition('=')
+        if name.lower() in SENSITIVE_PARAMS:
+            part = f"{name}{separator}***"
+        parts.append(part)
+    return '&'.join(parts)
+
+class TrafficRecorder:
+    """
+    WSGI middleware writing one JSON line per request.
+
+    Only metadata is recorded: method, path, matched route, query string
+    (sensitive values masked), body size, whether an Authorization header was
+    sent, status, response size and duration. JSON bodies are kept with every
+    string replaced by a same-length placeholder so write requests can be
+    replayed without storing their content.
+    """
+
+    def __init__(self, wsgi_app, url_map, path, max_bytes, backups):
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger(f"traffic_recorder.{path}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+    def route(self, environ):
+        try:
+            rule, _ = self.url_map.bind_to_environ(environ).match(return_rule=True)
+            return rule.rule
+        except HTTPException:
+            return None
+
+    def read_body(self, environ):
+        """Sanitized JSON body, leaving wsgi.input readable for the app"""
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return None
+        if not length or length > MAX_BODY_BYTES or 'json' not in environ.get('CONTENT_TYPE', ''):
+            return None
+
+        data = environ['wsgi.input'].read(length)
+        environ['wsgi.input'] = io.BytesIO(data)
+        try:
+            return sanitize_body(json.loads(data))
+        except ValueError:
+            return None
+
+    def __call__(self, environ, start_response):
+        started = time.time()
+        record = {
+            'ts': round(started, 6),
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO', ''),
+            'route': self.route(environ),
+            'query': sanitize_query(environ.get('QUERY_STRING', '')),
+            'body_size': int(environ.get('CONTENT_LENGTH') or 0),
+            'auth': 'HTTP_AUTHORIZATION' in environ,
+            'accept': environ.get('HTTP_ACCEPT')
+        }
+        body = self.read_body(environ)
+        if body is not None:
+            record['body'] = body
+
+        def recording_start_response(status, headers, exc_info=None):
+            record['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        response = self.wsgi_app(environ, recording_start_response)
+        return RecordedResponse(response, record, started, self.logger)
+
+class RecordedResponse:
+    """Response iterable that writes the record once the body has been sent"""
+
+    def __init__(self, response, record, started, logger):
+        self.response = response
+        self.record = record
+        self.started = started
+        self.logger = logger
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.response:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        if hasattr(self.response, 'close'):
+            self.response.close()
+        self.record['response_size'] = self.size
+        self.record['duration_ms'] = round((time.time() - self.started) * 1000, 3)
+        self.logger.info(json.dumps(self.record, separators=(',', ':')))
+
+def configure_traffic_recorder(app):
+    """
+    Record requests to the JSONL file named by TRAFFIC_LOG (off when unset).
+
+    The log rotates at TRAFFIC_LOG_MAX_BYTES (default 50 MB) keeping
+    TRAFFIC_LOG_BACKUPS old files (default 5). Replay with bench/replay.py.
+    """
+    path = os.environ.get('TRAFFIC_LOG')
+    if not path:
+        return
+
+    app.wsgi_app = TrafficRecorder(
+        app.wsgi_app,
+        app.url_map,
+        path,
+        int(os.environ.get('TRAFFIC_LOG_MAX_BYTES', 50 * 1024 * 1024)),
+        int(os.environ.get('TRAFFIC_LOG_BACKUPS', 5))
+    )
+    print(f"Recording traffic to {path}")
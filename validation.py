@@ -0,0 +1,100 @@
+import inspect
+import yaml
+from flask import jsonify, request
+from jsonschema import Draft7Validator
+
+# Methods whose JSON body is validated
+BODY_METHODS = ('POST', 'PUT', 'PATCH')
+
+def route_spec(view):
+    """The Swagger spec in the flasgger docstring of ``view`` ({} without one)"""
+    doc = inspect.getdoc(view) or ''
+    if '---' not in doc:
+        return {}
+    return yaml.safe_load(doc.split('---', 1)[1]) or {}
+
+def body_schema(view):
+    """
+    The schema of the ``in: body`` parameter in the flasgger docstring of
+    ``view``, or None when it documents no body.
+    """
+    for parameter in route_spec(view).get('parameters', []):
+        if parameter.get('in') == 'body':
+            return parameter.get('schema')
+    return None
+
+def to_json_schema(schema):
+    """
+    JSON Schema equivalent of a Swagger 2.0 ``schema``: properties marked
+    ``x-nullable: true`` also accept null, which Swagger 2.0 cannot express.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    converted = {}
+    for key, value in schema.items():
+        if key == 'properties':
+            value = {name: to_json_schema(prop) for name, prop in value.items()}
+        elif key == 'items':
+            value = to_json_schema(value)
+        converted[key] = value
+    if converted.pop('x-nullable', False) and 'type' in converted:
+        converted['type'] = [converted['type'], 'null']
+    return converted
+
+def compile_validators(app):
+    """
+    Validator per (endpoint, method) for every route with a documented
+    request body. Schemas are checked here, so a broken docstring fails at
+    startup rather than on a request.
+    """
+    validators = {}
+    for rule in app.url_map.iter_rules():
+        methods = [method for method in BODY_METHODS if method in rule.methods]
+        if not methods:
+            continue
+        schema = body_schema(app.view_functions[rule.endpoint])
+        if schema is None:
+            continue
+        schema = to_json_schema(schema)
+        Draft7Validator.check_schema(schema)
+        validator = Draft7Validator(schema)
+        for method in methods:
+            validators[(rule.endpoint, method)] = validator
+    return validators
+
+def validation_errors(validator, data):
+    """'<field>: <problem>' for everything wrong with ``data``, sorted by field"""
+    errors = sorted(validator.iter_errors(data), key=lambda error: list(error.absolute_path))
+    return [
+        f"{'.'.join(str(part) for part in error.absolute_path) or 'body'}: {error.message}"
+        for error in errors
+    ]
+
+def configure_request_validation(app, authenticated=None):
+    """
+    Validate JSON request bodies against the schemas in the route
+    docstrings before the view runs. Call after all routes are registered.
+    Invalid bodies get a 400 listing the problems without the view, and so
+    the database, ever being reached.
+
+    Views marked ``requires_token`` are only validated when
+    ``authenticated()`` is true; otherwise the view runs and its decorator
+    answers 401, so anonymous callers learn nothing about the schema.
+    """
+    validators = compile_validators(app)
+    app.extensions['request_validators'] = validators
+
+    @app.before_request
+    def validate_request_body():
+        validator = validators.get((request.endpoint, request.method))
+        if validator is None:
+            return None
+        view = app.view_functions[request.endpoint]
+        if getattr(view, 'requires_token', False) and not (authenticated and authenticated()):
+            return None
+        errors = validation_errors(validator, request.get_json(silent=True))
+        if errors:
+            return jsonify({'message': 'Invalid request body', 'errors': errors}), 400
+        return None
+
+    return validators
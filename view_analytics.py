@@ -0,0 +1,299 @@
+from collections import Counter
+import atexit
+import datetime
+import os
+import sqlite3
+import threading
+from hyperloglog import HyperLogLog, hash_value, register_functions
+
+# Tables with a views counter that detail endpoints increment
+VIEW_TABLES = ('blog_items', 'about_company', 'about_company_category_items')
+
+# Time series tables and the period each row covers: the day, the Monday
+# the ISO week starts on, or the month (YYYY-MM)
+GRANULARITIES = {
+    'day': 'views_daily',
+    'week': 'views_weekly',
+    'month': 'views_monthly'
+}
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_DAILY_RETENTION_DAYS = 90
+
+# Bytes of the random salt visitor hashes are keyed with each day
+SALT_BYTES = 16
+
+def periods(day):
+    """Period key of ``day`` (an ISO date string) per granularity"""
+    date = datetime.date.fromisoformat(day)
+    return {
+        'day': day,
+        'week': (date - datetime.timedelta(days=date.weekday())).isoformat(),
+        'month': day[:7]
+    }
+
+def visitor_key(request):
+    """
+    What tells readers apart: client address and user agent. It is only
+    ever stored as a salted hash inside a sketch. Behind a reverse proxy,
+    wrap the app in werkzeug's ProxyFix so remote_addr is the client's.
+    """
+    return f"{request.remote_addr}|{request.user_agent.string}".encode()
+
+def _merge_into(sketches, key, sketch):
+    if key in sketches:
+        sketches[key].merge(sketch)
+    else:
+        sketches[key] = HyperLogLog(sketch.precision, sketch.registers)
+
+def _serialize(sketch):
+    return sketch.to_bytes() if sketch is not None else None
+
+def flush_views(db, counts, sketches=None):
+    """
+    Add buffered ``counts`` ({(table, item_id, day): views}) and reader
+    ``sketches`` (same keys, HyperLogLog values) to the time series and the
+    lifetime counters in one transaction.
+
+    View counts are not content writes: they bump no cache_versions, are
+    not logged to /api/changes and leave json_cache alone. Cached responses
+    and snapshots only reload on content writes, so until the next one they
+    show the counts they were built with.
+    """
+    sketches = sketches or {}
+    rows = {granularity: Counter() for granularity in GRANULARITIES}
+    row_sketches = {granularity: {} for granularity in GRANULARITIES}
+    items = Counter()
+    item_sketches = {}
+    for (table, item_id, day), views in counts.items():
+        sketch = sketches.get((table, item_id, day))
+        for granularity, period in periods(day).items():
+            rows[granularity][(table, item_id, period)] += views
+            if sketch is not None:
+                _merge_into(row_sketches[granularity], (table, item_id, period), sketch)
+        items[(table, item_id)] += views
+        if sketch is not None:
+            _merge_into(item_sketches, (table, item_id), sketch)
+
+    register_functions(db)
+    for granularity, series_table in GRANULARITIES.items():
+        db.executemany(
+            f"""INSERT INTO {series_table} (table_name, item_id, period, views, sketch) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (table_name, item_id, period) DO UPDATE SET
+                    views = views + excluded.views,
+                    sketch = hll_merge(sketch, excluded.sketch)""",
+            [(table, item_id, period, views, _serialize(row_sketches[granularity].get((table, item_id, period))))
+             for (table, item_id, period), views in rows[granularity].items()]
+        )
+    db.executemany(
+        """INSERT INTO item_sketches (table_name, item_id, sketch) VALUES (?, ?, ?)
+           ON CONFLICT (table_name, item_id) DO UPDATE SET sketch = hll_merge(sketch, excluded.sketch)""",
+        [(table, item_id, sketch.to_bytes()) for (table, item_id), sketch in item_sketches.items()]
+    )
+    for (table, item_id), views in items.items():
+        db.execute(
+            f"""UPDATE {table} SET views = views + ?,
+                       unique_views = COALESCE((SELECT hll_count(sketch) FROM item_sketches
+                                                WHERE table_name = ? AND item_id = ?), unique_views)
+                WHERE id = ?""",
+            (views, table, item_id, item_id)
+        )
+    db.commit()
+
+def daily_salt(db, day):
+    """
+    The random salt visitor hashes of ``day`` are keyed with, created on
+    first use. Salts of earlier days are deleted, so the same reader cannot
+    be recognized from one day to the next.
+    """
+    db.execute("INSERT OR IGNORE INTO visitor_salts (day, salt) VALUES (?, ?)", (day, os.urandom(SALT_BYTES)))
+    db.execute("DELETE FROM visitor_salts WHERE day < ?", (day,))
+    salt = db.execute("SELECT salt FROM visitor_salts WHERE day = ?", (day,)).fetchone()[0]
+    db.commit()
+    return salt
+
+class ViewCounter:
+    """
+    Buffers view increments in memory and writes them in batches.
+
+    A background thread flushes every ``interval`` seconds, or sooner once
+    ``max_pending`` items are waiting, so a burst of reads costs one write
+    transaction instead of one per view. Views still buffered when a worker
+    is killed are lost. With an ``interval`` of 0 every view is written
+    right away.
+
+    Readers passed as ``visitor`` are hashed with the salt of the day and
+    added to a HyperLogLog sketch per item and day, which the flush merges
+    into the stored sketches; visitor keys themselves are never kept.
+    """
+
+    def __init__(self, path, interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self.path = path
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = Counter()
+        self._pending_items = Counter()
+        self._sketches = {}
+        self._salt = (None, None)
+        self._pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def record(self, table, item_id, visitor=None):
+        """
+        Count a view of ``item_id`` in ``table`` by ``visitor`` (bytes, see
+        visitor_key). Returns the views of the item not written to the
+        database yet, including this one.
+        """
+        if self.interval > 0:
+            self.start()
+        day = datetime.date.today().isoformat()
+        hashed = hash_value(visitor, self._salt_of(day)) if visitor is not None else None
+        with self._lock:
+            self._pending[(table, item_id, day)] += 1
+            self._pending_items[(table, item_id)] += 1
+            if hashed is not None:
+                self._sketches.setdefault((table, item_id, day), HyperLogLog()).add(hashed)
+            pending = self._pending_items[(table, item_id)]
+            full = len(self._pending) >= self.max_pending
+        if self.interval <= 0:
+            self.flush()
+        elif full:
+            self._wake.set()
+        return pending
+
+    def _salt_of(self, day):
+        cached_day, salt = self._salt
+        if cached_day != day:
+            db = sqlite3.connect(self.path)
+            try:
+                salt = daily_salt(db, day)
+            finally:
+                db.close()
+            self._salt = (day, salt)
+        return salt
+
+    def start(self):
+        """Start the flush thread in this process, again after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Views buffered by the parent were counted there
+            self._pending = Counter()
+            self._pending_items = Counter()
+            self._sketches = {}
+            self._lock = threading.Lock()
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name='view-counter', daemon=True).start()
+            atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    def flush(self):
+        """Write the buffered views; returns how many were written"""
+        with self._lock:
+            counts, self._pending = self._pending, Counter()
+            sketches, self._sketches = self._sketches, {}
+            self._pending_items = Counter()
+        if not counts:
+            return 0
+        db = sqlite3.connect(self.path)
+        try:
+            flush_views(db, counts, sketches)
+        except sqlite3.Error:
+            # Keep them for the next flush
+            with self._lock:
+                self._pending.update(counts)
+                for (table, item_id, _), views in counts.items():
+                    self._pending_items[(table, item_id)] += views
+                for key, sketch in sketches.items():
+                    _merge_into(self._sketches, key, sketch)
+            raise
+        finally:
+            db.close()
+        return sum(counts.values())
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Flushing view counts failed: {e}")
+
+def view_series(db, table, item_id, granularity, start, end):
+    """
+    Views and unique readers per period from ``start`` to ``end`` (ISO
+    dates, inclusive) of one item, or of all items of ``table`` when
+    ``item_id`` is None, and the unique readers of the whole range. Returns
+    (series, unique_views); periods without views are left out. Since
+    visitor hashes change every day, a reader counts once per day across
+    ranges spanning several days.
+    """
+    first, last = periods(start)[granularity], periods(end)[granularity]
+    series_table = GRANULARITIES[granularity]
+    sql = f"""SELECT period, views, sketch FROM {series_table}
+              WHERE table_name = ? AND period BETWEEN ? AND ?"""
+    params = [table, first, last]
+    if item_id is not None:
+        sql += " AND item_id = ?"
+        params.append(item_id)
+
+    views = Counter()
+    sketches = {}
+    for period, period_views, sketch in db.execute(sql + " ORDER BY period", params):
+        views[period] += period_views
+        if sketch is not None:
+            _merge_into(sketches, period, HyperLogLog.from_bytes(sketch))
+
+    series = [
+        {
+            'period': period,
+            'views': views[period],
+            'unique_views': sketches[period].count() if period in sketches else 0
+        }
+        for period in sorted(views)
+    ]
+    whole_range = HyperLogLog()
+    for sketch in sketches.values():
+        whole_range.merge(sketch)
+    return series, whole_range.count()
+
+def compact_daily_views(db, retention_days, today=None):
+    """
+    Delete daily view rows older than ``retention_days``; their views stay
+    in the weekly and monthly series. Returns the number of rows deleted.
+    """
+    today = today or datetime.date.today()
+    cutoff = (today - datetime.timedelta(days=retention_days)).isoformat()
+    deleted = 0
+    for table in VIEW_TABLES:
+        cur = db.execute("DELETE FROM views_daily WHERE table_name = ? AND period < ?", (table, cutoff))
+        deleted += cur.rowcount
+    db.commit()
+    return deleted
+
+def configure_view_counter(app):
+    """
+    Create the ViewCounter used by the increment_views detail endpoints.
+
+    VIEW_FLUSH_INTERVAL (seconds, default 5; 0 writes every view at once)
+    and VIEW_MAX_PENDING (default 1000 items) bound how long and how many
+    views are buffered. VIEWS_DAILY_RETENTION_DAYS (default 90) is how long
+    per-day rows are kept by the compact_views maintenance task.
+    """
+    app.config.setdefault('VIEW_FLUSH_INTERVAL', float(os.environ.get('VIEW_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)))
+    app.config.setdefault('VIEW_MAX_PENDING', int(os.environ.get('VIEW_MAX_PENDING', DEFAULT_MAX_PENDING)))
+    app.config.setdefault('VIEWS_DAILY_RETENTION_DAYS', int(os.environ.get('VIEWS_DAILY_RETENTION_DAYS', DEFAULT_DAILY_RETENTION_DAYS)))
+
+    counter = ViewCounter(
+        app.config['DATABASE_PATH'],
+        app.config['VIEW_FLUSH_INTERVAL'],
+        app.config['VIEW_MAX_PENDING']
+    )
+    app.extensions['view_counter'] = counter
+    return counter
@@ -0,0 +1,63 @@
+from flask import g, has_request_context
+import datetime
+
+# Row of cache_versions bumped by every write, so pollers can tell with a
+# single lookup whether anything changed
+ALL_TABLES = '*'
+
+# Tables whose large text bodies live in a separate *_bodies table so that
+# list and count queries only scan narrow rows.
+# table -> (bodies table, columns kept on the narrow table)
+BODY_TABLES = {
+    'blog_items': (
+        'blog_item_bodies',
+        ['id', 'category_id', 'title', 'img_or_video_link', 'date_time',
+         'views', 'intro_text', 'is_deleted']
+    ),
+    'about_company': (
+        'about_company_bodies',
+        ['id', 'title', 'img', 'date_time', 'views', 'is_deleted']
+    ),
+    'about_company_category_items': (
+        'about_company_category_item_bodies',
+        ['id', 'category_id', 'title', 'views', 'date_time', 'feedback_id', 'is_deleted']
+    )
+}
+
+# Actions written to the changes log. Archiving only moves rows that were
+# already logged as deleted, so clients have nothing to sync.
+LOGGED_ACTIONS = ('create', 'update', 'delete', 'restore')
+
+def record_write(db, table, item_id=None, action='update'):
+    """
+    Record a write to ``table`` in the current transaction.
+
+    Call before committing every write, next to refresh_json_cache(), so the
+    cache version of the table changes atomically with its rows and the
+    change is logged for /api/changes. ``item_id`` and ``action`` ('create',
+    'update', 'delete' or 'restore') describe the changed row; archive.py
+    also records 'archive' (a batch of rows, no ``item_id``) and 'unarchive',
+    and add_sample_data 'seed'; neither 'archive' nor 'seed' is logged.
+
+    Only content writes call this. Bookkeeping such as view counts, last
+    login times, job claims or maintenance runs must not: the ALL_TABLES
+    version this bumps is what makes every worker drop its cached responses
+    and reload its snapshot. Bookkeeping commits still change the file, but
+    leave both alone.
+    """
+    db.executemany(
+        """INSERT INTO cache_versions (name, version) VALUES (?, 1)
+           ON CONFLICT (name) DO UPDATE SET version = version + 1""",
+        [(table,), (ALL_TABLES,)]
+    )
+    if action in LOGGED_ACTIONS:
+        db.execute(
+            "INSERT INTO changes (table_name, item_id, action, changed_at) VALUES (?, ?, ?, ?)",
+            (table, item_id, action, datetime.datetime.now().isoformat())
+        )
+    if has_request_context():
+        g.setdefault('_written_tables', set()).add(table)
+
+def written_tables():
+    """Tables written by the current request"""
+    return g.get('_written_tables', set())